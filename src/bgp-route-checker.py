@@ -5,6 +5,9 @@ and logs origin ASN and peering ASN on console and file.
 
 The response json data from Qrator will be saved in a file with CIDR and timestamp in its filename.
 
+The checks are done by bgp_route_checker package, which can also be used from other
+python code without running this script.
+
 ref) https://radar.qrator.dev/open-api
 """
 
@@ -12,15 +15,56 @@ import logging
 import logging.handlers
 
 import argparse
+import json
+import os
 import sys
-
-import ipaddress
-
+import time
+from contextlib import nullcontext
 from datetime import datetime
 
-import urllib.request
-import json
-from collections import Counter
+from bgp_route_checker import (
+    AnomalyDetector,
+    InvalidCIDRError,
+    PathAnalyzer,
+    PathTrie,
+    PrefixNotFoundError,
+    PrivateCIDRError,
+    QratorClient,
+    QratorError,
+    Policy,
+    WriteBehindWriter,
+    analyze_prepends,
+)
+from bgp_route_checker import validate_ipv4network as check_cidr
+from bgp_route_checker.aggregate import aggregate_files
+from bgp_route_checker.batch import (
+    STAGE_WORKERS,
+    check_rib,
+    log_pipeline,
+    prefix_checker,
+    read_prefixes,
+    run_batch,
+)
+from bgp_route_checker.bloom import ScalableBloomFilter
+from bgp_route_checker.cache import ResponseCache
+from bgp_route_checker.dependency import analyze_dependencies
+from bgp_route_checker.minhash import LSHIndex, load_signatures
+from bgp_route_checker.mrt import MRTError
+from bgp_route_checker.persist import read_saved
+from bgp_route_checker.profiling import Profiler
+from bgp_route_checker.report import Checks
+from bgp_route_checker.rpki import load_roas
+from bgp_route_checker.results import ranked
+from bgp_route_checker.server import serve
+from bgp_route_checker.shard import Coordinator, ShardWorker
+from bgp_route_checker.sidecar import (
+    build_index,
+    make_summary,
+    summaries,
+    write_sidecar,
+)
+from bgp_route_checker.spill import CrossPrefixReport, parse_size
+from bgp_route_checker.tsdb import TimeSeriesStore
 
 
 def logger_setup(options):
@@ -56,6 +100,12 @@ def logger_setup(options):
     logger.addHandler(fh)
     logger.addHandler(ch)
 
+    # same handlers for the logs from bgp_route_checker package
+    lib_logger = logging.getLogger("bgp_route_checker")
+    lib_logger.setLevel(logging.DEBUG)
+    lib_logger.addHandler(fh)
+    lib_logger.addHandler(ch)
+
     return logger
 
 
@@ -72,10 +122,253 @@ def parse_options():
         "--test", action="store_true", help=argparse.SUPPRESS, default=False
     )
     parser.add_argument("--cidr", help="IPv4 CIDR to check")
+    parser.add_argument("--qrator-url", help=argparse.SUPPRESS, default=None)
+    parser.add_argument(
+        "--no-compress",
+        action="store_true",
+        default=False,
+        help="Do not ask Qrator API for gzip/deflate compressed response",
+    )
+    parser.add_argument(
+        "--save-gzip",
+        action="store_true",
+        default=False,
+        help="Save responses gzip compressed, as received when gzip encoded",
+    )
+    parser.add_argument(
+        "--sidecars",
+        action="store_true",
+        default=False,
+        help="Write a .summary sidecar next to each response saved",
+    )
+    parser.add_argument(
+        "--index",
+        metavar="DIR",
+        help="Write the missing sidecars of the saved responses in DIR with "
+        "--workers processes, and their index.json",
+    )
+    parser.add_argument(
+        "--archive",
+        metavar="DIR",
+        help="Directory of saved responses for --history or --cross-report, "
+        "read from their sidecars",
+    )
+    parser.add_argument(
+        "--pretty-print",
+        metavar="FILE",
+        help="Print a saved response, .json or .json.gz, as indented json",
+    )
+    parser.add_argument(
+        "--prepend-report",
+        action="store_true",
+        default=False,
+        help="Log path-prepend summary at origin, transit and vantage positions",
+    )
+    parser.add_argument(
+        "--dependency-report",
+        action="store_true",
+        default=False,
+        help="Log the transit ASNs all or nearly all paths depend on",
+    )
+    parser.add_argument(
+        "--chokepoint-threshold",
+        type=float,
+        default=0.9,
+        help="Share of paths a transit ASN must be on for --dependency-report",
+    )
+    parser.add_argument(
+        "--anomaly-state",
+        help="sqlite3 file to keep per-prefix running statistics for anomaly check",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        default=False,
+        help="Run local HTTP/JSON service answering GET /check?cidr=<cidr>",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to serve on")
+    parser.add_argument("--port", type=int, default=8080, help="Port to serve on")
+    parser.add_argument(
+        "--ttl", type=int, default=300, help="Seconds to cache a CIDR summary"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory to cache responses and revalidate them with ETag/Last-Modified",
+    )
+    parser.add_argument(
+        "--stage-workers",
+        metavar="STAGE=N,...",
+        help="Workers per --batch stage of fetch, persist, parse, analyze and "
+        "store, e.g. fetch=8,analyze=2 (fetch defaults to --workers, the others "
+        "to 1)",
+    )
+    parser.add_argument(
+        "--processes",
+        action="store_true",
+        default=False,
+        help="Run the --batch analyze stage in a process pool",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        help="Size of the queue in front of each --batch stage "
+        "(default twice its workers)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=30,
+        help="Seconds to wait for connecting to and each read from Qrator API",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        help="Seconds for the whole run, after which no more fetches are made",
+    )
+    parser.add_argument(
+        "--hedge",
+        type=float,
+        nargs="?",
+        const=95,
+        metavar="PERCENTILE",
+        help="Send a second request when a fetch takes longer than this "
+        "percentile of the fetch times so far (default 95)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Number of fetch/analysis workers"
+    )
+    parser.add_argument(
+        "--aggregate",
+        nargs="+",
+        metavar="FILE",
+        help="Summarize peer ASNs across saved qrator-*.json files with sketches",
+    )
+    parser.add_argument(
+        "--top-k", type=int, default=20, help="Number of top peer ASNs to report"
+    )
+    parser.add_argument(
+        "--distinct-state",
+        help="json file of distinct ASN/vantage counters to merge into and save",
+    )
+    parser.add_argument(
+        "--batch", metavar="FILE", help="Check the prefixes listed in a file"
+    )
+    parser.add_argument(
+        "--mrt",
+        metavar="FILE",
+        help="Read paths from a MRT TABLE_DUMP_V2 RIB dump instead of Qrator API, "
+        "for all prefixes or the ones given by --cidr/--batch",
+    )
+    parser.add_argument(
+        "--shard-dir",
+        help="Shared directory to split --batch among workers by consistent hashing",
+    )
+    parser.add_argument(
+        "--nodes", help="Comma-separated names of all workers sharing --shard-dir"
+    )
+    parser.add_argument("--worker", help="Name of this worker in --nodes")
+    parser.add_argument(
+        "--coordinate",
+        action="store_true",
+        default=False,
+        help="Merge the results of the workers in --shard-dir and show progress",
+    )
+
+    parser.add_argument(
+        "--roas",
+        metavar="FILE",
+        help="ROA export (CSV or JSON) to validate the observed origin ASNs with",
+    )
+    parser.add_argument(
+        "--policy",
+        metavar="FILE",
+        help="json file of expected origins, required peers and prepend per prefix",
+    )
+    parser.add_argument(
+        "--tsdb",
+        metavar="FILE",
+        help="sqlite3 file to append per-prefix metrics to, with hourly/daily rollups",
+    )
+    parser.add_argument(
+        "--cross-report",
+        action="store_true",
+        default=False,
+        help="Log exact peer and origin ASN totals over all --batch/--mrt prefixes",
+    )
+    parser.add_argument(
+        "--memory-limit",
+        metavar="SIZE",
+        help="Keep the --cross-report counts within SIZE (e.g. 256M), spilling "
+        "sorted runs to disk, and keep --batch results on disk",
+    )
+    parser.add_argument(
+        "--spill-dir", help="Directory for --memory-limit files (default TMPDIR)"
+    )
+    parser.add_argument(
+        "--bloom",
+        metavar="FILE",
+        help="Bloom filter file of the (prefix, path) pairs seen, to log new paths",
+    )
+    parser.add_argument(
+        "--minhash",
+        metavar="FILE",
+        help="Save MinHash signatures of the peer sets of --batch/--mrt prefixes",
+    )
+    parser.add_argument(
+        "--cluster",
+        nargs="+",
+        metavar="FILE",
+        help="Group the prefixes in --minhash files by similar peer sets",
+    )
+    parser.add_argument(
+        "--similarity",
+        type=float,
+        default=0.5,
+        help="Estimated Jaccard similarity of peer sets to group prefixes by",
+    )
+    parser.add_argument(
+        "--lsh-bands",
+        type=int,
+        default=32,
+        help="Number of LSH bands the signatures are split into for --cluster",
+    )
+    parser.add_argument(
+        "--history",
+        metavar="CIDR",
+        help="Show metrics of the CIDR stored in --tsdb for the last --days, "
+        "or of each response saved in --archive",
+    )
+    parser.add_argument(
+        "--days", type=float, default=7, help="Number of days of --history to show"
+    )
+    parser.add_argument(
+        "--profile",
+        action="append",
+        choices=["cpu", "mem"],
+        help="Capture cProfile (cpu) and/or tracemalloc (mem) data of the run, "
+        "or of each prefix in --batch/--mrt",
+    )
+    parser.add_argument(
+        "--profile-dir", default=".", help="Directory to write profile data in"
+    )
+    parser.add_argument(
+        "--profile-threshold",
+        type=float,
+        default=0.0,
+        help="Only write profile data of runs or prefixes taking this many seconds",
+    )
 
     # process args
     if len(sys.argv) > 1:
         args, unknown = parser.parse_known_args()
+        if args.workers < 1:
+            parser.error("--workers must be at least 1")
+        if args.queue_size is not None and args.queue_size < 1:
+            parser.error("--queue-size must be at least 1")
+        if args.shard_dir and not args.nodes:
+            parser.error("--shard-dir requires --nodes")
+        if args.shard_dir and not (args.worker or args.coordinate):
+            parser.error("--shard-dir requires --worker or --coordinate")
         return args, parser
     else:
         # print help and still proceed with --test and --debug
@@ -83,146 +376,606 @@ def parse_options():
         return sys.exit(1)
 
 
+def profiler_setup(options):
+    if not options.profile:
+        return None
+    return Profiler(options.profile, options.profile_dir, options.profile_threshold)
+
+
+def profiled(label):
+    """Profile the block if --profile is given"""
+    return profiler.capture(label) if profiler else nullcontext()
+
+
+def stage(name):
+    """Record the time of a stage in the profile if --profile is given"""
+    return profiler.stage(name) if profiler else nullcontext()
+
+
+def qrator_client(cache=None):
+    if cache is None and options.cache_dir:
+        cache = ResponseCache(options.ttl, options.cache_dir)
+    return QratorClient(
+        options.qrator_url,
+        compress=not options.no_compress,
+        cache=cache,
+        timeout=options.timeout,
+        # a run deadline does not apply to the long-running service
+        deadline=None if options.serve else options.deadline,
+        hedge=options.hedge,
+        # gzip responses are saved as received
+        keep_wire=options.save_gzip,
+    )
+
+
+def fetch_stats(client):
+    """Log the request, timeout and hedging counters of the client"""
+    p = client.latency_percentile(client.hedge or 95)
+    logger.info(
+        f"{client.stats['requests']} requests, "
+        f"{client.stats['timeouts']} timed out, "
+        f"{client.stats['deadline_exceeded']} past the deadline, "
+        f"{client.stats['hedged']} hedged ({client.stats['hedge_wins']} hedges won), "
+        f"p{client.hedge or 95:g} fetch time "
+        + (f"{p:.3f}s" if p is not None else "not known yet")
+    )
+
+
 def validate_ipv4network(cidr):
     try:
-        check_cidr = ipaddress.IPv4Network(cidr)
-        logger.debug(f"{cidr} is valid IPv4 network")
-        if check_cidr.is_private:
-            logger.info("The CIDR is on private IP range. Exiting.")
-            sys.exit(0)
-        if "/" not in cidr:
-            logger.warning(
-                f"Using {cidr}/32 as no prefix was given in the cidr argument"
-            )
-            cidr = cidr + "/32"
-            logger.error("This script won't check BGP route with /32 netmask. Exiting")
-            sys.exit(1)
-    except ValueError:
-        logger.error(
-            f"Expecting IPv4 prefix like 10.0.0.0/24. String given is {cidr}. Exiting."
-        )
+        cidr = check_cidr(cidr)
+    except PrivateCIDRError as e:
+        logger.info(f"{e} Exiting.")
+        sys.exit(0)
+    except InvalidCIDRError as e:
+        logger.error(f"{e} Exiting.")
         sys.exit(1)
+    logger.debug(f"{cidr} is valid IPv4 network")
 
     return cidr
 
 
-def bgp_path_checker_qrator(cidr):
-    # replace "/" with "%2F"
-    cidr_q = cidr.replace("/", "%2F")
-
-    # set url
-    url = f"https://new-api.radar.qrator.net/v1/get-all-paths?prefix={cidr_q}"
-    logger.debug(f"Qrator API URL to use is {url}")
-
-    # timestamp
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+def bgp_path_checker_qrator(client, cidr, writer):
+    logger.debug(f"Qrator API URL to use is {client.url_for(cidr)}")
 
     # get response from Qrator api
-    with urllib.request.urlopen(url) as r:
-        # response code
-        if r.code != 200:
-            logger.error(f"Failed to receive response from {url}")
-            sys.exit(1)
-        logger.info(f"Received response from {url}")
-
-        # headers
-        ct = r.getheader("content-type")
-        length = r.getheader("content-length")
-        logger.debug(f"Received {length} bytes of {ct} data in response")
-
-        # load data
-        data = json.loads(r.read())
+    try:
+        with stage("fetch"):
+            response = client.fetch(cidr)
+    except QratorError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    if response.status != "fetched":
+        logger.info(f"Using {response.status} response from {response.url}")
+    else:
+        logger.info(f"Received response from {response.url}")
+
+    # headers and transfer metrics
+    ct = response.headers.get("Content-Type")
+    m = response.metrics
+    logger.debug(
+        f"Received {m['body_bytes']} bytes of {ct} data in response, "
+        f"{m['wire_bytes']} bytes {m['encoding']} on the wire "
+        f"(compression ratio {m['compression_ratio']:.1f}) "
+        f"in {m['fetch_seconds']:.3f}s, {m.get('attempts', 0)} requests"
+        + (", hedged request won" if m.get("hedge_won") else "")
+    )
 
-        # saving the data with timestamp in the filename
-        filename = "qrator-" + cidr.replace("/", "-") + "-" + timestamp + ".json"
-        with open(filename, "w") as salida:
-            salida.write(json.dumps(data, indent=2))
-            logger.info(f"Saved the obtained data in {filename}")
+    # saving the data as received with timestamp in the filename
+    filename = response.filename
+    if response.status != "fetched":
+        # already saved when it was fetched
+        pass
+    else:
+        # written in background while the analysis goes on
+        writer.submit(filename, response.body, response.wire)
+        logger.debug(f"Queued the obtained data for {filename}")
 
     # exit if no data found
-    if cidr not in data["data"].keys():
+    try:
+        with stage("parse"):
+            response.paths
+    except PrefixNotFoundError:
         logger.info(
             "The given CIDR was not found. See IRR/WHOIS/RADB/etc. and try different prefix. Exiting."
         )
         sys.exit(0)
+    except QratorError as e:
+        logger.error(f"{e} Exiting.")
+        sys.exit(1)
 
-    # passing over only paths data
-    paths = data["data"][cidr]
+    return response
 
-    return paths
 
+def origin_check(result):
+    """Log the origin ASN of the analyzed paths"""
+    logger.debug(f"Processed {result.path_count} paths of {result.cidr}.")
 
-def origin_check(paths, cidr):
-    """Go through the ASN paths to check origin ASN"""
-    logger.debug(f"Processing {type(paths)} with {len(paths)} items.")
+    # confirm the unique origin ASN observed
+    c = result.origins
+    logger.info(f"ASN {set(c)} for {result.cidr}")
 
-    # origin check
-    lst_origin_asn = []
-    # for each path observed by Qrator
-    for path in paths:
-        # split comma-delimited ASN list
-        asns = path.split(",")
+    # show summary if there is more than one origin ASN observed
+    if result.moas:
+        logger.warning(
+            f"Multiple origin ASN observed. ASN and its occurrence: {ranked(c)}"
+        )
 
-        # the last entry is the origin
-        lst_origin_asn.append(asns[-1])
+    # the origin, the one with most occurrence if there are multiple
+    return result.origin_asn
 
-    # confirm the unique origin ASN observed
-    origin = set(lst_origin_asn)
-    logger.info(f"ASN {origin} for {cidr}")
 
-    # get counter to show summary if there is more than one origin ASN observed
-    c = Counter(lst_origin_asn)
-    if len(origin) != 1:
-        logger.warning(
-            f"Multiple origin ASN observed. ASN and its occurrence: {c.most_common()}"
+def peer_check(result):
+    """Log the neighboring ASNs of the analyzed paths"""
+    logger.info(f"Summary of peer ASNs: {ranked(result.peers)}")
+    logger.info(
+        f"Summary of peer ASNs with path-prepend at origin: {ranked(result.peers_pathprepend)}"
+    )
+
+    return 0
+
+
+def prepend_check(paths):
+    """Go through the ASN paths to summarize path-prepend at every position"""
+    report = analyze_prepends(paths)
+    logger.info(f"Prepended runs by position: {report.positions.most_common()}")
+    for asn, c in sorted(
+        report.asns.items(), key=lambda x: sum(x[1].values()), reverse=True
+    ):
+        logger.info(
+            f"ASN {asn} prepend run lengths: {sorted(c.items())}, "
+            f"toward: {report.toward[asn].most_common()}"
         )
+    logger.info(
+        f"Path lengths with prepends collapsed: {sorted(report.path_lengths.items())}, "
+        f"mean {report.mean_path_length():.2f}"
+    )
+
+    return report
+
+
+def dependency_check(paths):
+    """Find the transit ASNs all or nearly all paths to the prefix go through"""
+    report = analyze_dependencies(paths)
+    threshold = options.chokepoint_threshold
+    logger.info(
+        f"ASNs every path from the origin to the vantage points goes through: "
+        f"{report.dominators()}"
+    )
+    chokepoints = [
+        f"{asn} ({share:.1%})" for asn, share in report.chokepoints(threshold)
+    ]
+    logger.info(
+        f"Transit ASNs on at least {threshold:.0%} of {report.path_count} paths: "
+        f"{', '.join(chokepoints) or 'none'}"
+    )
+    coverage = [
+        (asn, round(report.share(asn), 3))
+        for asn, _ in ranked(report.coverage)[: options.top_k]
+    ]
+    logger.debug(f"Path coverage per ASN: {coverage}")
 
-    # pick the origin, the one with most occurrence if there are multiple
-    origin_asn = c.most_common()[0][0]
+    return report
 
-    return origin_asn
 
+def anomaly_setup():
+    """AnomalyDetector keeping its state in --anomaly-state"""
+    try:
+        return AnomalyDetector(options.anomaly_state)
+    except (OSError, ValueError) as e:
+        logger.error(f"Failed to open {options.anomaly_state}: {e}")
+        sys.exit(1)
 
-def peer_check(paths, origin_asn):
-    """Go through the ASN paths to check the neighboring ASNs"""
-    peers = []
-    for path in paths:
-        # split comma-delimited ASN list
-        asns = path.split(",")
 
-        # exclude origin asn from the list
-        while asns.count(origin_asn):
-            asns.remove(origin_asn)
+def aggregate_check(filenames):
+    """Summarize peer ASNs across saved responses in fixed memory"""
+    # keep more counters than reported so the top entries are reliable
+    agg = aggregate_files(filenames, k=options.top_k * 10, workers=options.workers)
+    logger.info(
+        f"Aggregated {agg.top.n} paths of {agg.prefixes} prefixes "
+        f"from {len(filenames)} files"
+    )
+    logger.info(
+        f"Top {options.top_k} peer ASNs (count, overestimate at most "
+        f"{agg.top.error_bound():.0f}): {agg.top.top(options.top_k)}"
+    )
+    logger.debug(
+        f"Count-Min estimates within {agg.freq.error_bound():.1f} "
+        f"with probability {1 - agg.freq.delta:.3f}"
+    )
 
-        # the last ASN from the list with origin ASN removed
-        # is the peer BGP ASN
-        peers.append(asns[-1])
+    # distinct counts, rolled up with the previous runs if the state exists
+    if options.distinct_state:
+        if os.path.exists(options.distinct_state):
+            agg.load_distinct(options.distinct_state)
+        agg.save_distinct(options.distinct_state)
+        logger.debug(f"Saved distinct counters in {options.distinct_state}")
+    logger.info(
+        f"Distinct ASNs about {agg.asns.count()}, "
+        f"vantage points about {agg.vantages.count()} "
+        f"(standard error {agg.asns.error:.1%})"
+    )
+    for cidr, hll in agg.prefix_vantages.items():
+        logger.debug(f"{cidr} seen by about {hll.count()} vantage points")
 
-    # generate the counter and log summary of the peer ASNs
-    c = Counter(peers)
-    logger.info(f"Summary of peer ASNs: {c.most_common()}")
+    return agg
 
-    # peers with path-prepend
-    peers_pathprepend = []
-    for path in paths:
-        asns = path.split(",")
-        if asns.count(origin_asn) > 1:
-            while asns.count(origin_asn):
-                asns.remove(origin_asn)
-            peers_pathprepend.append(asns[-1])
-    c = Counter(peers_pathprepend)
-    logger.info(f"Summary of peer ASNs with path-prepend at origin: {c.most_common()}")
 
-    return 0
+def stage_workers(spec):
+    """Dict of stage name to worker count from "fetch=8,analyze=2" """
+    workers = {"fetch": options.workers}
+    for part in spec.split(",") if spec else []:
+        name, _, count = part.partition("=")
+        count = count.strip()
+        if name.strip() not in STAGE_WORKERS or not count.isdigit() or not int(count):
+            parser.error(f"Invalid --stage-workers {part}")
+        workers[name.strip()] = int(count)
+    return workers
+
+
+def bloom_setup():
+    """ScalableBloomFilter of --bloom, or an empty context without it"""
+    if not options.bloom:
+        return nullcontext()
+    try:
+        bloom = ScalableBloomFilter(options.bloom)
+    except (OSError, ValueError) as e:
+        logger.error(f"Failed to open {options.bloom}: {e}")
+        sys.exit(1)
+    logger.debug(
+        f"{len(bloom)} paths in {options.bloom}, {bloom.size()} bytes, "
+        f"false positive rate at most {bloom.false_positive_rate():.4%}"
+    )
+    return bloom
+
+
+def new_path_check(bloom):
+    """Function logging the paths of a prefix never seen before in the filter"""
+
+    def check(cidr, paths):
+        new = bloom.add_paths(cidr, paths)
+        if new:
+            logger.info(f"{cidr} {len(new)} new paths: {new[:options.top_k]}")
+        else:
+            logger.debug(f"{cidr} no new paths")
+        return new
+
+    return check
+
+
+def cross_report_setup():
+    """CrossPrefixReport within --memory-limit, None if no report is asked"""
+    if not (options.cross_report or options.memory_limit):
+        return None
+    try:
+        limit = parse_size(options.memory_limit) if options.memory_limit else None
+    except ValueError:
+        parser.error(f"Invalid --memory-limit {options.memory_limit}")
+    return CrossPrefixReport(limit, options.spill_dir)
+
+
+def checks_setup(rpki_detail=logging.DEBUG):
+    """Checks of the results asked by the options"""
+    return Checks(
+        policy=policy_setup() if options.policy else None,
+        roas=roa_setup() if options.roas else None,
+        store=TimeSeriesStore(options.tsdb) if options.tsdb else None,
+        minhash=options.minhash,
+        detector=anomaly_setup() if options.anomaly_state else None,
+        report=cross_report_setup(),
+        top_k=options.top_k,
+        rpki_detail=rpki_detail,
+    )
+
+
+def batch_check(filename):
+    """Check the prefixes in a file, or this worker's shard of them"""
+    prefixes = read_prefixes(filename)
+    logger.info(f"Read {len(prefixes)} prefixes from {filename}")
+
+    if options.coordinate:
+        merged = Coordinator(options.shard_dir, options.nodes.split(",")).merge(
+            prefixes
+        )
+        for worker, progress in merged["progress"].items():
+            logger.info(
+                f"Worker {worker}: {progress['done']} done, "
+                f"{progress['failed']} failed of {progress['assigned']}"
+            )
+        logger.info(
+            f"Merged {len(merged['results'])} results, "
+            f"{len(merged['failed'])} failed, {len(merged['pending'])} pending"
+        )
+        if merged["failed"]:
+            logger.warning(f"Failed prefixes: {merged['failed']}")
+        return merged
+
+    client = qrator_client()
+    with WriteBehindWriter(
+        compress=options.save_gzip
+    ) as writer, bloom_setup() as bloom, checks_setup() as checks:
+        check, pipeline = prefix_checker(
+            client,
+            writer,
+            profiler=profiler,
+            on_paths=new_path_check(bloom) if bloom is not None else None,
+            sidecars=options.sidecars,
+            workers=stage_workers(options.stage_workers),
+            processes=options.processes,
+            maxsize=options.queue_size,
+        )
+        if options.shard_dir:
+            # the prefixes of this worker's shard not done yet, checked the
+            # same way and recorded in the shard directory as they come
+            worker = ShardWorker(
+                options.shard_dir, options.worker, options.nodes.split(",")
+            )
+            run_batch(worker.check(prefixes, check), checks)
+            progress = worker.progress
+            logger.info(
+                f"Worker {progress['worker']}: {progress['done']} done, "
+                f"{progress['failed']} failed of {progress['assigned']}"
+            )
+        else:
+            run_batch(check(prefixes), checks)
+        fetch_stats(client)
+        if pipeline is not None:
+            log_pipeline(pipeline)
+        return checks.finish()
+
+
+def mrt_check(filename):
+    """Check the prefixes in a MRT RIB dump with the same analysis"""
+    prefixes = None
+    if options.batch:
+        prefixes = read_prefixes(options.batch)
+    elif options.cidr:
+        prefixes = [options.cidr]
+
+    with bloom_setup() as bloom, checks_setup() as checks:
+        on_paths = new_path_check(bloom) if bloom is not None else None
+
+        def on_result(paths, result):
+            if options.prepend_report:
+                prepend_check(paths)
+
+        try:
+            count = check_rib(
+                filename,
+                prefixes,
+                PathAnalyzer(),
+                checks,
+                on_paths=on_paths,
+                on_result=on_result,
+                profiler=profiler,
+            )
+        except InvalidCIDRError as e:
+            logger.error(f"{e} Exiting.")
+            sys.exit(1)
+        except (OSError, MRTError) as e:
+            logger.error(f"Failed to read {filename}: {e}")
+            sys.exit(1)
+        checks.finish()
+
+    return count
+
+
+def roa_setup():
+    """Load the ROA export given by --roas"""
+    try:
+        index = load_roas(options.roas)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Failed to load ROAs from {options.roas}: {e}")
+        sys.exit(1)
+    logger.info(
+        f"Loaded {index.count} ROAs from {options.roas} in {index.build_seconds:.3f}s"
+    )
+
+    return index
+
+
+def policy_setup():
+    """Load the routing policy given by --policy"""
+    try:
+        policy = Policy.load(options.policy)
+    except (OSError, ValueError, AttributeError) as e:
+        logger.error(f"Failed to load policy from {options.policy}: {e}")
+        sys.exit(1)
+    logger.debug(f"Loaded policy rules of {len(policy)} prefixes from {options.policy}")
+
+    return policy
+
+
+def cluster_check(filenames):
+    """Group the prefixes of saved signatures by similar routing profile"""
+    hasher = None
+    signatures = {}
+    for filename in filenames:
+        try:
+            loaded, sigs = load_signatures(filename)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Failed to read signatures from {filename}: {e}")
+            sys.exit(1)
+        if hasher and (loaded.num_perm, loaded.seed) != (hasher.num_perm, hasher.seed):
+            logger.error(f"{filename} has signatures of other MinHash parameters")
+            sys.exit(1)
+        hasher = loaded
+        # a later snapshot replaces the signature of the same prefix
+        signatures.update(sigs)
+    logger.info(f"Read {len(signatures)} signatures from {len(filenames)} files")
+
+    if not 1 <= options.lsh_bands <= hasher.num_perm:
+        parser.error(f"--lsh-bands must be between 1 and {hasher.num_perm}")
+    index = LSHIndex(options.lsh_bands, hasher.num_perm // options.lsh_bands)
+    for cidr, signature in signatures.items():
+        index.add(cidr, signature)
+    clusters = index.clusters(options.similarity)
+    groups = [c for c in clusters if len(c) > 1]
+    outliers = [c[0] for c in clusters if len(c) == 1]
+    logger.info(
+        f"{len(groups)} groups of prefixes with routing profiles at least "
+        f"{options.similarity:.0%} similar, {len(outliers)} outliers"
+    )
+    for group in groups[: options.top_k]:
+        logger.info(f"{len(group)} prefixes: {group[:options.top_k]}")
+    if outliers:
+        logger.info(f"Outliers: {outliers}")
+
+    return clusters
+
+
+def history_check(cidr):
+    """Show the stored metrics of the CIDR from the finest tier available"""
+    now = time.time()
+    start = now - options.days * 86400
+    with TimeSeriesStore(options.tsdb) as store:
+        tier = store.tier_for(start, now)
+        points = store.query(cidr, start, tier=tier)
+    logger.info(
+        f"{len(points)} {tier} points of {cidr} in the last {options.days} days"
+    )
+    for p in points:
+        when = datetime.fromtimestamp(p["ts"]).strftime("%Y-%m-%d %H:%M:%S")
+        peers = sorted(p["peers"].items(), key=lambda x: x[1], reverse=True)
+        logger.info(
+            f"{when} n={p['n']} paths={p['path_count']:.0f} "
+            f"({p['path_count_min']}-{p['path_count_max']}) "
+            f"length={p['mean_path_length']:.2f} origins={p['origins']} "
+            f"peers={peers[:options.top_k]} prepends={p['prepends']}"
+        )
+
+    return points
+
+
+def archive_history_check(cidr):
+    """Show the summary of each response of the CIDR saved in --archive"""
+    found = summaries(options.archive, cidr)
+    logger.info(f"{len(found)} saved responses of {cidr} in {options.archive}")
+    for s in found:
+        if "error" in s:
+            logger.info(f"{s.get('timestamp')} {s['dump']} {s['error']}")
+            continue
+        logger.info(
+            f"{s.get('timestamp')} paths={s['path_count']} "
+            f"length={s['mean_path_length']:.2f} "
+            f"origins={s['origins']} peers={s['peers'][:options.top_k]} "
+            f"prepends={s['peers_pathprepend']}"
+        )
+
+    return found
+
+
+def archive_cross_report():
+    """Cross-prefix report of the latest response of each CIDR in --archive"""
+    latest = {}
+    for s in summaries(options.archive):
+        if "error" not in s:
+            latest[s["cidr"]] = s
+    with Checks(report=cross_report_setup(), top_k=options.top_k) as checks:
+        for s in latest.values():
+            checks.add(s)
+        return checks.finish()["cross_report"]
+
+
+def index_check(directory):
+    """Write the missing sidecars of the saved responses and their index"""
+    try:
+        index, built, errors = build_index(directory, options.workers)
+    except OSError as e:
+        logger.error(f"Failed to index {directory}: {e}")
+        sys.exit(1)
+    for filename, error in errors:
+        logger.warning(f"Failed to summarize {filename}: {error}")
+    logger.info(
+        f"Wrote {built} sidecars, {len(index)} summaries in the index of {directory}"
+    )
+
+    return index
+
+
+def pretty_print(filename):
+    """Print a saved response as indented json"""
+    try:
+        data = json.loads(read_saved(filename))
+    except (OSError, ValueError) as e:
+        logger.error(f"Failed to read {filename}: {e}")
+        sys.exit(1)
+    json.dump(data, sys.stdout, indent=2)
+    sys.stdout.write("\n")
 
 
 def main():
-    if options.cidr:
+    if options.pretty_print:
+        pretty_print(options.pretty_print)
+    elif options.serve:
+        with profiled("serve"):
+            serve(
+                options.host,
+                options.port,
+                ttl=options.ttl,
+                workers=options.workers,
+                # revalidated in memory even without --cache-dir
+                client=qrator_client(ResponseCache(options.ttl, options.cache_dir)),
+                policy=policy_setup() if options.policy else None,
+            )
+    elif options.cluster:
+        cluster_check(options.cluster)
+    elif options.index:
+        index_check(options.index)
+    elif options.history:
+        if options.archive:
+            archive_history_check(options.history)
+        elif options.tsdb:
+            history_check(options.history)
+        else:
+            parser.error("--history requires --tsdb or --archive")
+    elif options.archive and options.cross_report:
+        archive_cross_report()
+    elif options.mrt:
+        mrt_check(options.mrt)
+    elif options.batch:
+        batch_check(options.batch)
+    elif options.aggregate:
+        with profiled("aggregate"):
+            aggregate_check(options.aggregate)
+    elif options.cidr:
         cidr = options.cidr
         cidr = validate_ipv4network(cidr)
-        paths = bgp_path_checker_qrator(cidr)
-        origin_asn = origin_check(paths, cidr)
-        peer_check(paths, origin_asn)
+        client = qrator_client()
+        analyzer = PathAnalyzer()
+        # the response is saved in background and flushed on leaving the block
+        with WriteBehindWriter(compress=options.save_gzip) as writer, profiled(cidr):
+            response = bgp_path_checker_qrator(client, cidr, writer)
+            paths = response.paths
+            if options.bloom:
+                with bloom_setup() as bloom:
+                    new_path_check(bloom)(cidr, paths)
+            with stage("analysis"):
+                # the shared suffixes are stored once and the summaries read
+                # off the levels next to the origin
+                trie = PathTrie(paths)
+                logger.debug(
+                    f"Stored {len(trie)} paths in {trie.node_count} suffix trie nodes"
+                )
+                # analyzed once for every check below
+                result = analyzer.analyze_trie(trie, cidr)
+                if options.sidecars and response.status == "fetched":
+                    # the summary of the saved response, so it is not parsed
+                    # again
+                    write_sidecar(
+                        response.filename,
+                        make_summary(result, response.filename, response.body),
+                    )
+                    logger.debug(f"Wrote the summary sidecar of {response.filename}")
+                origin_check(result)
+                peer_check(result)
+                if options.prepend_report:
+                    prepend_check(paths)
+                if options.dependency_report:
+                    dependency_check(paths)
+                with checks_setup(rpki_detail=logging.INFO) as checks:
+                    checks.add(result)
+                    checks.finish()
     else:
         parser.print_help()
 
@@ -232,4 +985,5 @@ def main():
 if __name__ == "__main__":
     options, parser = parse_options()
     logger = logger_setup(options)
+    profiler = profiler_setup(options)
     main()
@@ -0,0 +1,75 @@
+"""BGP route checker library
+
+Check origin and peering ASN for a prefix using Qrator API, without the
+process-global state of bgp-route-checker.py.
+
+    from bgp_route_checker import PathAnalyzer, QratorClient
+
+    client = QratorClient()
+    analyzer = PathAnalyzer()
+    result = analyzer.analyze(client.get_paths("111.98.0.0/16"), "111.98.0.0/16")
+    result.origin_asn, result.peers.most_common()
+"""
+
+from .analysis import PathAnalyzer, summarize
+from .anomaly import AnomalyDetector, observation, result_observation
+from .bloom import ScalableBloomFilter
+from .dependency import DependencyReport, analyze_dependencies
+from .exceptions import (
+    BGPRouteCheckerError,
+    InvalidCIDRError,
+    PrefixNotFoundError,
+    PrivateCIDRError,
+    QratorError,
+)
+from .hll import HyperLogLog
+from .incremental import IncrementalAnalyzer
+from .minhash import LSHIndex, MinHasher
+from .pathtrie import PathTrie
+from .persist import WriteBehindWriter
+from .pipeline import Pipeline, Stage
+from .policy import Policy, Violation
+from .prepend import PrependReport, analyze_prepends, rle_path
+from .qrator import QratorClient
+from .results import CheckResult, QratorResponse
+from .sidecar import build_index, summaries
+from .spill import CrossPrefixReport
+from .tsdb import TimeSeriesStore
+from .validate import validate_ipv4network
+
+__all__ = [
+    "AnomalyDetector",
+    "BGPRouteCheckerError",
+    "CheckResult",
+    "CrossPrefixReport",
+    "DependencyReport",
+    "HyperLogLog",
+    "IncrementalAnalyzer",
+    "InvalidCIDRError",
+    "LSHIndex",
+    "MinHasher",
+    "PathAnalyzer",
+    "PathTrie",
+    "Pipeline",
+    "Policy",
+    "PrefixNotFoundError",
+    "PrependReport",
+    "PrivateCIDRError",
+    "QratorClient",
+    "QratorError",
+    "QratorResponse",
+    "ScalableBloomFilter",
+    "Stage",
+    "TimeSeriesStore",
+    "Violation",
+    "WriteBehindWriter",
+    "analyze_dependencies",
+    "analyze_prepends",
+    "build_index",
+    "observation",
+    "result_observation",
+    "rle_path",
+    "summaries",
+    "summarize",
+    "validate_ipv4network",
+]
@@ -0,0 +1,160 @@
+"""Peer ASN aggregation over saved Qrator responses
+
+Streams the paths from saved qrator-<cidr>-<timestamp>.json(.gz) files through
+fixed-size sketches, so memory does not grow with the number of paths. Files
+are split among worker processes and the sketches are merged at the end.
+
+Distinct counts of ASNs and vantage points are kept in HyperLogLog counters,
+globally and per prefix, and can be saved to and merged from a json file.
+"""
+
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from .hll import HyperLogLog
+from .persist import read_saved
+from .sketches import CountMinSketch, SpaceSaving
+
+logger = logging.getLogger(__name__)
+
+
+def iter_saved(filenames):
+    """Yield (cidr, paths) from saved Qrator responses
+
+    Responses are saved as received, so a file that is not a Qrator reply,
+    an error page or a truncated gzip, is skipped with a warning.
+    """
+    for filename in filenames:
+        try:
+            data = json.loads(read_saved(filename))
+        except (OSError, EOFError, ValueError) as e:
+            logger.warning(f"Skipping {filename}: {type(e).__name__}: {e}")
+            continue
+        data = data.get("data") if isinstance(data, dict) else None
+        if not isinstance(data, dict):
+            logger.warning(f"Skipping {filename}: no data in it")
+            continue
+        for cidr, paths in data.items():
+            # null for a prefix not found
+            if paths is None:
+                continue
+            if not isinstance(paths, list) or not all(
+                isinstance(path, str) for path in paths
+            ):
+                logger.warning(f"Skipping {cidr} in {filename}: invalid paths")
+                continue
+            yield cidr, paths
+
+
+def peers_of(paths):
+    """Yield the peer ASN of each path, next to the most common origin ASN"""
+    origins = {}
+    for path in paths:
+        origin = path[path.rfind(",") + 1 :]
+        origins[origin] = origins.get(origin, 0) + 1
+    if not origins:
+        return
+    origin_asn = max(origins, key=origins.get)
+    for path in paths:
+        for asn in reversed(path.split(",")):
+            if asn != origin_asn:
+                yield asn
+                break
+
+
+class PeerAggregate:
+    """Top-k and frequency sketches of peer ASNs"""
+
+    def __init__(self, k=100, epsilon=0.001, delta=0.01):
+        self.top = SpaceSaving(k)
+        self.freq = CountMinSketch(epsilon, delta)
+        self.prefixes = 0
+        # distinct ASNs anywhere in the paths, and distinct vantage points
+        self.asns = HyperLogLog()
+        self.vantages = HyperLogLog()
+        # cidr -> distinct vantage points seeing the prefix
+        self.prefix_vantages = {}
+
+    def add_paths(self, paths, cidr=None):
+        self.prefixes += 1
+        for asn in peers_of(paths):
+            self.top.add(asn)
+            self.freq.add(asn)
+
+        if cidr is not None:
+            vantages = self.prefix_vantages.get(cidr)
+            if vantages is None:
+                vantages = self.prefix_vantages[cidr] = HyperLogLog(10)
+        for path in paths:
+            asns = path.split(",")
+            self.asns.update(asns)
+            self.vantages.add(asns[0])
+            if cidr is not None:
+                vantages.add(asns[0])
+
+    def merge(self, other):
+        self.top.merge(other.top)
+        self.freq.merge(other.freq)
+        self.prefixes += other.prefixes
+        self.merge_distinct(other.asns, other.vantages, other.prefix_vantages)
+        return self
+
+    def merge_distinct(self, asns, vantages, prefix_vantages):
+        self.asns.merge(asns)
+        self.vantages.merge(vantages)
+        for cidr, hll in prefix_vantages.items():
+            if cidr in self.prefix_vantages:
+                self.prefix_vantages[cidr].merge(hll)
+            else:
+                self.prefix_vantages[cidr] = hll
+
+    def save_distinct(self, filename):
+        """Save the distinct counters in a json file"""
+        data = {
+            "asns": self.asns.to_str(),
+            "vantages": self.vantages.to_str(),
+            "prefix_vantages": {
+                cidr: hll.to_str() for cidr, hll in self.prefix_vantages.items()
+            },
+        }
+        with open(filename, "w") as salida:
+            json.dump(data, salida)
+
+    def load_distinct(self, filename):
+        """Merge the distinct counters saved by save_distinct"""
+        with open(filename, "r") as entrada:
+            data = json.load(entrada)
+        self.merge_distinct(
+            HyperLogLog.from_str(data["asns"]),
+            HyperLogLog.from_str(data["vantages"]),
+            {
+                cidr: HyperLogLog.from_str(hll)
+                for cidr, hll in data["prefix_vantages"].items()
+            },
+        )
+
+
+def _aggregate_chunk(filenames, k, epsilon, delta):
+    agg = PeerAggregate(k, epsilon, delta)
+    for cidr, paths in iter_saved(filenames):
+        agg.add_paths(paths, cidr)
+    return agg
+
+
+def aggregate_files(filenames, k=100, epsilon=0.001, delta=0.01, workers=1):
+    """Build a PeerAggregate from saved responses using worker processes"""
+    filenames = list(filenames)
+    if workers <= 1 or len(filenames) <= 1:
+        return _aggregate_chunk(filenames, k, epsilon, delta)
+
+    chunks = [filenames[i::workers] for i in range(workers)]
+    chunks = [chunk for chunk in chunks if chunk]
+    result = PeerAggregate(k, epsilon, delta)
+    with ProcessPoolExecutor(max_workers=len(chunks)) as ex:
+        futures = [
+            ex.submit(_aggregate_chunk, chunk, k, epsilon, delta) for chunk in chunks
+        ]
+        for future in futures:
+            result.merge(future.result())
+    return result
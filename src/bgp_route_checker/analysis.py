@@ -0,0 +1,123 @@
+"""Origin and peer analysis of AS paths"""
+
+import sys
+from collections import Counter
+
+from .results import CheckResult, ranked
+
+__all__ = ["PathAnalyzer", "ranked", "summarize", "transit_asns"]
+
+
+def transit_asns(asns):
+    """Set of transit ASNs of a path given as a sequence of ASNs
+
+    The ASNs between the first one, the vantage point the path was observed
+    at, and the peer next to the origin, other than the origin and the peer.
+    """
+    # prepends collapsed
+    runs = [asn for i, asn in enumerate(asns) if i == 0 or asn != asns[i - 1]]
+    if len(runs) < 4:
+        return set()
+    return set(runs[1:-2]) - {runs[-1], runs[-2]}
+
+
+class PathAnalyzer:
+    """Origin and peer check of comma-delimited AS paths
+
+    Split paths are cached with their ASN strings interned, so the same
+    analyzer reused over many prefixes or refetches splits every distinct path
+    once and keeps one copy of each ASN string. The cache is dropped when it
+    grows beyond max_cached paths.
+    """
+
+    def __init__(self, max_cached=100000):
+        self.max_cached = max_cached
+        self._split = {}
+
+    def split(self, path):
+        asns = self._split.get(path)
+        if asns is None:
+            if len(self._split) >= self.max_cached:
+                self._split.clear()
+            asns = self._split[path] = tuple(map(sys.intern, path.split(",")))
+        return asns
+
+    def origin_check(self, paths):
+        """Counter of origin ASNs, the last entry of each path"""
+        return Counter(self.split(path)[-1] for path in paths)
+
+    def peer_check(self, paths, origin_asn):
+        """Counters of peer ASNs and of peers with path-prepend at origin"""
+        peers = Counter()
+        peers_pathprepend = Counter()
+        for path in paths:
+            asns = self.split(path)
+            # the last ASN other than origin ASN is the peer BGP ASN
+            rest = [asn for asn in asns if asn != origin_asn]
+            if not rest:
+                continue
+            peers[rest[-1]] += 1
+            if len(asns) - len(rest) > 1:
+                peers_pathprepend[rest[-1]] += 1
+        return peers, peers_pathprepend
+
+    def transit_check(self, paths):
+        """Counter of paths each transit ASN is on"""
+        transits = Counter()
+        for path in paths:
+            transits.update(transit_asns(self.split(path)))
+        return transits
+
+    def analyze(self, paths, cidr=None):
+        """CheckResult of the paths, with no origin if there are none"""
+        if not paths:
+            return CheckResult(cidr, None, Counter(), Counter(), Counter(), 0)
+        origins = self.origin_check(paths)
+        # pick the origin, the one with most occurrence if there are multiple,
+        # the first seen of those tied
+        origin_asn = origins.most_common(1)[0][0]
+        peers, peers_pathprepend = self.peer_check(paths, origin_asn)
+        hops = sum(len(self.split(path)) for path in paths)
+        return CheckResult(
+            cidr,
+            origin_asn,
+            origins,
+            peers,
+            peers_pathprepend,
+            len(paths),
+            hops / len(paths),
+            self.transit_check(paths),
+        )
+
+    def analyze_trie(self, trie, cidr=None):
+        """CheckResult of the paths in a PathTrie
+
+        Read off the levels of the trie next to the origin, and the transits
+        off one walk of its nodes, so the cost depends on the distinct suffixes
+        instead of the total number of hops. Same as analyze for paths without
+        an ASN loop.
+        """
+        if not len(trie):
+            return CheckResult(cidr, None, Counter(), Counter(), Counter(), 0)
+        origins = trie.origins()
+        origin_asn = origins.most_common(1)[0][0]
+        peers = trie.peers(origin_asn)
+        # a path ending with another origin has that origin as its peer
+        for asn, count in origins.items():
+            if asn != origin_asn:
+                peers[asn] += count
+        return CheckResult(
+            cidr,
+            origin_asn,
+            origins,
+            peers,
+            trie.prepend_peers(origin_asn),
+            len(trie),
+            trie.hop_count / len(trie),
+            trie.transits(),
+        )
+
+
+def summarize(paths):
+    """Summary dict of origin ASN, peer ASNs and peers with path-prepend"""
+    return PathAnalyzer().analyze(paths).summary()
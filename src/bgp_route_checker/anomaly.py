@@ -0,0 +1,252 @@
+"""Streaming anomaly detection over repeated observations of prefixes
+
+Each prefix keeps a constant amount of state: Welford running mean/variance
+and EWMA for path count, distinct peers and mean path length, plus the set of
+origin ASNs seen. Every new observation is checked against that state and
+folded into it in O(1), so history is never rescanned.
+
+The state is carried over between runs in a sqlite3 file, one row per prefix
+read when the prefix is first observed and written back after each
+observation, so a run over a few prefixes does not load or rewrite the state
+of all the others.
+
+ref) https://en.wikipedia.org/wiki/Algorithms_for_calculating_variance#Welford's_online_algorithm
+"""
+
+import json
+import math
+import sqlite3
+
+MOAS = "moas"
+NEW_ORIGIN = "new-origin"
+PEER_LOSS = "peer-loss"
+PATH_LENGTH_JUMP = "path-length-jump"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prefixes (
+    prefix TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+)
+"""
+
+
+class RunningStat:
+    """Welford mean/variance and EWMA of a stream of values"""
+
+    __slots__ = ("n", "mean", "m2", "ewma")
+
+    def __init__(self, n=0, mean=0.0, m2=0.0, ewma=None):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.ewma = ewma
+
+    def update(self, x, alpha):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        if self.ewma is None:
+            self.ewma = float(x)
+        else:
+            self.ewma += alpha * (x - self.ewma)
+
+    @property
+    def variance(self):
+        if self.n < 2:
+            return 0.0
+        return self.m2 / (self.n - 1)
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+    def as_list(self):
+        return [self.n, self.mean, self.m2, self.ewma]
+
+
+class PrefixState:
+    """Running statistics kept for one prefix"""
+
+    __slots__ = ("path_count", "peer_count", "path_length", "origins")
+
+    def __init__(self, path_count=None, peer_count=None, path_length=None, origins=()):
+        self.path_count = RunningStat(*(path_count or ()))
+        self.peer_count = RunningStat(*(peer_count or ()))
+        self.path_length = RunningStat(*(path_length or ()))
+        self.origins = set(origins)
+
+    def as_dict(self):
+        return {
+            "path_count": self.path_count.as_list(),
+            "peer_count": self.peer_count.as_list(),
+            "path_length": self.path_length.as_list(),
+            "origins": sorted(self.origins),
+        }
+
+
+def observation(paths):
+    """Return (path count, distinct peers, mean path length, origins) for paths
+
+    The peer is the ASN next to the origin of each path, same as peer_check.
+    """
+    origins = set()
+    peers = set()
+    hops = 0
+    for path in paths:
+        asns = path.split(",")
+        hops += len(asns)
+        origin = asns[-1]
+        origins.add(origin)
+        for asn in reversed(asns):
+            if asn != origin:
+                peers.add(asn)
+                break
+    count = len(paths)
+    mean_length = hops / count if count else 0.0
+    return count, len(peers), mean_length, origins
+
+
+def result_observation(result):
+    """Return (path count, distinct peers, mean path length, origins) of a result
+
+    A result dict or CheckResult, so the paths need not be kept around. Its
+    peers are the ones next to the main origin plus the other origins, as
+    counted by PathAnalyzer.
+    """
+    if not isinstance(result, dict):
+        result = result.as_dict()
+    return (
+        result["path_count"],
+        len(result["peers"]),
+        result["mean_path_length"],
+        {asn for asn, _ in result["origins"]},
+    )
+
+
+class AnomalyDetector:
+    """Check observations of prefixes against their running statistics
+
+    Without a state file the statistics are only kept in memory.
+    """
+
+    def __init__(
+        self,
+        state_file=None,
+        alpha=0.3,
+        peer_loss=0.3,
+        zscore=3.0,
+        min_samples=5,
+    ):
+        self.state_file = state_file
+        # EWMA smoothing factor
+        self.alpha = alpha
+        # flag peer loss when distinct peers drop this ratio below the EWMA
+        self.peer_loss = peer_loss
+        # flag path length jump beyond this many standard deviations
+        self.zscore = zscore
+        # observations needed before peer loss and path length are checked
+        self.min_samples = min_samples
+        self.prefixes = {}
+        self.db = None
+        if state_file:
+            self.db = sqlite3.connect(state_file)
+            try:
+                self.db.execute(_SCHEMA)
+            except sqlite3.DatabaseError as e:
+                self.db.close()
+                raise ValueError(f"{state_file} is not an anomaly state file") from e
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _state(self, prefix):
+        # from memory, else from the state file, else a new one
+        state = self.prefixes.get(prefix)
+        if state is None:
+            row = None
+            if self.db is not None:
+                row = self.db.execute(
+                    "SELECT state FROM prefixes WHERE prefix = ?", (prefix,)
+                ).fetchone()
+            state = PrefixState(**json.loads(row[0])) if row else PrefixState()
+            self.prefixes[prefix] = state
+        return state
+
+    def save(self):
+        """Commit the states written so far to the state file"""
+        if self.db is not None:
+            self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            self.db.commit()
+            self.db.close()
+            self.db = None
+
+    def observe(self, prefix, path_count, peer_count, mean_length, origins):
+        """Check one observation and fold it into the state
+
+        Returns a list of (kind, message) tuples, empty if nothing was flagged.
+        """
+        state = self._state(prefix)
+        anomalies = []
+        origins = set(origins)
+
+        # multiple origin ASN at once, or an origin never seen before
+        if len(origins) > 1:
+            anomalies.append((MOAS, f"Multiple origin ASN {sorted(origins)}"))
+        new_origins = origins - state.origins
+        if state.origins and new_origins:
+            anomalies.append(
+                (
+                    NEW_ORIGIN,
+                    f"Origin ASN {sorted(new_origins)} not seen before, "
+                    f"known {sorted(state.origins)}",
+                )
+            )
+
+        if state.peer_count.n >= self.min_samples:
+            expected = state.peer_count.ewma
+            if peer_count < expected * (1 - self.peer_loss):
+                anomalies.append(
+                    (
+                        PEER_LOSS,
+                        f"{peer_count} distinct peers, expected about {expected:.1f}",
+                    )
+                )
+
+        if state.path_length.n >= self.min_samples:
+            stat = state.path_length
+            # floor the deviation so a perfectly stable history is not too eager
+            stdev = max(stat.stdev, 0.1)
+            if abs(mean_length - stat.mean) > self.zscore * stdev:
+                anomalies.append(
+                    (
+                        PATH_LENGTH_JUMP,
+                        f"Mean path length {mean_length:.2f}, "
+                        f"running mean {stat.mean:.2f} stdev {stat.stdev:.2f}",
+                    )
+                )
+
+        state.path_count.update(path_count, self.alpha)
+        state.peer_count.update(peer_count, self.alpha)
+        state.path_length.update(mean_length, self.alpha)
+        state.origins |= origins
+        if self.db is not None:
+            self.db.execute(
+                "INSERT OR REPLACE INTO prefixes VALUES (?, ?)",
+                (prefix, json.dumps(state.as_dict())),
+            )
+
+        return anomalies
+
+    def observe_result(self, result):
+        """Check a result dict or CheckResult of a prefix, like observe"""
+        return self.observe(
+            result["cidr"] if isinstance(result, dict) else result.cidr,
+            *result_observation(result),
+        )
@@ -0,0 +1,312 @@
+"""Batch check of many prefixes
+
+check_prefix runs the fetch, save, parse and analysis of one prefix in turn.
+batch_pipeline runs them as stages of a Pipeline instead, so fetching goes on
+while earlier responses are parsed and analyzed:
+
+    fetch (threads) -> persist -> parse -> analyze (threads or processes)
+        -> store
+
+The raw response is handed to the write-behind writer right after the fetch,
+and only the CIDR and its paths travel on to the analysis, so that is all a
+process pool has to pickle. The store stage keeps the analysis on the
+response, as check_prefix does, so a response cached and not modified is not
+analyzed again. With sidecars, it also writes the summary of each response
+saved next to it, so later questions about it do not parse it again.
+
+prefix_checker picks one of the two for a run, run_batch logs the result of
+each prefix and feeds it to the report.Checks of the run, and check_rib does
+the same for the prefixes of a MRT RIB dump instead of Qrator.
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from contextlib import nullcontext
+from functools import partial
+
+from .analysis import PathAnalyzer
+from .exceptions import BGPRouteCheckerError
+from .mrt import iter_rib
+from .pipeline import Pipeline, Stage
+from .results import CheckResult
+from .sidecar import make_summary, write_sidecar
+from .validate import validate_ipv4network
+
+logger = logging.getLogger(__name__)
+
+STAGE_WORKERS = {"fetch": 4, "persist": 1, "parse": 1, "analyze": 1, "store": 1}
+
+
+def read_prefixes(filename):
+    """List of prefixes in a file, one per line, skipping blanks and # comments"""
+    prefixes = []
+    with open(filename, "r") as entrada:
+        for line in entrada:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                prefixes.append(line)
+    return prefixes
+
+
+def check_prefix(
+    client,
+    analyzer,
+    cidr,
+    writer=None,
+    profiler=None,
+    on_paths=None,
+    sidecars=False,
+):
+    """Fetch, save and analyze one prefix, returning the result dict
+
+    Errors are returned in the dict instead of raised, so one prefix does
+    not stop the batch. With a Profiler, the time of the fetch, parse and
+    analysis stages is recorded. on_paths is called with the CIDR and paths
+    of each response parsed. sidecars writes the summary sidecar of a
+    response saved by the writer.
+    """
+    stage = profiler.stage if profiler else lambda name: nullcontext()
+    try:
+        cidr = validate_ipv4network(cidr)
+        with stage("fetch"):
+            response = client.fetch(cidr)
+        # a cached or not modified response was saved when first fetched
+        if writer is not None and response.status == "fetched":
+            writer.submit(response.filename, response.body, response.wire)
+        result = response.results.get("check")
+        if result is None:
+            with stage("parse"):
+                paths = response.paths
+            if on_paths is not None:
+                on_paths(cidr, paths)
+            with stage("analysis"):
+                result = analyzer.analyze(paths, cidr)
+            response.results["check"] = result
+            if writer is not None and sidecars and response.status == "fetched":
+                write_sidecar(
+                    response.filename,
+                    make_summary(result, response.filename, response.body),
+                )
+    except BGPRouteCheckerError as e:
+        return {"cidr": cidr, "error": f"{type(e).__name__}: {e}"}
+    return result.as_dict()
+
+
+def analyze_paths(analyzer, value):
+    """CheckResult of (cidr, paths) by the analyzer, or value if it already is one"""
+    if isinstance(value, CheckResult):
+        return value
+    cidr, paths = value
+    return analyzer.analyze(paths, cidr)
+
+
+def batch_pipeline(
+    client,
+    writer=None,
+    workers=None,
+    processes=False,
+    maxsize=None,
+    on_paths=None,
+    sidecars=False,
+    analyzer=None,
+):
+    """Pipeline of the fetch, persist, parse and analyze stages of prefixes
+
+    workers overrides STAGE_WORKERS by stage name, processes runs the
+    analysis in a process pool and maxsize is the queue size of every stage,
+    twice its workers by default. analyzer is the PathAnalyzer of the analyze
+    stage, a new one by default, shared by its threads; in a process pool
+    every task gets a copy of it. on_paths is called in the parse stage with
+    the CIDR and paths of each response parsed. sidecars writes the summary
+    sidecar of each response saved by the writer in the store stage.
+    """
+    workers = dict(STAGE_WORKERS, **(workers or {}))
+    # picklable for a process pool, unlike a closure
+    if analyzer is None:
+        analyzer = PathAnalyzer()
+    analyze = partial(analyze_paths, analyzer)
+    sidecars = sidecars and writer is not None
+    # CIDR -> responses parsed, waiting for their analysis
+    parsed = defaultdict(list)
+    lock = threading.Lock()
+
+    def fetch(cidr):
+        return client.fetch(validate_ipv4network(cidr))
+
+    def persist(response):
+        # a cached or not modified response was saved when first fetched
+        if writer is not None and response.status == "fetched":
+            writer.submit(response.filename, response.body, response.wire)
+        return response
+
+    def parse(response):
+        result = response.results.get("check")
+        if result is not None:
+            return result
+        paths = response.paths
+        if on_paths is not None:
+            on_paths(response.cidr, paths)
+        with lock:
+            parsed[response.cidr].append(response)
+        return response.cidr, paths
+
+    def store(result):
+        with lock:
+            pending = parsed.get(result.cidr)
+            if not pending:
+                return result
+            response = pending.pop(0)
+            if not pending:
+                del parsed[result.cidr]
+        response.results["check"] = result
+        if sidecars and response.status == "fetched":
+            write_sidecar(
+                response.filename,
+                make_summary(result, response.filename, response.body),
+            )
+        return result
+
+    stages = [
+        Stage("fetch", fetch, workers["fetch"], maxsize),
+        Stage("persist", persist, workers["persist"], maxsize),
+        Stage("parse", parse, workers["parse"], maxsize),
+        Stage("analyze", analyze, workers["analyze"], maxsize, processes),
+        Stage("store", store, workers["store"], maxsize),
+    ]
+    return Pipeline(stages)
+
+
+def check_prefixes(pipeline, prefixes):
+    """Yield the result dict of each prefix as it comes out of the pipeline
+
+    Like check_prefix, errors are returned in the dict instead of raised.
+    """
+    for cidr, value in pipeline.run(prefixes):
+        if isinstance(value, BGPRouteCheckerError):
+            yield {"cidr": cidr, "error": f"{type(value).__name__}: {value}"}
+        elif isinstance(value, Exception):
+            raise value
+        else:
+            yield value.as_dict()
+
+
+def prefix_checker(
+    client,
+    writer=None,
+    analyzer=None,
+    profiler=None,
+    on_paths=None,
+    sidecars=False,
+    **pipeline_options,
+):
+    """(check, pipeline) where check yields the result dicts of prefixes
+
+    With a Profiler, cProfile and tracemalloc only see their own thread, so
+    the prefixes are checked one at a time by check_prefix, each in its own
+    capture, and pipeline is None. Otherwise they go through a batch_pipeline
+    with the pipeline_options.
+    """
+    if analyzer is None:
+        analyzer = PathAnalyzer()
+    if profiler is not None:
+
+        def check(prefixes):
+            for cidr in prefixes:
+                with profiler.capture(cidr):
+                    yield check_prefix(
+                        client, analyzer, cidr, writer, profiler, on_paths, sidecars
+                    )
+
+        return check, None
+
+    pipeline = batch_pipeline(
+        client,
+        writer,
+        on_paths=on_paths,
+        sidecars=sidecars,
+        analyzer=analyzer,
+        **pipeline_options,
+    )
+    return partial(check_prefixes, pipeline), pipeline
+
+
+def log_pipeline(pipeline):
+    """Log the worker, queue depth and busy/blocked time of each stage"""
+    logger.info(f"Input blocked {pipeline.feed_blocked:.3f}s by backpressure")
+    for name, m in pipeline.metrics().items():
+        logger.info(
+            f"Stage {name}: {m['workers']} "
+            f"{'processes' if m['processes'] else 'threads'}, "
+            f"{m['processed']} done, {m['failed']} failed, "
+            f"busy {m['busy_seconds']:.3f}s, blocked {m['blocked_seconds']:.3f}s, "
+            f"queue depth max {m['max_depth']}/{m['queue_size']} "
+            f"mean {m['mean_depth']:.1f}"
+        )
+
+
+def run_batch(results, checks=None):
+    """Log the result dicts and feed the ones without error to the checks
+
+    Returns the number of results and of errors among them.
+    """
+    count = 0
+    errors = 0
+    for result in results:
+        count += 1
+        cidr = result["cidr"]
+        if "error" in result:
+            errors += 1
+            logger.warning(f"Failed to check {cidr}: {result['error']}")
+            continue
+        logger.info(
+            f"{cidr} origin ASN {result['origin_asn']}, "
+            f"{result['path_count']} paths, peers {result['peers']}"
+        )
+        if checks is not None:
+            checks.add(result)
+    return count, errors
+
+
+def check_rib(
+    filename,
+    prefixes=None,
+    analyzer=None,
+    checks=None,
+    on_paths=None,
+    on_result=None,
+    profiler=None,
+):
+    """Analyze the prefixes of a MRT RIB dump, logging and checking each one
+
+    Returns the number of prefixes. Raises OSError or mrt.MRTError if the
+    dump cannot be read, InvalidCIDRError if a prefix given is not valid.
+    on_paths is called with the CIDR and paths of each prefix before it is
+    analyzed, on_result with the paths and CheckResult once it is logged.
+    """
+    if analyzer is None:
+        analyzer = PathAnalyzer()
+    capture = profiler.capture if profiler else lambda label: nullcontext()
+    stage = profiler.stage if profiler else lambda name: nullcontext()
+    count = 0
+    for cidr, paths in iter_rib(filename, prefixes):
+        count += 1
+        if on_paths is not None:
+            on_paths(cidr, paths)
+        with capture(cidr), stage("analysis"):
+            result = analyzer.analyze(paths, cidr)
+        if result.moas:
+            logger.warning(
+                f"{cidr} multiple origin ASN observed: {result.origins.most_common()}"
+            )
+        logger.info(
+            f"{cidr} origin ASN {result.origin_asn}, {result.path_count} paths, "
+            f"peers {result.peers.most_common()}, "
+            f"path-prepend at origin {result.peers_pathprepend.most_common()}"
+        )
+        if on_result is not None:
+            on_result(paths, result)
+        if checks is not None:
+            checks.add(result)
+    logger.info(f"Checked {count} prefixes from {filename}")
+    return count
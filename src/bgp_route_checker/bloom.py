@@ -0,0 +1,182 @@
+"""Persistent scalable Bloom filter of (prefix, AS path) pairs
+
+The filter lives in one file used through mmap, so it is updated in place
+and only the pages touched are read. It is a chain of Bloom filters: when
+the last one holds its capacity, a new one with growth times the capacity
+and ratio times the false positive rate is appended, so the overall rate
+stays below error_rate however many pairs are added.
+
+A path found in the filter may be new with a probability of at most the
+false positive rate, a path not found is new for certain. At the default
+0.1% rate a pair takes about 2 bytes, so tens of millions of paths fit in
+a few tens of MB.
+
+    header  magic, version, number of slices, initial capacity, error rate,
+            growth, ratio
+    slice   capacity, count, number of hashes, number of bits, then the bits
+
+ref) Almeida et al., Scalable Bloom Filters, 2007
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+
+MAGIC = b"BGPBLOOM"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sIIQdId")
+_SLICE = struct.Struct("<QQIIQ")
+
+
+def _key(cidr, path):
+    return f"{cidr} {path}".encode()
+
+
+def _hashes(key):
+    # two 64-bit hashes for double hashing, the second odd
+    digest = hashlib.blake2b(key, digest_size=16).digest()
+    return (
+        int.from_bytes(digest[:8], "little"),
+        int.from_bytes(digest[8:], "little") | 1,
+    )
+
+
+class ScalableBloomFilter:
+    """Bloom filter of (cidr, path) pairs growing in an mmap file
+
+    The parameters are those of a new file; an existing file keeps its own.
+    """
+
+    def __init__(
+        self, filename, capacity=1000000, error_rate=0.001, growth=2, ratio=0.5
+    ):
+        self.filename = filename
+        self._lock = threading.Lock()
+        if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+            with open(filename, "wb") as salida:
+                salida.write(
+                    _HEADER.pack(MAGIC, VERSION, 0, capacity, error_rate, growth, ratio)
+                )
+        self._file = open(filename, "r+b")
+        self._map()
+        magic, version, _, capacity, error_rate, growth, ratio = _HEADER.unpack_from(
+            self._mm, 0
+        )
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{filename} is not a Bloom filter file")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.ratio = ratio
+        self._load_slices()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _map(self):
+        self._file.seek(0, os.SEEK_END)
+        self._mm = mmap.mmap(self._file.fileno(), self._file.tell())
+
+    def _load_slices(self):
+        # (offset of the slice header, number of hashes, number of bits)
+        self._slices = []
+        count = _HEADER.unpack_from(self._mm, 0)[2]
+        offset = _HEADER.size
+        for _ in range(count):
+            _, _, k, _, bits = _SLICE.unpack_from(self._mm, offset)
+            self._slices.append((offset, k, bits))
+            offset += _SLICE.size + bits // 8
+
+    def _add_slice(self):
+        i = len(self._slices)
+        capacity = int(self.capacity * self.growth**i)
+        # the first slice gets (1 - ratio) of the error, the next ones less
+        p = self.error_rate * (1 - self.ratio) * self.ratio**i
+        k = max(1, math.ceil(math.log2(1 / p)))
+        bits = math.ceil(capacity * abs(math.log(p)) / math.log(2) ** 2)
+        bits = (bits + 63) // 64 * 64
+
+        self._mm.close()
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        self._file.write(_SLICE.pack(capacity, 0, k, 0, bits))
+        self._file.truncate(offset + _SLICE.size + bits // 8)
+        self._file.flush()
+        self._map()
+        struct.pack_into("<I", self._mm, 12, i + 1)
+        self._slices.append((offset, k, bits))
+
+    def __len__(self):
+        return sum(_SLICE.unpack_from(self._mm, o)[1] for o, _, _ in self._slices)
+
+    def __contains__(self, pair):
+        return self._contains(*_hashes(_key(*pair)))
+
+    def _contains(self, h1, h2):
+        mm = self._mm
+        for offset, k, bits in self._slices:
+            base = offset + _SLICE.size
+            for i in range(k):
+                bit = (h1 + i * h2) % bits
+                if not mm[base + (bit >> 3)] & (1 << (bit & 7)):
+                    break
+            else:
+                return True
+        return False
+
+    def add(self, cidr, path):
+        """Add a pair, True if it was not in the filter"""
+        return bool(self.add_paths(cidr, [path]))
+
+    def add_paths(self, cidr, paths):
+        """Add the paths of a prefix, returning those not in the filter"""
+        new = []
+        with self._lock:
+            for path in paths:
+                h1, h2 = _hashes(_key(cidr, path))
+                if self._contains(h1, h2):
+                    continue
+                new.append(path)
+                if not self._slices:
+                    self._add_slice()
+                offset, k, bits = self._slices[-1]
+                capacity, count = _SLICE.unpack_from(self._mm, offset)[:2]
+                if count >= capacity:
+                    self._add_slice()
+                    offset, k, bits = self._slices[-1]
+                    count = 0
+                base = offset + _SLICE.size
+                mm = self._mm
+                for i in range(k):
+                    bit = (h1 + i * h2) % bits
+                    mm[base + (bit >> 3)] |= 1 << (bit & 7)
+                struct.pack_into("<Q", mm, offset + 8, count + 1)
+        return new
+
+    def false_positive_rate(self):
+        """Upper bound of the rate of paths wrongly found in the filter"""
+        rate = 1.0
+        for i in range(len(self._slices)):
+            rate *= 1 - self.error_rate * (1 - self.ratio) * self.ratio**i
+        return 1 - rate
+
+    def size(self):
+        """Bytes of the filter file"""
+        return len(self._mm)
+
+    def flush(self):
+        self._mm.flush()
+
+    def close(self):
+        if not self._mm.closed:
+            self._mm.flush()
+            self._mm.close()
+        self._file.close()
@@ -0,0 +1,175 @@
+"""Caches with time-to-live for each entry"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from .results import QratorResponse
+
+
+class TTLCache:
+    """Thread-safe dict-like cache whose entries expire after ttl seconds"""
+
+    def __init__(self, ttl=300, maxsize=10000, clock=time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < self.clock():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                self._evict()
+            self._data[key] = (self.clock() + ttl, value)
+
+    def _evict(self):
+        # drop the expired entries, or the oldest one if none has expired
+        now = self.clock()
+        expired = [k for k, (expires, _) in self._data.items() if expires < now]
+        for k in expired:
+            del self._data[k]
+        if not expired:
+            del self._data[next(iter(self._data))]
+
+
+class CachedResponse:
+    """QratorResponse kept with its validators for conditional refresh"""
+
+    __slots__ = ("response", "etag", "last_modified", "expires")
+
+    def __init__(self, response, etag=None, last_modified=None, expires=0.0):
+        self.response = response
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    def fresh(self, now=None):
+        return (now or time.time()) < self.expires
+
+
+class ResponseCache:
+    """Qrator responses by CIDR with ETag/Last-Modified validators
+
+    Up to maxsize entries stay in memory, the least recently used one dropped
+    beyond it, and if directory is given they are also saved there so the
+    validators survive between runs and an entry dropped is loaded again. A
+    stale entry is not dropped: the client uses its validators for a
+    conditional request and re-arms the ttl on 304 Not Modified.
+    """
+
+    def __init__(self, ttl=300, directory=None, maxsize=10000):
+        self.ttl = ttl
+        self.directory = directory
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, cidr):
+        return os.path.join(self.directory, cidr.replace("/", "-"))
+
+    def get(self, cidr):
+        with self._lock:
+            entry = self._entries.get(cidr)
+            if entry is not None:
+                self._entries.move_to_end(cidr)
+        if entry is None and self.directory:
+            entry = self._load(cidr)
+            if entry is not None:
+                self._keep(cidr, entry)
+        return entry
+
+    def _keep(self, cidr, entry):
+        with self._lock:
+            self._entries[cidr] = entry
+            self._entries.move_to_end(cidr)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def put(self, response):
+        headers = {k.lower(): v for k, v in response.headers.items()}
+        entry = CachedResponse(
+            response,
+            headers.get("etag"),
+            headers.get("last-modified"),
+            time.time() + self.ttl,
+        )
+        self._keep(response.cidr, entry)
+        if self.directory:
+            self._save(entry)
+        return entry
+
+    def rearm(self, entry):
+        """Extend a revalidated entry by another ttl"""
+        entry.expires = time.time() + self.ttl
+        if self.directory:
+            self._save(entry, body=False)
+
+    def _save(self, entry, body=True):
+        path = self._path(entry.response.cidr)
+        if body:
+            with open(path + ".body.tmp", "wb") as salida:
+                salida.write(entry.response.body)
+            os.replace(path + ".body.tmp", path + ".body")
+        meta = {
+            "cidr": entry.response.cidr,
+            "url": entry.response.url,
+            "headers": entry.response.headers,
+            "timestamp": entry.response.timestamp.isoformat(),
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "expires": entry.expires,
+            "metrics": entry.response.metrics,
+        }
+        with open(path + ".meta.tmp", "w") as salida:
+            json.dump(meta, salida)
+        os.replace(path + ".meta.tmp", path + ".meta")
+
+    def _load(self, cidr):
+        path = self._path(cidr)
+        try:
+            with open(path + ".meta", "r") as entrada:
+                meta = json.load(entrada)
+            with open(path + ".body", "rb") as entrada:
+                body = entrada.read()
+        except (OSError, ValueError):
+            return None
+        # transfer metrics of the fetch, not saved by older versions
+        metrics = meta.get("metrics") or {
+            "encoding": "identity",
+            "wire_bytes": 0,
+            "body_bytes": len(body),
+            "compression_ratio": 1.0,
+            "fetch_seconds": 0.0,
+        }
+        response = QratorResponse(
+            meta["cidr"],
+            meta["url"],
+            body,
+            meta["headers"],
+            datetime.fromisoformat(meta["timestamp"]),
+            metrics=metrics,
+        )
+        return CachedResponse(
+            response, meta["etag"], meta["last_modified"], meta["expires"]
+        )
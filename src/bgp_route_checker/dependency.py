@@ -0,0 +1,152 @@
+"""Transit dependency analysis
+
+The AS paths of a prefix are merged into one graph, edges pointing from the
+origin toward the vantage points, with prepends collapsed. A virtual root
+leads to every origin and every vantage point leads to a virtual sink, so
+the ASNs dominating the sink are the ones every route through the graph from
+the origin to any vantage point goes through: the single points of failure
+in reaching the prefix. Dominators are computed with the iterative algorithm
+of Cooper, Harvey and Kennedy, which is close to linear on graphs as shallow
+as AS path graphs.
+
+Per-ASN coverage, the share of the observed paths going through the ASN,
+gives the chokepoints that nearly every path depends on. Identical paths are
+counted once with their number, so the cost depends on the distinct paths.
+"""
+
+from collections import Counter, defaultdict
+
+from .prepend import rle_path
+from .results import ranked
+
+# virtual nodes, never an ASN
+_ROOT = "^"
+_SINK = "$"
+
+
+class DependencyReport:
+    """Path coverage and dominators of the ASNs in a set of AS paths"""
+
+    def __init__(self):
+        self.path_count = 0
+        # ASN -> number of paths going through it
+        self.coverage = Counter()
+        # origin ASN -> number of paths
+        self.origins = Counter()
+        # ASN -> ASNs next to it toward the vantage points
+        self.succ = defaultdict(set)
+        self._idom = None
+
+    def add(self, path, count=1):
+        """Add a path, observed count times"""
+        hops = [asn for asn, _ in rle_path(path)]
+        if not hops:
+            return
+
+        self.path_count += count
+        self.origins[hops[-1]] += count
+        for asn in set(hops):
+            self.coverage[asn] += count
+        prev = _ROOT
+        for asn in reversed(hops):
+            self.succ[prev].add(asn)
+            prev = asn
+        self.succ[prev].add(_SINK)
+        self._idom = None
+
+    def share(self, asn):
+        """Share of the paths going through the ASN"""
+        return self.coverage[asn] / self.path_count if self.path_count else 0.0
+
+    def chokepoints(self, threshold=0.9):
+        """List of (asn, share) of non-origin ASNs on at least threshold of paths"""
+        return [
+            (asn, count / self.path_count)
+            for asn, count in ranked(self.coverage)
+            if asn not in self.origins and count >= threshold * self.path_count
+        ]
+
+    def dominators(self, asn=_SINK):
+        """ASNs every route from the origin to the ASN goes through, origin first
+
+        By default the ASNs all vantage points depend on.
+        """
+        idom = self._dominator_tree()
+        if asn not in idom:
+            return []
+        chain = []
+        node = idom[asn]
+        while node != _ROOT:
+            chain.append(node)
+            node = idom[node]
+        chain.reverse()
+        return chain
+
+    def _dominator_tree(self):
+        # immediate dominator of each node reachable from the root
+        if self._idom is not None:
+            return self._idom
+
+        # postorder by an iterative depth-first search
+        order = []
+        index = {}
+        seen = {_ROOT}
+        stack = [(_ROOT, iter(self.succ[_ROOT]))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child not in seen:
+                    seen.add(child)
+                    stack.append((child, iter(self.succ.get(child, ()))))
+                    break
+            else:
+                stack.pop()
+                index[node] = len(order)
+                order.append(node)
+
+        preds = defaultdict(list)
+        for node in order:
+            for child in self.succ.get(node, ()):
+                preds[child].append(node)
+
+        def intersect(a, b):
+            while a != b:
+                while index[a] < index[b]:
+                    a = idom[a]
+                while index[b] < index[a]:
+                    b = idom[b]
+            return a
+
+        idom = {_ROOT: _ROOT}
+        changed = True
+        while changed:
+            changed = False
+            # reverse postorder, root excluded
+            for node in reversed(order[:-1]):
+                new = None
+                for p in preds[node]:
+                    if p in idom:
+                        new = p if new is None else intersect(p, new)
+                if idom.get(node) != new:
+                    idom[node] = new
+                    changed = True
+
+        self._idom = idom
+        return idom
+
+    def as_dict(self, threshold=0.9):
+        return {
+            "path_count": self.path_count,
+            "origins": dict(self.origins),
+            "coverage": {asn: self.share(asn) for asn, _ in ranked(self.coverage)},
+            "dominators": self.dominators(),
+            "chokepoints": self.chokepoints(threshold),
+        }
+
+
+def analyze_dependencies(paths):
+    """Build a DependencyReport from an iterable of AS paths"""
+    report = DependencyReport()
+    for path, count in Counter(paths).items():
+        report.add(path, count)
+    return report
@@ -0,0 +1,21 @@
+"""Exceptions raised by bgp_route_checker"""
+
+
+class BGPRouteCheckerError(Exception):
+    """Base class of the errors raised by bgp_route_checker"""
+
+
+class InvalidCIDRError(BGPRouteCheckerError, ValueError):
+    """The given string is not an IPv4 prefix this package can check"""
+
+
+class PrivateCIDRError(InvalidCIDRError):
+    """The given prefix is on private IP range"""
+
+
+class QratorError(BGPRouteCheckerError):
+    """Failed to get the paths data from Qrator API"""
+
+
+class PrefixNotFoundError(BGPRouteCheckerError):
+    """Qrator has no paths data for the given prefix"""
@@ -0,0 +1,93 @@
+"""HyperLogLog distinct counter
+
+Estimates the number of distinct items with 2**p one-byte registers, with a
+standard error of about 1.04/sqrt(2**p): 1.6% in 4 KB for the default p=12.
+Counters of the same p merge by taking the register maximum, so counts from
+different days or workers roll up without the items themselves.
+
+ref) Flajolet et al., HyperLogLog: the analysis of a near-optimal cardinality
+estimation algorithm, 2007
+"""
+
+import base64
+import hashlib
+import math
+
+
+def _hash64(item):
+    if isinstance(item, str):
+        item = item.encode()
+    return int.from_bytes(hashlib.blake2b(item, digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """Mergeable distinct count estimate"""
+
+    def __init__(self, p=12):
+        if not 4 <= p <= 16:
+            raise ValueError("p must be between 4 and 16")
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add(self, item):
+        x = _hash64(item)
+        # first p bits pick the register, the rest give the rank
+        idx = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def count(self):
+        m = self.m
+        if m == 16:
+            alpha = 0.673
+        elif m == 32:
+            alpha = 0.697
+        elif m == 64:
+            alpha = 0.709
+        else:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0**-r for r in self.registers)
+
+        # linear counting for small cardinalities
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(estimate)
+
+    __len__ = count
+
+    @property
+    def error(self):
+        """Relative standard error of the estimate"""
+        return 1.04 / math.sqrt(self.m)
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLog of different p")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def to_bytes(self):
+        return bytes([self.p]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data):
+        hll = cls(data[0])
+        if len(data) != hll.m + 1:
+            raise ValueError("Unexpected HyperLogLog data length")
+        hll.registers = bytearray(data[1:])
+        return hll
+
+    def to_str(self):
+        return base64.b64encode(self.to_bytes()).decode()
+
+    @classmethod
+    def from_str(cls, data):
+        return cls.from_bytes(base64.b64decode(data))
@@ -0,0 +1,175 @@
+"""Incremental origin/peer analysis between consecutive fetches
+
+For each prefix the previous path multiset is kept with counters derived from
+it. A new fetch is compared with the previous one and only the added and
+removed paths are applied to the counters, so re-analysis cost scales with
+the churn instead of the total number of paths.
+
+The counters are kept per origin of each path, so the summary stays the same
+as a full recompute by analysis.summarize even when the most common origin
+changes:
+
+- a path ending with the chosen origin has its peer next to the origin run
+- a path ending with another origin has that origin as its peer
+"""
+
+from collections import Counter, defaultdict
+
+from .analysis import transit_asns
+from .results import ranked
+
+
+def _derive(path):
+    """Return (origin, own peer, ASNs appearing more than once, transit ASNs)
+    of a path"""
+    asns = path.split(",")
+    origin = asns[-1]
+    peer = None
+    for asn in reversed(asns):
+        if asn != origin:
+            peer = asn
+            break
+    seen = set()
+    repeated = set()
+    for asn in asns:
+        if asn in seen:
+            repeated.add(asn)
+        seen.add(asn)
+    return origin, peer, repeated, transit_asns(asns)
+
+
+def _bump(counter, key, n):
+    counter[key] += n
+    if not counter[key]:
+        del counter[key]
+
+
+class _PrefixCounters:
+    __slots__ = (
+        "paths",
+        "origins",
+        "peers",
+        "prepend",
+        "repeated",
+        "transits",
+        "hops",
+        "origin_asn",
+    )
+
+    def __init__(self):
+        self.paths = Counter()
+        # path origin -> count
+        self.origins = Counter()
+        # path origin -> Counter of peers next to it
+        self.peers = defaultdict(Counter)
+        # path origin -> Counter of peers, for paths repeating the origin
+        self.prepend = defaultdict(Counter)
+        # ASN -> Counter of path origins, for paths repeating the ASN
+        # elsewhere than at their own origin
+        self.repeated = defaultdict(Counter)
+        # transit ASN -> count
+        self.transits = Counter()
+        # total number of ASNs in all paths, for the mean path length
+        self.hops = 0
+        # most common origin, the first seen in the paths of those tied
+        self.origin_asn = None
+
+    def apply(self, path, n):
+        origin, peer, repeated, transits = _derive(path)
+        self.hops += n * (path.count(",") + 1)
+        _bump(self.paths, path, n)
+        _bump(self.origins, origin, n)
+        if peer is not None:
+            _bump(self.peers[origin], peer, n)
+            if origin in repeated:
+                _bump(self.prepend[origin], peer, n)
+        for asn in repeated:
+            if asn != origin:
+                _bump(self.repeated[asn], origin, n)
+        for asn in transits:
+            _bump(self.transits, asn, n)
+
+
+class IncrementalAnalyzer:
+    """Keep per-prefix counters and update them with path deltas"""
+
+    def __init__(self):
+        self.prefixes = {}
+        # number of paths added and removed by the last update
+        self.last_churn = 0
+
+    def update(self, cidr, paths):
+        """Apply the difference from the previous paths and return the summary"""
+        state = self.prefixes.get(cidr)
+        if state is None:
+            state = self.prefixes[cidr] = _PrefixCounters()
+
+        new = Counter(paths)
+        churn = 0
+        for path, n in state.paths.items() - new.items():
+            # removed, or count changed
+            delta = new.get(path, 0) - n
+            state.apply(path, delta)
+            churn += abs(delta)
+        for path, n in new.items():
+            if path not in state.paths:
+                state.apply(path, n)
+                churn += n
+        self.last_churn = churn
+        state.origin_asn = self._origin(state.origins, new)
+
+        return self.summary(cidr)
+
+    @staticmethod
+    def _origin(origins, paths):
+        # most common origin, tied ones ordered by the path they end first
+        # as Counter.most_common of a full recompute does
+        if not origins:
+            return None
+        top = max(origins.values())
+        tied = {origin for origin, n in origins.items() if n == top}
+        if len(tied) == 1:
+            return tied.pop()
+        for path in paths:
+            origin = path[path.rfind(",") + 1 :]
+            if origin in tied:
+                return origin
+
+    def forget(self, cidr):
+        self.prefixes.pop(cidr, None)
+
+    def summary(self, cidr):
+        """Same dict as analysis.summarize for the current paths of cidr"""
+        state = self.prefixes[cidr]
+        if state.origin_asn is None:
+            return {
+                "origin_asn": None,
+                "origins": [],
+                "peers": [],
+                "peers_pathprepend": [],
+                "transits": [],
+                "path_count": 0,
+                "mean_path_length": 0.0,
+            }
+        origin_asn = state.origin_asn
+
+        # paths ending with another origin have it as peer
+        peers = Counter(state.peers[origin_asn])
+        for origin, n in state.origins.items():
+            if origin != origin_asn:
+                peers[origin] += n
+
+        peers_pathprepend = Counter(state.prepend[origin_asn])
+        for origin, n in state.repeated[origin_asn].items():
+            peers_pathprepend[origin] += n
+
+        path_count = sum(state.origins.values())
+        return {
+            "origin_asn": origin_asn,
+            "origins": ranked(state.origins),
+            "peers": ranked(peers),
+            "peers_pathprepend": ranked(peers_pathprepend),
+            "transits": ranked(state.transits),
+            "path_count": path_count,
+            "mean_path_length": state.hops / path_count,
+        }
@@ -0,0 +1,159 @@
+"""MinHash signatures and LSH clustering of prefixes by routing profile
+
+The routing profile of a prefix is the set of its peer ASNs, the upstreams
+next to the origin, of the peers it is prepended toward and of the transit
+ASNs its paths go through. A MinHash
+signature of the set estimates the Jaccard similarity of two profiles from
+the share of equal signature values. LSH banding splits the signatures into
+bands of rows, and only prefixes with an identical band land in a common
+bucket, so similar pairs are found without comparing all pairs: a pair of
+similarity s is a candidate with probability 1 - (1 - s**rows)**bands.
+
+Candidates are kept when their estimated similarity reaches the threshold,
+and grouped into clusters by union-find. A prefix left alone is an outlier.
+
+Signatures are saved per snapshot in a json file, so clustering an inventory
+only reads the signatures back.
+
+ref) Leskovec, Rajaraman and Ullman, Mining of Massive Datasets, ch. 3
+"""
+
+import hashlib
+import json
+import random
+from collections import defaultdict
+
+# Mersenne prime above the 61-bit hash values
+_PRIME = (1 << 61) - 1
+
+
+def _hash(item):
+    return int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), "big")
+
+
+def features(result):
+    """Routing profile set of a result dict or CheckResult"""
+    if not isinstance(result, dict):
+        result = result.as_dict()
+    profile = set()
+    for asn, _ in result["peers"]:
+        profile.add("peer:" + asn)
+    for asn, _ in result["peers_pathprepend"]:
+        profile.add("prepend:" + asn)
+    # not in results saved before transits were analyzed
+    for asn, _ in result.get("transits", ()):
+        profile.add("transit:" + asn)
+    return profile
+
+
+class MinHasher:
+    """MinHash signatures of num_perm values from seeded universal hashes"""
+
+    def __init__(self, num_perm=128, seed=1):
+        self.num_perm = num_perm
+        self.seed = seed
+        rng = random.Random(seed)
+        self._params = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, items):
+        """List of num_perm minimum hash values of the items"""
+        hashes = [_hash(item) & _PRIME for item in items]
+        if not hashes:
+            return [_PRIME] * self.num_perm
+        return [min((a * h + b) % _PRIME for h in hashes) for a, b in self._params]
+
+    @staticmethod
+    def jaccard(a, b):
+        """Estimated Jaccard similarity of the sets of two signatures"""
+        return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class LSHIndex:
+    """Buckets of signatures by band, for candidate pairs of similar keys
+
+    Keys with an identical signature, common for prefixes of one network,
+    share one entry in the buckets, so a large group of them does not make
+    a quadratic number of candidate pairs.
+    """
+
+    def __init__(self, bands=32, rows=4):
+        self.bands = bands
+        self.rows = rows
+        self.signatures = {}
+        # signature -> first key added with it, and the keys added after it
+        self._first = {}
+        self._same = defaultdict(list)
+        self._buckets = defaultdict(list)
+
+    def add(self, key, signature):
+        if len(signature) < self.bands * self.rows:
+            raise ValueError(
+                f"Signature of {len(signature)} values is shorter than "
+                f"{self.bands} bands of {self.rows} rows"
+            )
+        self.signatures[key] = signature
+        first = self._first.setdefault(tuple(signature), key)
+        if first != key:
+            self._same[first].append(key)
+            return
+        for band in range(self.bands):
+            rows = signature[band * self.rows : (band + 1) * self.rows]
+            self._buckets[(band, tuple(rows))].append(key)
+
+    def candidates(self):
+        """Set of (key, key) pairs of distinct signatures sharing a band"""
+        pairs = set()
+        for keys in self._buckets.values():
+            for i, a in enumerate(keys):
+                for b in keys[i + 1 :]:
+                    pairs.add((a, b) if a < b else (b, a))
+        return pairs
+
+    def clusters(self, threshold=0.5):
+        """Lists of keys linked by estimated similarity >= threshold
+
+        Largest cluster first, single keys, the outliers, last.
+        """
+        parent = {key: key for key in self.signatures}
+
+        def find(key):
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        for first, keys in self._same.items():
+            for key in keys:
+                parent[key] = first
+
+        for a, b in self.candidates():
+            if MinHasher.jaccard(self.signatures[a], self.signatures[b]) >= threshold:
+                parent[find(a)] = find(b)
+
+        groups = defaultdict(list)
+        for key in self.signatures:
+            groups[find(key)].append(key)
+        return sorted(
+            (sorted(keys) for keys in groups.values()), key=lambda g: (-len(g), g)
+        )
+
+
+def save_signatures(filename, hasher, signatures):
+    """Save the signatures by key with the hasher parameters in a json file"""
+    data = {
+        "num_perm": hasher.num_perm,
+        "seed": hasher.seed,
+        "signatures": signatures,
+    }
+    with open(filename, "w") as salida:
+        json.dump(data, salida)
+
+
+def load_signatures(filename):
+    """(MinHasher, signatures by key) saved by save_signatures"""
+    with open(filename, "r") as entrada:
+        data = json.load(entrada)
+    return MinHasher(data["num_perm"], data["seed"]), data["signatures"]
@@ -0,0 +1,206 @@
+"""MRT TABLE_DUMP_V2 RIB dump reader
+
+Reads AS paths of every prefix, or of a given set of prefixes, in one
+sequential pass over a RIB dump such as the ones published by RIPE RIS or
+RouteViews. Plain, gzip and bz2 files are read with the standard library.
+
+Paths are comma-delimited ASN strings like the ones from Qrator API, starting
+at the peer the route was received from, so they feed the same analysis. The
+peer ASN is put in front when the peer did not prepend itself, as route
+servers do. An AS_SET is kept as one entry with its members in braces, for
+example "{64500 64501}".
+
+ref) https://datatracker.ietf.org/doc/html/rfc6396
+"""
+
+import bz2
+import gzip
+import ipaddress
+import struct
+
+from .exceptions import InvalidCIDRError
+
+TABLE_DUMP_V2 = 13
+
+PEER_INDEX_TABLE = 1
+RIB_IPV4_UNICAST = 2
+RIB_IPV4_MULTICAST = 3
+RIB_IPV6_UNICAST = 4
+RIB_IPV6_MULTICAST = 5
+
+ATTR_AS_PATH = 2
+
+AS_SET = 1
+AS_SEQUENCE = 2
+
+_RIB_SUBTYPES = (
+    RIB_IPV4_UNICAST,
+    RIB_IPV4_MULTICAST,
+    RIB_IPV6_UNICAST,
+    RIB_IPV6_MULTICAST,
+)
+
+_HEADER = struct.Struct("!IHHI")
+
+
+class MRTError(ValueError):
+    """The file is not a readable MRT TABLE_DUMP_V2 dump"""
+
+
+def open_dump(filename):
+    """Open a plain, gzip or bz2 compressed file by its magic bytes"""
+    with open(filename, "rb") as f:
+        magic = f.read(3)
+    if magic[:2] == b"\x1f\x8b":
+        return gzip.open(filename, "rb")
+    if magic == b"BZh":
+        return bz2.open(filename, "rb")
+    return open(filename, "rb", buffering=1 << 20)
+
+
+def _records(f):
+    while True:
+        header = f.read(_HEADER.size)
+        if not header:
+            return
+        if len(header) < _HEADER.size:
+            raise MRTError("Truncated MRT header")
+        _, mrt_type, subtype, length = _HEADER.unpack(header)
+        body = f.read(length)
+        if len(body) < length:
+            raise MRTError("Truncated MRT record")
+        yield mrt_type, subtype, body
+
+
+def _peer_index(body):
+    """List of peer ASN strings by peer index"""
+    view_len = struct.unpack_from("!H", body, 4)[0]
+    offset = 6 + view_len
+    count = struct.unpack_from("!H", body, offset)[0]
+    offset += 2
+    peers = []
+    for _ in range(count):
+        peer_type = body[offset]
+        offset += 1 + 4
+        offset += 16 if peer_type & 1 else 4
+        if peer_type & 2:
+            asn = struct.unpack_from("!I", body, offset)[0]
+            offset += 4
+        else:
+            asn = struct.unpack_from("!H", body, offset)[0]
+            offset += 2
+        peers.append(str(asn))
+    return peers
+
+
+def _as_path(attrs):
+    """List of ASN strings of the AS_PATH attribute, 4-byte ASNs"""
+    offset = 0
+    end = len(attrs)
+    while offset < end:
+        flags = attrs[offset]
+        attr_type = attrs[offset + 1]
+        if flags & 0x10:
+            length = struct.unpack_from("!H", attrs, offset + 2)[0]
+            offset += 4
+        else:
+            length = attrs[offset + 2]
+            offset += 3
+        if attr_type == ATTR_AS_PATH:
+            return _segments(attrs[offset : offset + length])
+        offset += length
+    return []
+
+
+def _segments(data):
+    asns = []
+    offset = 0
+    while offset < len(data):
+        seg_type = data[offset]
+        count = data[offset + 1]
+        offset += 2
+        seg = struct.unpack_from(f"!{count}I", data, offset)
+        offset += 4 * count
+        if seg_type == AS_SEQUENCE:
+            asns.extend(map(str, seg))
+        elif seg_type == AS_SET:
+            asns.append("{" + " ".join(map(str, sorted(seg))) + "}")
+        # confederation segments are not seen outside the confederation
+    return asns
+
+
+def _prefix(body):
+    plen = body[4]
+    nbytes = (plen + 7) // 8
+    raw = body[5 : 5 + nbytes]
+    return plen, raw, 5 + nbytes
+
+
+def _cidr(plen, raw, v6):
+    size = 16 if v6 else 4
+    addr = raw + bytes(size - len(raw))
+    if v6:
+        return f"{ipaddress.IPv6Address(addr)}/{plen}"
+    return f"{ipaddress.IPv4Address(addr)}/{plen}"
+
+
+def _rib_paths(body, offset, peers):
+    count = struct.unpack_from("!H", body, offset)[0]
+    offset += 2
+    paths = []
+    for _ in range(count):
+        peer_index, _, attr_len = struct.unpack_from("!HIH", body, offset)
+        offset += 8
+        asns = _as_path(body[offset : offset + attr_len])
+        offset += attr_len
+        peer_asn = peers[peer_index]
+        if not asns or asns[0] != peer_asn:
+            asns.insert(0, peer_asn)
+        paths.append(",".join(asns))
+    return paths
+
+
+def _filter_keys(prefixes):
+    keys = set()
+    for cidr in prefixes:
+        try:
+            network = ipaddress.ip_network(cidr)
+        except ValueError as e:
+            raise InvalidCIDRError(
+                f"{cidr} is not a network to look up: {e}."
+            ) from None
+        plen = network.prefixlen
+        raw = network.network_address.packed[: (plen + 7) // 8]
+        keys.add((network.version == 6, plen, raw))
+    return keys
+
+
+def iter_rib(filename, prefixes=None):
+    """Yield (cidr, list of paths) for each prefix in a TABLE_DUMP_V2 dump
+
+    If prefixes is given, only those prefixes are decoded, InvalidCIDRError
+    if one of them is not a network address with its prefix length.
+    """
+    keys = _filter_keys(prefixes) if prefixes is not None else None
+    peers = None
+    with open_dump(filename) as f:
+        for mrt_type, subtype, body in _records(f):
+            if mrt_type != TABLE_DUMP_V2:
+                continue
+            try:
+                if subtype == PEER_INDEX_TABLE:
+                    peers = _peer_index(body)
+                    continue
+                if subtype not in _RIB_SUBTYPES:
+                    continue
+                if peers is None:
+                    raise MRTError("RIB entry before PEER_INDEX_TABLE")
+
+                v6 = subtype in (RIB_IPV6_UNICAST, RIB_IPV6_MULTICAST)
+                plen, raw, offset = _prefix(body)
+                if keys is not None and (v6, plen, raw) not in keys:
+                    continue
+                paths = _rib_paths(body, offset, peers)
+            except (struct.error, IndexError) as e:
+                raise MRTError(f"Malformed TABLE_DUMP_V2 record: {e}") from e
+            yield _cidr(plen, raw, v6), paths
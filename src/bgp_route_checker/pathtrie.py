@@ -0,0 +1,180 @@
+"""Suffix trie of AS paths
+
+AS paths observed for one prefix share long suffixes: every vantage point's
+path ends with the same few transit ASNs and the (possibly prepended) origin.
+PathTrie stores the paths reversed, origin first, so that the shared suffixes
+are stored once and each node keeps the number of paths going through it.
+
+Origin, peer and prepend-at-origin summaries are read off the top levels of
+the trie, and transit ASNs off one walk of its nodes, so their cost depends on
+the number of distinct suffixes and not on the total number of hops.
+"""
+
+from collections import Counter
+
+
+class _Node:
+    __slots__ = ("children", "count", "end")
+
+    def __init__(self):
+        self.children = {}
+        # number of paths going through this node
+        self.count = 0
+        # number of paths ending at this node
+        self.end = 0
+
+
+class PathTrie:
+    """Reversed-path tree of comma-delimited AS paths with counts per node"""
+
+    def __init__(self, paths=()):
+        self.root = _Node()
+        self.node_count = 0
+        # total number of ASNs in the stored paths
+        self.hop_count = 0
+        for path in paths:
+            self.insert(path)
+
+    def __len__(self):
+        return self.root.count
+
+    def __contains__(self, path):
+        node = self._find(path)
+        return node is not None and node.end > 0
+
+    @staticmethod
+    def _hops(path):
+        if isinstance(path, str):
+            path = path.split(",")
+        return reversed(path)
+
+    def _find(self, path):
+        node = self.root
+        for asn in self._hops(path):
+            node = node.children.get(asn)
+            if node is None:
+                return None
+        return node
+
+    def insert(self, path):
+        """Add one path, given as comma-delimited string or list of ASNs"""
+        node = self.root
+        node.count += 1
+        for asn in self._hops(path):
+            child = node.children.get(asn)
+            if child is None:
+                child = node.children[asn] = _Node()
+                self.node_count += 1
+            child.count += 1
+            self.hop_count += 1
+            node = child
+        node.end += 1
+
+    def remove(self, path):
+        """Remove one occurrence of a path, pruning nodes no longer used"""
+        if path not in self:
+            raise KeyError(path)
+
+        node = self.root
+        node.count -= 1
+        self.hop_count -= sum(1 for _ in self._hops(path))
+        for asn in self._hops(path):
+            child = node.children[asn]
+            child.count -= 1
+            if child.count == 0:
+                # the rest of the branch was only used by this path
+                del node.children[asn]
+                self.node_count -= self._size(child)
+                return
+            node = child
+        node.end -= 1
+
+    @staticmethod
+    def _size(node):
+        size = 1
+        stack = list(node.children.values())
+        while stack:
+            n = stack.pop()
+            size += 1
+            stack.extend(n.children.values())
+        return size
+
+    def origins(self):
+        """Counter of origin ASNs"""
+        return Counter({asn: node.count for asn, node in self.root.children.items()})
+
+    def _peer_nodes(self, origin_asn):
+        # walk down the run of origin ASN, yielding (prepend depth, peer, node)
+        node = self.root.children.get(origin_asn)
+        depth = 1
+        while node is not None:
+            for asn, child in node.children.items():
+                if asn != origin_asn:
+                    yield depth, asn, child
+            node = node.children.get(origin_asn)
+            depth += 1
+
+    def peers(self, origin_asn):
+        """Counter of ASNs next to the given origin ASN"""
+        c = Counter()
+        for _, asn, node in self._peer_nodes(origin_asn):
+            c[asn] += node.count
+        return c
+
+    def prepend_peers(self, origin_asn):
+        """Counter of peer ASNs receiving the origin ASN prepended"""
+        c = Counter()
+        for depth, asn, node in self._peer_nodes(origin_asn):
+            if depth > 1:
+                c[asn] += node.count
+        return c
+
+    def prepend_depths(self, origin_asn):
+        """Counter of origin ASN repetitions at the end of paths with a peer"""
+        c = Counter()
+        for depth, _, node in self._peer_nodes(origin_asn):
+            c[depth] += node.count
+        return c
+
+    @staticmethod
+    def _run_ends(node, asn):
+        # number of paths ending on the run of asn starting at node
+        ends = 0
+        while node is not None:
+            ends += node.end
+            node = node.children.get(asn)
+        return ends
+
+    def transits(self):
+        """Counter of paths each transit ASN is on, as analysis.transit_asns"""
+        c = Counter()
+        # (node, its ASN, index of its run from the origin, ASNs not counted
+        # again for the paths through it)
+        stack = [
+            (node, asn, 0, frozenset((asn,)))
+            for asn, node in self.root.children.items()
+        ]
+        while stack:
+            node, asn, run, seen = stack.pop()
+            for child_asn, child in node.children.items():
+                if child_asn == asn:
+                    stack.append((child, asn, run, seen))
+                    continue
+                # past the peer, a transit of the paths with a run beyond it,
+                # the last run being the vantage point
+                if run >= 1 and child_asn not in seen:
+                    beyond = child.count - self._run_ends(child, child_asn)
+                    if beyond:
+                        c[child_asn] += beyond
+                stack.append((child, child_asn, run + 1, seen | {child_asn}))
+        return c
+
+    def paths(self):
+        """Yield every stored path, as many times as it was inserted"""
+        stack = [(self.root, ())]
+        while stack:
+            node, suffix = stack.pop()
+            for _ in range(node.end):
+                yield ",".join(reversed(suffix))
+            for asn, child in node.children.items():
+                stack.append((child, suffix + (asn,)))
@@ -0,0 +1,160 @@
+"""Write-behind persistence of response data
+
+Files to save are put in a bounded queue and written by a background thread,
+so fetching and analysis move on without waiting for the disk. The writer
+takes whatever is queued at once and fsyncs the batch together. When the
+queue is full, submit blocks until the writer catches up.
+
+With compress, files are saved gzip compressed with a .gz suffix. Data that
+arrived gzip encoded is written as received; anything else is compressed in
+the writer thread. read_saved reads either kind back.
+
+A file that fails to be written or synced is logged and kept in errors, and
+the writer goes on with the next ones.
+"""
+
+import gzip
+import logging
+import os
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteBehindWriter:
+    """Background writer of (filename, bytes) with batched fsync"""
+
+    def __init__(self, maxsize=64, batch=16, fsync=True, compress=False):
+        self.batch = batch
+        self.fsync = fsync
+        self.compress = compress
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.written = 0
+        self.errors = []
+        self._thread = threading.Thread(
+            target=self._run, name="write-behind", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, filename, data, gzipped=None):
+        """Queue data to be written, blocking while the queue is full
+
+        gzipped is the same data already gzip compressed, if there is one.
+        """
+        if not self._thread.is_alive():
+            raise RuntimeError("writer is closed")
+        if not self.compress:
+            self.queue.put((filename, data, False))
+        elif gzipped is not None:
+            self.queue.put((filename + ".gz", gzipped, False))
+        else:
+            self.queue.put((filename + ".gz", data, True))
+
+    def _run(self):
+        stop = False
+        while not stop:
+            items = [self.queue.get()]
+            # take the rest of what is queued, up to the batch size
+            while len(items) < self.batch:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in items:
+                stop = True
+                items = [item for item in items if item is not _STOP]
+            try:
+                self._write(items)
+            except Exception as e:
+                # keep writing the next batches whatever happened to this one
+                logger.exception(f"Failed to save a batch of {len(items)} files")
+                self.errors.extend((filename, e) for filename, _, _ in items)
+            finally:
+                for _ in range(len(items) + stop):
+                    self.queue.task_done()
+
+    def _failed(self, filename, e):
+        self.errors.append((filename, e))
+        logger.error(f"Failed to save {filename}: {e}")
+
+    def _write(self, items):
+        # errors are recorded per file, and only the files saved are counted
+        files = []
+        for filename, data, pending in items:
+            try:
+                if pending:
+                    data = gzip.compress(data)
+                f = open(filename, "wb")
+            except OSError as e:
+                self._failed(filename, e)
+                continue
+            try:
+                f.write(data)
+                f.flush()
+            except OSError as e:
+                f.close()
+                self._failed(filename, e)
+                continue
+            files.append((filename, f))
+
+        saved = []
+        for filename, f in files:
+            try:
+                try:
+                    if self.fsync:
+                        os.fsync(f.fileno())
+                finally:
+                    f.close()
+            except OSError as e:
+                self._failed(filename, e)
+                continue
+            saved.append(filename)
+        if self.fsync:
+            for d in {os.path.dirname(os.path.abspath(f)) for f in saved}:
+                _fsync_dir(d)
+
+        for filename in saved:
+            self.written += 1
+            logger.info(f"Saved the obtained data in {filename}")
+
+    def flush(self):
+        """Wait until everything queued so far has been written"""
+        self.queue.join()
+
+    def close(self):
+        """Write out everything queued and stop the writer thread"""
+        if self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join()
+
+
+def _fsync_dir(path):
+    # make the new directory entries durable, where the OS supports it
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def read_saved(filename):
+    """Bytes of a saved response, uncompressed if it was saved with .gz"""
+    if filename.endswith(".gz"):
+        with gzip.open(filename, "rb") as entrada:
+            return entrada.read()
+    with open(filename, "rb") as entrada:
+        return entrada.read()
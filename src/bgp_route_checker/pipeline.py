@@ -0,0 +1,169 @@
+"""Staged pipeline with bounded queues and backpressure
+
+Each stage has its own worker threads taking items from a bounded input
+queue, and puts what its function returns on the queue of the next stage.
+A put blocks while that queue is full, so when the slowest stage saturates
+the stages upstream of it stop, down to the feeding of the input, instead of
+queueing without bound. A stage with processes=True runs its function in a
+process pool of its worker count, for CPU-bound work that would otherwise
+hold the GIL; the function and the values going in and out must then be
+picklable.
+
+An exception raised by a stage function ends that item: the exception goes
+straight to the output in place of a result.
+
+Stage.metrics has the items processed and failed, the seconds busy, the
+seconds blocked on a full downstream queue, and the depth of the input queue
+seen at each get, max and mean. Pipeline.feed_blocked is the time the input
+waited for the first stage, the backpressure seen by the caller.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+_DONE = object()
+
+
+class Stage:
+    """A step of a Pipeline with its own workers and bounded input queue"""
+
+    def __init__(self, name, fn, workers=1, maxsize=None, processes=False):
+        if maxsize is None:
+            maxsize = 2 * workers
+        # no worker would never finish, and a queue of 0 is unbounded
+        if workers < 1 or maxsize < 1:
+            raise ValueError(
+                f"Stage {name} needs at least 1 worker and a queue of at least 1, "
+                f"not {workers} and {maxsize}"
+            )
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.maxsize = maxsize
+        self.processes = processes
+        self.queue = None
+        self.processed = 0
+        self.failed = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.max_depth = 0
+        self._depth_sum = 0
+        self._gets = 0
+        self._lock = threading.Lock()
+
+    def metrics(self):
+        return {
+            "workers": self.workers,
+            "processes": self.processes,
+            "queue_size": self.maxsize,
+            "processed": self.processed,
+            "failed": self.failed,
+            "busy_seconds": self.busy,
+            "blocked_seconds": self.blocked,
+            "max_depth": self.max_depth,
+            "mean_depth": self._depth_sum / self._gets if self._gets else 0.0,
+        }
+
+
+class Pipeline:
+    """Stages run concurrently, each feeding the next through a bounded queue"""
+
+    def __init__(self, stages):
+        self.stages = stages
+        self.feed_blocked = 0.0
+
+    def metrics(self):
+        """Metrics dict of each stage by name"""
+        return {stage.name: stage.metrics() for stage in self.stages}
+
+    def run(self, items):
+        """Yield (item, result or exception) in the order items come out"""
+        for stage in self.stages:
+            stage.queue = queue.Queue(maxsize=stage.maxsize)
+        output = queue.Queue(maxsize=self.stages[-1].maxsize)
+        downstream = [stage.queue for stage in self.stages[1:]] + [output]
+        # the pools fork before any pipeline thread is running
+        pools = {}
+        for stage in self.stages:
+            if stage.processes:
+                pools[stage.name] = ProcessPoolExecutor(max_workers=stage.workers)
+                pools[stage.name].submit(int).result()
+
+        threads = [threading.Thread(target=self._feed, args=(items,), daemon=True)]
+        for stage, target in zip(self.stages, downstream):
+            # the last worker out of a stage tells the next stage to finish
+            remaining = [stage.workers]
+            for i in range(stage.workers):
+                threads.append(
+                    threading.Thread(
+                        target=self._work,
+                        args=(stage, target, output, pools.get(stage.name), remaining),
+                        name=f"{stage.name}-{i}",
+                        daemon=True,
+                    )
+                )
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = output.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            for pool in pools.values():
+                pool.shutdown()
+
+    def _feed(self, items):
+        first = self.stages[0]
+        for item in items:
+            started = time.perf_counter()
+            first.queue.put((item, item))
+            self.feed_blocked += time.perf_counter() - started
+        for _ in range(first.workers):
+            first.queue.put(_DONE)
+
+    def _work(self, stage, target, output, pool, remaining):
+        while True:
+            depth = stage.queue.qsize()
+            entry = stage.queue.get()
+            if entry is _DONE:
+                break
+            item, value = entry
+            started = time.perf_counter()
+            try:
+                if pool is not None:
+                    value = pool.submit(stage.fn, value).result()
+                else:
+                    value = stage.fn(value)
+            except Exception as e:
+                failed = True
+                value = e
+            else:
+                failed = False
+            busy = time.perf_counter() - started
+            with stage._lock:
+                stage.processed += 1
+                stage.failed += failed
+                stage.busy += busy
+                stage._gets += 1
+                stage._depth_sum += depth
+                stage.max_depth = max(stage.max_depth, depth)
+
+            started = time.perf_counter()
+            (output if failed else target).put((item, value))
+            with stage._lock:
+                stage.blocked += time.perf_counter() - started
+
+        with stage._lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            workers = 1 if target is output else self._next(stage).workers
+            for _ in range(workers):
+                target.put(_DONE)
+
+    def _next(self, stage):
+        return self.stages[self.stages.index(stage) + 1]
@@ -0,0 +1,134 @@
+"""Routing policy expectations per prefix
+
+The policy file is json with a rule for each prefix. All keys are optional:
+
+    {
+        "111.98.0.0/16": {
+            "origins": ["2516"],
+            "required_peers": ["1299", "3356"],
+            "prepend": false
+        }
+    }
+
+- origins: ASNs allowed to originate the prefix
+- required_peers: ASNs expected to be seen next to the origin
+- prepend: true if path-prepend at origin is expected, false if it is not
+
+Rules are kept in a dict by prefix with the ASN lists as frozensets, so
+evaluating a result is a hash lookup plus set operations on the rule itself,
+independent of how many prefixes the policy has.
+"""
+
+import json
+
+UNEXPECTED_ORIGIN = "unexpected-origin"
+MISSING_PEER = "missing-peer"
+MISSING_PREPEND = "missing-prepend"
+UNEXPECTED_PREPEND = "unexpected-prepend"
+
+
+class Rule:
+    __slots__ = ("origins", "required_peers", "prepend")
+
+    def __init__(self, origins=None, required_peers=None, prepend=None):
+        self.origins = frozenset(map(str, origins)) if origins else None
+        self.required_peers = frozenset(map(str, required_peers or ()))
+        self.prepend = prepend
+
+
+class Violation:
+    __slots__ = ("cidr", "kind", "message")
+
+    def __init__(self, cidr, kind, message):
+        self.cidr = cidr
+        self.kind = kind
+        self.message = message
+
+    def __repr__(self):
+        return f"Violation({self.cidr!r}, {self.kind!r}, {self.message!r})"
+
+    def as_dict(self):
+        return {"cidr": self.cidr, "kind": self.kind, "message": self.message}
+
+
+def _asns(pairs):
+    # (asn, count) pairs of a summary dict, or a Counter of a CheckResult
+    if isinstance(pairs, dict):
+        return pairs.keys()
+    return [asn for asn, _ in pairs]
+
+
+class Policy:
+    """Per-prefix rules evaluated against check results"""
+
+    def __init__(self, rules=None):
+        self.rules = {}
+        for cidr, rule in (rules or {}).items():
+            self.rules[cidr] = Rule(
+                rule.get("origins"), rule.get("required_peers"), rule.get("prepend")
+            )
+
+    def __len__(self):
+        return len(self.rules)
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, "r") as entrada:
+            return cls(json.load(entrada))
+
+    def evaluate(self, result):
+        """List of Violations of a CheckResult or result dict"""
+        if not isinstance(result, dict):
+            result = {
+                "cidr": result.cidr,
+                "origins": result.origins,
+                "peers": result.peers,
+                "peers_pathprepend": result.peers_pathprepend,
+            }
+        if "error" in result:
+            return []
+        cidr = result["cidr"]
+        rule = self.rules.get(cidr)
+        if rule is None:
+            return []
+
+        violations = []
+        if rule.origins is not None:
+            unexpected = [a for a in _asns(result["origins"]) if a not in rule.origins]
+            if unexpected:
+                violations.append(
+                    Violation(
+                        cidr,
+                        UNEXPECTED_ORIGIN,
+                        f"Origin ASN {unexpected} not in {sorted(rule.origins)}",
+                    )
+                )
+        if rule.required_peers:
+            missing = rule.required_peers.difference(_asns(result["peers"]))
+            if missing:
+                violations.append(
+                    Violation(
+                        cidr,
+                        MISSING_PEER,
+                        f"Required peer ASN {sorted(missing)} not seen",
+                    )
+                )
+        prepended = list(_asns(result["peers_pathprepend"]))
+        if rule.prepend is True and not prepended:
+            violations.append(
+                Violation(cidr, MISSING_PREPEND, "No path-prepend at origin seen")
+            )
+        elif rule.prepend is False and prepended:
+            violations.append(
+                Violation(
+                    cidr,
+                    UNEXPECTED_PREPEND,
+                    f"Path-prepend at origin seen toward {prepended}",
+                )
+            )
+        return violations
+
+    def evaluate_all(self, results):
+        """Yield only the Violations of the results, in one pass"""
+        for result in results:
+            yield from self.evaluate(result)
@@ -0,0 +1,101 @@
+"""Path-prepend analysis
+
+Each AS path is run-length encoded once, so repeated ASNs are found in one
+linear pass instead of repeated list.count/list.remove calls. Prepends are
+reported at every position of the path:
+
+- origin: the last ASN of the path is repeated
+- transit: an ASN in the middle of the path is repeated
+- vantage: the first ASN, the one the path was observed at, is repeated
+
+A prepend is applied toward the neighbor the repeated ASN announced the route
+to, which is the previous run in the path (closer to the vantage point).
+"""
+
+from collections import Counter, defaultdict
+
+ORIGIN = "origin"
+TRANSIT = "transit"
+VANTAGE = "vantage"
+
+
+def rle_path(path):
+    """Run-length encode an AS path into a list of [asn, count]"""
+    if isinstance(path, str):
+        path = path.split(",")
+    runs = []
+    prev = None
+    for asn in path:
+        if asn == prev:
+            runs[-1][1] += 1
+        else:
+            runs.append([asn, 1])
+            prev = asn
+    return runs
+
+
+class PrependReport:
+    """Prepend summary of a set of AS paths"""
+
+    def __init__(self):
+        # number of prepended runs seen at origin/transit/vantage position
+        self.positions = Counter()
+        # ASN -> Counter of run lengths (2 = announced twice, and so on)
+        self.asns = defaultdict(Counter)
+        # ASN -> Counter of neighbor ASNs the prepend was announced to
+        self.toward = defaultdict(Counter)
+        # path length with prepends collapsed -> number of paths
+        self.path_lengths = Counter()
+        # path length as observed -> number of paths
+        self.raw_path_lengths = Counter()
+        self.path_count = 0
+
+    def add(self, path):
+        """Add one path to the report"""
+        runs = rle_path(path)
+        if not runs:
+            return
+
+        self.path_count += 1
+        self.path_lengths[len(runs)] += 1
+        self.raw_path_lengths[sum(n for _, n in runs)] += 1
+
+        last = len(runs) - 1
+        for i, (asn, n) in enumerate(runs):
+            if n == 1:
+                continue
+            if i == last:
+                position = ORIGIN
+            elif i == 0:
+                position = VANTAGE
+            else:
+                position = TRANSIT
+            self.positions[position] += 1
+            self.asns[asn][n] += 1
+            if i > 0:
+                self.toward[asn][runs[i - 1][0]] += 1
+
+    def mean_path_length(self):
+        """Mean path length with prepends collapsed"""
+        if not self.path_count:
+            return 0.0
+        total = sum(k * v for k, v in self.path_lengths.items())
+        return total / self.path_count
+
+    def as_dict(self):
+        return {
+            "path_count": self.path_count,
+            "positions": dict(self.positions),
+            "asns": {asn: dict(c) for asn, c in self.asns.items()},
+            "toward": {asn: dict(c) for asn, c in self.toward.items()},
+            "path_lengths": dict(self.path_lengths),
+            "raw_path_lengths": dict(self.raw_path_lengths),
+        }
+
+
+def analyze_prepends(paths):
+    """Build a PrependReport from an iterable of AS paths"""
+    report = PrependReport()
+    for path in paths:
+        report.add(path)
+    return report
@@ -0,0 +1,111 @@
+"""Profiling of fetch, parse and analysis stages
+
+Profiler.capture wraps a run or the processing of one prefix in cProfile
+and/or tracemalloc. Stage timings inside the capture are recorded with
+Profiler.stage. With a threshold, only the captures taking at least that many
+seconds are written out, so a production run keeps the evidence of the slow
+prefixes only.
+
+For each capture written out:
+
+    profile-<label>-<timestamp>.pstats  cProfile data, see python -m pstats
+    profile-<label>-<timestamp>.txt     stage timings, peak memory and top
+                                        allocations
+
+cProfile and tracemalloc only see the thread the capture runs in, and
+tracemalloc slows down the code it traces.
+"""
+
+import cProfile
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+CPU = "cpu"
+MEM = "mem"
+
+
+class Profiler:
+    """Capture cProfile and tracemalloc data of runs or prefixes"""
+
+    def __init__(self, modes, directory=".", threshold=0.0, top=20):
+        self.modes = set(modes)
+        unknown = self.modes - {CPU, MEM}
+        if unknown:
+            raise ValueError(f"Unknown profile mode {sorted(unknown)}")
+        self.directory = directory
+        self.threshold = threshold
+        self.top = top
+        self.written = []
+        self._stages = None
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def stage(self, name):
+        """Record the time spent in a stage of the current capture"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self._stages is not None:
+                elapsed = time.perf_counter() - started
+                self._stages[name] = self._stages.get(name, 0.0) + elapsed
+
+    @contextmanager
+    def capture(self, label):
+        """Profile the block, writing the result if it is slower than threshold"""
+        if self._stages is not None:
+            # cProfile does not nest, the outer capture covers this block
+            yield
+            return
+
+        self._stages = {}
+        cpu = cProfile.Profile() if CPU in self.modes else None
+        mem = MEM in self.modes
+        if mem:
+            tracemalloc.start()
+        started = time.perf_counter()
+        if cpu:
+            cpu.enable()
+        try:
+            yield
+        finally:
+            if cpu:
+                cpu.disable()
+            elapsed = time.perf_counter() - started
+            snapshot = peak = None
+            if mem:
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            stages = self._stages
+            self._stages = None
+            if elapsed >= self.threshold:
+                self._write(label, elapsed, stages, cpu, snapshot, peak)
+
+    def _write(self, label, elapsed, stages, cpu, snapshot, peak):
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        name = "profile-" + label.replace("/", "-").replace(":", "_") + "-" + timestamp
+        base = os.path.join(self.directory, name)
+
+        lines = [f"{label} took {elapsed:.3f}s"]
+        for stage, seconds in stages.items():
+            lines.append(f"  {stage}: {seconds:.3f}s")
+        if cpu:
+            cpu.dump_stats(base + ".pstats")
+            lines.append(f"cProfile data in {base}.pstats")
+        if snapshot is not None:
+            lines.append(f"Peak traced memory {peak / 1024:.1f} KiB")
+            lines.append(f"Top {self.top} allocations:")
+            for stat in snapshot.statistics("lineno")[: self.top]:
+                lines.append(f"  {stat}")
+        with open(base + ".txt", "w") as salida:
+            salida.write("\n".join(lines) + "\n")
+
+        self.written.append(base)
+        logger.info(f"Profile of {label} ({elapsed:.3f}s) saved in {base}.*")
@@ -0,0 +1,306 @@
+"""Qrator API client
+
+Compressed encodings are requested and the body is decoded while it is read,
+as the path lists are very repetitive text.
+
+With a ResponseCache, a fresh cached response is returned without a request,
+and a stale one is revalidated with If-None-Match/If-Modified-Since. On 304
+Not Modified the cached response, and the analysis results kept on it, are
+reused. Each caller gets its own copy of it, with the status and metrics of
+its own fetch.
+
+Every request has a timeout for connecting and for each read, and a client
+can have a deadline for the whole run after which no request is started and
+reads in progress stop. With hedging, a fetch still running after a
+percentile of the fetch times observed so far gets a second request, and the
+first of the two to finish is used. The loser is left to finish or time out
+in its own thread.
+
+With keep_wire, a gzip encoded body is also kept as received, for saving
+without compressing it again.
+
+ref) https://radar.qrator.dev/open-api
+"""
+
+import copy
+import math
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import zlib
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+from .exceptions import QratorError
+from .results import QratorResponse
+
+QRATOR_URL = "https://new-api.radar.qrator.net/v1/get-all-paths?prefix={}"
+
+ACCEPT_ENCODING = "gzip, deflate"
+
+CHUNK_SIZE = 65536
+
+TIMEOUT = 30
+
+# fetch times kept for the hedging percentile, and needed before hedging
+LATENCY_WINDOW = 1000
+HEDGE_MIN_SAMPLES = 20
+
+
+def _spawn(fn, *args):
+    """Run fn in a daemon thread, so a stuck loser never blocks the exit"""
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+def _reuse(response, status, metrics):
+    """Copy of a cached response sharing its body, data and analysis results"""
+    reused = copy.copy(response)
+    reused.status = status
+    reused.metrics = dict(metrics)
+    return reused
+
+
+def _timed_out(e):
+    # connect timeouts come wrapped in URLError
+    return isinstance(e, socket.timeout) or isinstance(
+        getattr(e, "reason", None), socket.timeout
+    )
+
+
+class _Decoder:
+    """Incremental decoder of a Content-Encoding"""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            self._d = zlib.decompressobj(zlib.MAX_WBITS)
+            self._first = True
+        elif encoding in ("", "identity"):
+            self._d = None
+        else:
+            raise QratorError(f"Unsupported Content-Encoding {encoding}")
+
+    def decompress(self, chunk):
+        if self._d is None:
+            return chunk
+        if self.encoding == "deflate" and self._first:
+            self._first = False
+            try:
+                return self._d.decompress(chunk)
+            except zlib.error:
+                # some servers send raw deflate without the zlib header
+                self._d = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._d.decompress(chunk)
+
+    def flush(self):
+        if self._d is None:
+            return b""
+        data = self._d.flush()
+        # a body cut short decodes without error up to where it stops
+        if not self._d.eof:
+            raise zlib.error(f"Truncated {self.encoding} stream")
+        return data
+
+
+class QratorClient:
+    """Fetch the BGP paths observed for a prefix from Qrator API
+
+    url is the API endpoint with {} in place of the quoted prefix, so a local
+    stand-in server can be used instead of Qrator.
+    """
+
+    def __init__(
+        self,
+        url=None,
+        compress=True,
+        cache=None,
+        timeout=TIMEOUT,
+        deadline=None,
+        hedge=None,
+        keep_wire=False,
+    ):
+        """timeout is in seconds for connecting and for each read, deadline in
+        seconds from now for the whole run, and hedge the percentile of fetch
+        times after which a second request is sent, None not to hedge.
+        keep_wire keeps a gzip encoded body as received on the response.
+        """
+        self.url = url or QRATOR_URL
+        self.compress = compress
+        self.cache = cache
+        self.timeout = timeout
+        self.deadline = time.monotonic() + deadline if deadline else None
+        self.hedge = hedge
+        self.keep_wire = keep_wire
+        self.stats = Counter()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def url_for(self, cidr):
+        # replace "/" with "%2F"
+        return self.url.format(urllib.parse.quote(cidr, safe=""))
+
+    def latency_percentile(self, p):
+        """Fetch time at percentile p of the recent fetches, None if too few"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return latencies[max(0, math.ceil(p / 100 * len(latencies)) - 1)]
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _remaining(self, url):
+        # seconds left for a socket operation, within timeout and deadline
+        if self.deadline is None:
+            return self.timeout
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            self._count("deadline_exceeded")
+            raise QratorError(f"Deadline exceeded fetching {url}")
+        return min(self.timeout, remaining) if self.timeout else remaining
+
+    def fetch(self, cidr):
+        """Get the QratorResponse for the CIDR"""
+        entry = self.cache.get(cidr) if self.cache else None
+        if entry is not None and entry.fresh():
+            return _reuse(entry.response, "cached", entry.response.metrics)
+
+        started = time.perf_counter()
+        after = self.latency_percentile(self.hedge) if self.hedge else None
+        if after is None:
+            response = self._attempt(cidr, entry)
+            attempts, hedge_won = 1, False
+        else:
+            response, attempts, hedge_won = self._hedged(cidr, entry, after)
+
+        response.metrics["fetch_seconds"] = time.perf_counter() - started
+        response.metrics["attempts"] = attempts
+        response.metrics["hedge_won"] = hedge_won
+        if response.status == "not-modified":
+            self.cache.rearm(entry)
+        elif self.cache:
+            self.cache.put(response)
+        return response
+
+    def _hedged(self, cidr, entry, after):
+        # (response, attempts, whether the second request won)
+        first = _spawn(self._attempt, cidr, entry)
+        if wait([first], timeout=after).done:
+            return first.result(), 1, False
+
+        self._count("hedged")
+        second = _spawn(self._attempt, cidr, entry)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except QratorError as e:
+                    error = e
+                    continue
+                if future is second:
+                    self._count("hedge_wins")
+                return response, 2, future is second
+        raise error
+
+    def _attempt(self, cidr, entry):
+        """One request, revalidating the cache entry if there is one"""
+        url = self.url_for(cidr)
+        request = urllib.request.Request(url)
+        if self.compress:
+            request.add_header("Accept-Encoding", ACCEPT_ENCODING)
+        if entry is not None:
+            if entry.etag:
+                request.add_header("If-None-Match", entry.etag)
+            if entry.last_modified:
+                request.add_header("If-Modified-Since", entry.last_modified)
+
+        timeout = self._remaining(url)
+        self._count("requests")
+        started = time.perf_counter()
+        wire = 0
+        chunks = []
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as r:
+                if r.code != 200:
+                    raise QratorError(f"Failed to receive response from {url}")
+                headers = dict(r.headers.items())
+                encoding = r.headers.get("Content-Encoding", "").strip().lower()
+                decoder = _Decoder(encoding)
+                keep = self.keep_wire and encoding == "gzip"
+                wire_chunks = []
+                while True:
+                    # each read is bounded by the timeout, stop at the deadline
+                    self._remaining(url)
+                    chunk = r.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    wire += len(chunk)
+                    if keep:
+                        wire_chunks.append(chunk)
+                    chunks.append(decoder.decompress(chunk))
+                chunks.append(decoder.flush())
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and entry is not None:
+                return _reuse(
+                    entry.response,
+                    "not-modified",
+                    {
+                        "encoding": "identity",
+                        "wire_bytes": 0,
+                        "body_bytes": len(entry.response.body),
+                        "compression_ratio": 1.0,
+                    },
+                )
+            raise QratorError(f"Failed to receive response from {url}: {e}") from e
+        except zlib.error as e:
+            raise QratorError(f"Failed to decode response from {url}: {e}") from e
+        except OSError as e:
+            if _timed_out(e):
+                self._count("timeouts")
+                raise QratorError(
+                    f"Timed out receiving response from {url}: {e}"
+                ) from e
+            raise QratorError(f"Failed to receive response from {url}: {e}") from e
+
+        seconds = time.perf_counter() - started
+        with self._lock:
+            self._latencies.append(seconds)
+
+        body = b"".join(chunks)
+        metrics = {
+            "encoding": encoding or "identity",
+            "wire_bytes": wire,
+            "body_bytes": len(body),
+            "compression_ratio": len(body) / wire if wire else 1.0,
+        }
+        return QratorResponse(
+            cidr,
+            url,
+            body,
+            headers,
+            metrics=metrics,
+            wire=b"".join(wire_chunks) if keep else None,
+        )
+
+    def get_paths(self, cidr):
+        """List of comma-delimited AS paths, PrefixNotFoundError if none"""
+        return self.fetch(cidr).paths
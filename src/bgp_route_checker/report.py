@@ -0,0 +1,158 @@
+"""Checks of the results of a run, fed one result at a time
+
+Checks runs the checks asked for a single prefix, a batch or a MRT dump on
+each result as it comes, so a run does not keep its results until the end:
+the routing policy, the anomaly detector, the time-series store, the MinHash
+signatures, the cross-prefix report and route origin validation against
+ROAs. finish() saves and logs what is reported over the whole run.
+
+Findings are logged to the bgp_route_checker logger, policy violations,
+anomalies and RPKI invalid origins as warnings.
+"""
+
+import logging
+import time
+from collections import Counter
+
+from .minhash import MinHasher, features, save_signatures
+from .rpki import INVALID
+
+logger = logging.getLogger(__name__)
+
+
+def validate_origins(index, observations, detail=logging.DEBUG):
+    """List of (prefix, origin ASN, state) of observations against a RoaIndex
+
+    Invalid ones are logged as warnings, others at the detail level.
+    """
+    started = time.perf_counter()
+    states = list(index.validate_many(observations))
+    elapsed = time.perf_counter() - started
+
+    for prefix, origin_asn, state in states:
+        if state == INVALID:
+            logger.warning(f"RPKI invalid: {prefix} originated by ASN {origin_asn}")
+        else:
+            logger.log(detail, f"RPKI {state}: {prefix} originated by ASN {origin_asn}")
+    c = Counter(state for _, _, state in states)
+    rate = len(states) / elapsed if elapsed else 0
+    logger.info(
+        f"RPKI validation of {len(states)} observations: {c.most_common()} "
+        f"in {elapsed:.3f}s ({rate:.0f}/s)"
+    )
+    return states
+
+
+class Checks:
+    """Checks asked for a run, each optional
+
+    policy is a Policy, roas a RoaIndex, store a TimeSeriesStore, minhash the
+    filename to save the signatures in, detector an AnomalyDetector and
+    report a CrossPrefixReport of top_k ASNs. The store, detector and report
+    are closed with the Checks.
+    """
+
+    def __init__(
+        self,
+        policy=None,
+        roas=None,
+        store=None,
+        minhash=None,
+        detector=None,
+        report=None,
+        top_k=20,
+        rpki_detail=logging.DEBUG,
+    ):
+        self.policy = policy
+        self.roas = roas
+        self.store = store
+        self.minhash = minhash
+        self.detector = detector
+        self.report = report
+        self.top_k = top_k
+        self.rpki_detail = rpki_detail
+        self.count = 0
+        self.violations = 0
+        self.anomalies = 0
+        self.hasher = MinHasher()
+        self.signatures = {} if minhash else None
+        # (prefix, origin ASN) validated at the end, in one pass
+        self.observations = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, result):
+        """Check a result dict or CheckResult"""
+        if not isinstance(result, dict):
+            result = result.as_dict()
+        cidr = result["cidr"]
+        self.count += 1
+        if self.detector is not None:
+            anomalies = self.detector.observe_result(result)
+            for kind, message in anomalies:
+                self.anomalies += 1
+                logger.warning(f"Anomaly {kind} for {cidr}: {message}")
+            if not anomalies:
+                logger.debug(f"No anomaly found for {cidr}")
+        if self.policy is not None:
+            for v in self.policy.evaluate(result):
+                self.violations += 1
+                logger.warning(f"Policy violation {v.kind} for {cidr}: {v.message}")
+        if self.store is not None:
+            self.store.append(result)
+        if self.signatures is not None:
+            self.signatures[cidr] = self.hasher.signature(features(result))
+        if self.report is not None:
+            self.report.add(result)
+        if self.roas is not None:
+            self.observations.extend((cidr, asn) for asn, _ in result["origins"])
+
+    def finish(self):
+        """Save and log the totals of the run, close and return them in a dict"""
+        summary = {"results": self.count}
+        if self.policy is not None:
+            logger.info(f"{self.violations} policy violations")
+            summary["violations"] = self.violations
+        if self.detector is not None:
+            summary["anomalies"] = self.anomalies
+        if self.store is not None:
+            logger.info(f"Appended {self.count} points to {self.store.filename}")
+        if self.signatures is not None:
+            save_signatures(self.minhash, self.hasher, self.signatures)
+            logger.info(
+                f"Saved {len(self.signatures)} MinHash signatures in {self.minhash}"
+            )
+        if self.report is not None:
+            summary["cross_report"] = self._cross_report()
+        if self.roas is not None:
+            summary["rpki"] = validate_origins(
+                self.roas, self.observations, self.rpki_detail
+            )
+        self.close()
+        return summary
+
+    def _cross_report(self):
+        totals = self.report.as_dict(self.top_k)
+        runs, spilled, peak = self.report.spill_stats()
+        logger.info(
+            f"{totals['prefixes']} prefixes, {totals['path_count']} paths, "
+            f"{totals['peers']} peer ASNs, {totals['origins']} origin ASNs"
+        )
+        logger.info(f"Top peer ASNs (asn, paths, prefixes): {totals['top_peers']}")
+        logger.info(f"Top origin ASNs (asn, paths, prefixes): {totals['top_origins']}")
+        if self.report.peers.limit is not None:
+            logger.info(
+                f"Spilled {spilled} entries in {runs} sorted runs, "
+                f"peak {peak} bytes of counts in memory"
+            )
+        return totals
+
+    def close(self):
+        for resource in (self.store, self.detector, self.report):
+            if resource is not None:
+                resource.close()
+        self.store = self.detector = self.report = None
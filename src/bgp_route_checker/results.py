@@ -0,0 +1,116 @@
+"""Result objects returned by bgp_route_checker"""
+
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from .exceptions import PrefixNotFoundError, QratorError
+
+
+def ranked(counter):
+    """List of (key, count) with highest count first, ties ordered by key"""
+    return sorted(counter.items(), key=lambda x: (-x[1], x[0]))
+
+
+@dataclass
+class QratorResponse:
+    """Response received from Qrator API for a prefix"""
+
+    cidr: str
+    url: str
+    body: bytes
+    headers: dict = field(default_factory=dict)
+    timestamp: datetime = field(default_factory=datetime.now)
+    # encoding, wire_bytes, body_bytes, compression_ratio and fetch_seconds
+    metrics: dict = field(default_factory=dict)
+    # "fetched", "cached" when still fresh in the cache, or "not-modified"
+    # when revalidated by a conditional request
+    status: str = "fetched"
+    # analysis results of the body by name, reused while it is not modified
+    results: dict = field(default_factory=dict, repr=False)
+    # gzip Content-Encoding bytes as received, when the client keeps them,
+    # so the response is saved compressed without compressing it again
+    wire: bytes = field(default=None, repr=False)
+    _data: dict = field(default=None, init=False, repr=False)
+
+    @property
+    def data(self):
+        """Parsed json body, QratorError if it is not json"""
+        if self._data is None:
+            try:
+                self._data = json.loads(self.body)
+            except ValueError as e:
+                raise QratorError(
+                    f"Invalid json in response from {self.url}: {e}"
+                ) from e
+        return self._data
+
+    @property
+    def paths(self):
+        """List of comma-delimited AS paths for the prefix
+
+        PrefixNotFoundError if there are none, null or an empty list,
+        QratorError if the body is not a Qrator reply.
+        """
+        data = self.data.get("data") if isinstance(self.data, dict) else None
+        if not isinstance(data, dict):
+            raise QratorError(f"No data in response from {self.url}")
+        paths = data.get(self.cidr)
+        if paths is not None and not isinstance(paths, list):
+            raise QratorError(
+                f"Invalid paths of {self.cidr} in response from {self.url}"
+            )
+        if not paths:
+            raise PrefixNotFoundError(self.cidr)
+        return paths
+
+    @property
+    def filename(self):
+        """Filename to save the response with CIDR and timestamp"""
+        return (
+            "qrator-"
+            + self.cidr.replace("/", "-")
+            + "-"
+            + self.timestamp.strftime("%Y%m%d-%H%M%S")
+            + ".json"
+        )
+
+
+@dataclass
+class CheckResult:
+    """Origin and peer summary of the paths observed for a prefix
+
+    Counters keep the order the ASNs were first seen in, same as the paths.
+    """
+
+    cidr: str
+    origin_asn: str
+    origins: Counter
+    peers: Counter
+    peers_pathprepend: Counter
+    path_count: int
+    mean_path_length: float = 0.0
+    # ASNs between the vantage point and the peer of each path, see
+    # analysis.transit_asns
+    transits: Counter = field(default_factory=Counter)
+
+    @property
+    def moas(self):
+        """True if more than one origin ASN was observed"""
+        return len(self.origins) > 1
+
+    def summary(self):
+        """Summary dict with ties in the counts of its lists ordered by ASN"""
+        return {
+            "origin_asn": self.origin_asn,
+            "origins": ranked(self.origins),
+            "peers": ranked(self.peers),
+            "peers_pathprepend": ranked(self.peers_pathprepend),
+            "transits": ranked(self.transits),
+            "path_count": self.path_count,
+            "mean_path_length": self.mean_path_length,
+        }
+
+    def as_dict(self):
+        return {"cidr": self.cidr, **self.summary()}
@@ -0,0 +1,177 @@
+"""Local HTTP/JSON service for origin and peer summary
+
+GET /check?cidr=111.98.0.0/16 returns the summary for the CIDR, with the
+violations of the routing policy if one is given.
+GET /health returns the cache and in-flight request counts, and the
+upstream request, timeout and hedging counters.
+
+Summaries are kept in a shared in-memory cache for ttl seconds. Concurrent
+requests for the same CIDR are coalesced into a single upstream fetch, and
+fetch plus analysis run on a bounded worker pool. A refetch after the ttl is
+a conditional request, and if the response was modified only the changed
+paths are applied to the previous counters.
+"""
+
+import json
+import logging
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .cache import ResponseCache, TTLCache
+from .exceptions import BGPRouteCheckerError, InvalidCIDRError, PrefixNotFoundError
+from .incremental import IncrementalAnalyzer
+from .qrator import QratorClient
+from .validate import validate_ipv4network
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Run at most one call per key at a time, sharing its result"""
+
+    def __init__(self, executor):
+        self.executor = executor
+        self._calls = {}
+        # reentrant as the callback runs right away for a finished future
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._calls)
+
+    def do(self, key, fn, *args):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = self.executor.submit(fn, *args)
+                self._calls[key] = future
+                future.add_done_callback(lambda f: self._forget(key, f))
+        return future.result()
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+
+class CheckerService:
+    """Cached, coalesced lookup of the summary for a CIDR"""
+
+    def __init__(self, ttl=300, workers=4, client=None, analyzer=None, policy=None):
+        self.cache = TTLCache(ttl)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.flight = SingleFlight(self.executor)
+        # stale responses are revalidated instead of downloaded again
+        self.client = client or QratorClient(cache=ResponseCache(ttl))
+        self.analyzer = analyzer or IncrementalAnalyzer()
+        self.policy = policy
+        self.upstream_calls = 0
+        self._lock = threading.Lock()
+
+    def _load(self, cidr):
+        # checked again as another flight may have filled the cache meanwhile
+        result = self.cache.get(cidr)
+        if result is not None:
+            return result
+        with self._lock:
+            self.upstream_calls += 1
+        response = self.client.fetch(cidr)
+        summary = response.results.get("summary")
+        if summary is None:
+            # new or modified response
+            try:
+                paths = response.paths
+            except PrefixNotFoundError:
+                self.analyzer.forget(cidr)
+                raise
+            summary = response.results["summary"] = self.analyzer.update(cidr, paths)
+        result = dict(summary, cidr=cidr)
+        if self.policy is not None:
+            result["violations"] = [v.as_dict() for v in self.policy.evaluate(result)]
+        self.cache.set(cidr, result)
+        return result
+
+    def lookup(self, cidr):
+        result = self.cache.get(cidr)
+        if result is None:
+            result = self.flight.do(cidr, self._load, cidr)
+        return result
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class Handler(BaseHTTPRequestHandler):
+    service = None
+
+    def _reply(self, code, data):
+        body = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == "/health":
+            return self._reply(
+                200,
+                {
+                    "cached": len(self.service.cache),
+                    "in_flight": len(self.service.flight),
+                    "upstream_calls": self.service.upstream_calls,
+                    "upstream": dict(self.service.client.stats),
+                    "upstream_p95": self.service.client.latency_percentile(95),
+                },
+            )
+        if url.path != "/check":
+            return self._reply(404, {"error": "not found"})
+
+        cidr = urllib.parse.parse_qs(url.query).get("cidr", [""])[0]
+        started = time.perf_counter()
+        try:
+            result = self.service.lookup(validate_ipv4network(cidr))
+        except InvalidCIDRError as e:
+            return self._reply(400, {"error": str(e)})
+        except PrefixNotFoundError:
+            return self._reply(404, {"error": f"{cidr} was not found"})
+        except BGPRouteCheckerError as e:
+            # Qrator failed or replied with something else than paths
+            logger.error(f"Failed to check {cidr}: {e}")
+            return self._reply(502, {"error": f"Failed to check {cidr}"})
+        except Exception:
+            logger.exception(f"Error checking {cidr}")
+            return self._reply(500, {"error": f"Error checking {cidr}"})
+        logger.debug(f"Answered {cidr} in {time.perf_counter() - started:.4f}s")
+        return self._reply(200, result)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+def serve(
+    host="127.0.0.1",
+    port=8080,
+    ttl=300,
+    workers=4,
+    client=None,
+    service=None,
+    policy=None,
+):
+    """Run the HTTP service until interrupted"""
+    service = service or CheckerService(
+        ttl=ttl, workers=workers, client=client, policy=policy
+    )
+    handler = type("BoundHandler", (Handler,), {"service": service})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    logger.info(f"Serving on http://{host}:{httpd.server_port}/check?cidr=")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.close()
@@ -0,0 +1,205 @@
+"""Sharded batch execution over a shared directory
+
+Prefixes are assigned to named workers by consistent hashing, so adding or
+removing a worker only moves the prefixes of the ring segments next to it and
+the other workers keep their share. Each worker checks its shard the same way
+as a whole batch, through the concurrent batch pipeline, and appends the
+results to its own file in the shared directory as they come; a coordinator
+merges the results of all workers and reports progress and failures. No
+broker is needed, only a directory every node can write to.
+
+    <shard-dir>/results/<worker>.jsonl  one result dict per line
+    <shard-dir>/progress/<worker>.json  assigned, done and failed counts
+    <shard-dir>/merged.json             written by the coordinator
+"""
+
+import bisect
+import hashlib
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes"""
+
+    def __init__(self, nodes, vnodes=100):
+        self.vnodes = vnodes
+        self._ring = []
+        self._nodes = []
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self):
+        return sorted(set(self._nodes))
+
+    def add(self, node):
+        for i in range(self.vnodes):
+            h = _hash(f"{node}#{i}")
+            idx = bisect.bisect(self._ring, h)
+            self._ring.insert(idx, h)
+            self._nodes.insert(idx, node)
+
+    def remove(self, node):
+        keep = [(h, n) for h, n in zip(self._ring, self._nodes) if n != node]
+        self._ring = [h for h, _ in keep]
+        self._nodes = [n for _, n in keep]
+
+    def node_for(self, key):
+        if not self._ring:
+            raise ValueError("No node in the ring")
+        idx = bisect.bisect(self._ring, _hash(key)) % len(self._ring)
+        return self._nodes[idx]
+
+    def shard(self, keys, node):
+        """Keys assigned to the node"""
+        return [key for key in keys if self.node_for(key) == node]
+
+
+def _read_results(filename):
+    results = {}
+    try:
+        with open(filename, "r") as entrada:
+            for line in entrada:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    # partial line of an interrupted worker
+                    continue
+                results[result["cidr"]] = result
+    except FileNotFoundError:
+        pass
+    return results
+
+
+def _write_json(filename, data):
+    tmp = filename + ".tmp"
+    with open(tmp, "w") as salida:
+        json.dump(data, salida)
+    os.replace(tmp, filename)
+
+
+class ShardWorker:
+    """Check the prefixes of one worker's shard"""
+
+    def __init__(self, shard_dir, name, nodes):
+        self.shard_dir = shard_dir
+        self.name = name
+        self.ring = HashRing(nodes)
+        if name not in self.ring.nodes:
+            raise ValueError(f"Worker {name} is not one of the nodes {nodes}")
+        self.progress = None
+        os.makedirs(os.path.join(shard_dir, "results"), exist_ok=True)
+        os.makedirs(os.path.join(shard_dir, "progress"), exist_ok=True)
+        self.results_file = os.path.join(shard_dir, "results", f"{name}.jsonl")
+        self.progress_file = os.path.join(shard_dir, "progress", f"{name}.json")
+
+    def _done(self):
+        # prefixes done by any worker, so moved prefixes are not checked twice
+        done = set()
+        results_dir = os.path.join(self.shard_dir, "results")
+        for filename in os.listdir(results_dir):
+            if filename.endswith(".jsonl"):
+                for cidr, result in _read_results(
+                    os.path.join(results_dir, filename)
+                ).items():
+                    if "error" not in result:
+                        done.add(cidr)
+        return done
+
+    def check(self, prefixes, check):
+        """Yield the result dict of each prefix of the shard not done yet
+
+        check is called once with those prefixes and yields their result
+        dicts in any order, like batch.check_prefixes. Each result is appended
+        to the results file and counted in the progress as it comes.
+        """
+        shard = self.ring.shard(prefixes, self.name)
+        done = self._done()
+        todo = [cidr for cidr in shard if cidr not in done]
+        progress = self.progress = {
+            "worker": self.name,
+            "assigned": len(shard),
+            "done": len(shard) - len(todo),
+            "failed": 0,
+            "updated": time.time(),
+        }
+        logger.info(
+            f"Worker {self.name} has {len(shard)} prefixes, {len(todo)} to check"
+        )
+        _write_json(self.progress_file, progress)
+
+        with open(self.results_file, "a") as salida:
+            for result in check(todo):
+                salida.write(json.dumps(result) + "\n")
+                salida.flush()
+                if "error" in result:
+                    progress["failed"] += 1
+                else:
+                    progress["done"] += 1
+                progress["updated"] = time.time()
+                _write_json(self.progress_file, progress)
+                yield result
+
+    def run(self, prefixes, check):
+        """Check the shard like check and return the progress"""
+        for _ in self.check(prefixes, check):
+            pass
+        return self.progress
+
+
+class Coordinator:
+    """Merge the results of all workers and track their progress"""
+
+    def __init__(self, shard_dir, nodes):
+        self.shard_dir = shard_dir
+        self.ring = HashRing(nodes)
+
+    def progress(self):
+        progress = {}
+        progress_dir = os.path.join(self.shard_dir, "progress")
+        if os.path.isdir(progress_dir):
+            for filename in sorted(os.listdir(progress_dir)):
+                if filename.endswith(".json"):
+                    with open(os.path.join(progress_dir, filename), "r") as entrada:
+                        data = json.load(entrada)
+                    progress[data["worker"]] = data
+        return progress
+
+    def merge(self, prefixes):
+        """Merge the per-worker results into merged.json and return it
+
+        A success from any worker wins over a failure, so a prefix that failed
+        on one worker and was retried on another after a ring change counts as
+        done.
+        """
+        results = {}
+        results_dir = os.path.join(self.shard_dir, "results")
+        if os.path.isdir(results_dir):
+            for filename in sorted(os.listdir(results_dir)):
+                if not filename.endswith(".jsonl"):
+                    continue
+                for cidr, result in _read_results(
+                    os.path.join(results_dir, filename)
+                ).items():
+                    if cidr not in results or "error" in results[cidr]:
+                        results[cidr] = result
+
+        failed = sorted(c for c in prefixes if "error" in results.get(c, {}))
+        pending = sorted(c for c in prefixes if c not in results)
+        merged = {
+            "results": [results[c] for c in prefixes if c in results],
+            "failed": failed,
+            "pending": {c: self.ring.node_for(c) for c in pending},
+            "progress": self.progress(),
+        }
+        _write_json(os.path.join(self.shard_dir, "merged.json"), merged)
+        return merged
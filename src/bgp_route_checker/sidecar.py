@@ -0,0 +1,216 @@
+"""Summary sidecars of saved responses
+
+Next to each saved qrator-<cidr>-<timestamp>.json(.gz), a sidecar
+qrator-<cidr>-<timestamp>.summary holds the analysis of the dump: origin,
+peer and prepend peer counts, path count, mean path length and the sha256 of
+the response body. Questions about past origins and peers read these few
+hundred bytes instead of parsing the dump again. The suffix keeps sidecars
+out of a qrator-*.json glob of the dumps.
+
+index.json in the directory keeps the summaries of all the sidecars by
+sidecar name, so the history of a prefix is one file read. Summaries are
+looked up in the index first, then in sidecars not indexed yet, and only
+dumps without a sidecar are parsed, their sidecar written on the way.
+
+build_index summarizes the dumps without a sidecar in worker processes.
+Each sidecar is written as soon as its dump is done, so an interrupted
+build resumes with the dumps still left.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from .analysis import PathAnalyzer
+from .exceptions import PrefixNotFoundError
+from .persist import read_saved
+from .results import CheckResult
+
+logger = logging.getLogger(__name__)
+
+SUFFIX = ".summary"
+INDEX = "index.json"
+
+# errors of a dump that cannot be read or is not a Qrator response
+_ERRORS = (OSError, EOFError, ValueError)
+
+_DUMP = re.compile(r"^qrator-(.+)-(\d{8}-\d{6})\.json(\.gz)?$")
+
+
+def _write_json(filename, data):
+    tmp = filename + ".tmp"
+    with open(tmp, "w") as salida:
+        json.dump(data, salida)
+    os.replace(tmp, filename)
+
+
+def parse_dump_name(filename):
+    """(cidr, timestamp) from a dump filename, None if it is not one"""
+    m = _DUMP.match(os.path.basename(filename))
+    if not m:
+        return None
+    network, _, length = m.group(1).rpartition("-")
+    timestamp = datetime.strptime(m.group(2), "%Y%m%d-%H%M%S")
+    return f"{network}/{length}", timestamp
+
+
+def sidecar_name(filename):
+    """Sidecar filename of a dump, saved compressed or not"""
+    if filename.endswith(".gz"):
+        filename = filename[:-3]
+    if filename.endswith(".json"):
+        filename = filename[:-5]
+    return filename + SUFFIX
+
+
+def make_summary(result, filename, body):
+    """Sidecar dict of the CheckResult or result dict of a dump"""
+    summary = dict(result if isinstance(result, dict) else result.as_dict())
+    # the name of the dump, saved compressed or not
+    name = os.path.basename(filename)
+    summary["dump"] = name[:-3] if name.endswith(".gz") else name
+    summary["sha256"] = hashlib.sha256(body).hexdigest()
+    parsed = parse_dump_name(filename)
+    if parsed:
+        summary["timestamp"] = parsed[1].isoformat()
+    return summary
+
+
+def write_sidecar(filename, summary):
+    """Write the summary next to the dump, replacing it atomically"""
+    _write_json(sidecar_name(filename), summary)
+
+
+def read_sidecar(filename):
+    """Summary in the sidecar of a dump, None if missing or unreadable"""
+    try:
+        with open(sidecar_name(filename), "r") as entrada:
+            return json.load(entrada)
+    except (OSError, ValueError):
+        return None
+
+
+def summarize_dump(filename, analyzer=None):
+    """Parse and analyze a dump and write its sidecar, returning the summary
+
+    A dump without paths gets a summary of zero paths, ValueError if it is
+    not a Qrator response.
+    """
+    analyzer = analyzer or PathAnalyzer()
+    body = read_saved(filename)
+    data = json.loads(body)
+    data = data.get("data") if isinstance(data, dict) else None
+    if not isinstance(data, dict):
+        raise ValueError(f"{filename} is not a Qrator response")
+    parsed = parse_dump_name(filename)
+    if parsed and (parsed[0] in data or not data):
+        cidr = parsed[0]
+    else:
+        cidr = next(iter(data), None)
+    paths = data.get(cidr, [])
+    if paths is None:
+        # kept too, so the dump is not parsed again
+        result = {"cidr": cidr, "error": str(PrefixNotFoundError(cidr))}
+    elif not isinstance(paths, list):
+        raise ValueError(f"Invalid paths of {cidr} in {filename}")
+    elif not paths:
+        result = CheckResult(cidr, None, Counter(), Counter(), Counter(), 0)
+    else:
+        result = analyzer.analyze(paths, cidr)
+    summary = make_summary(result, filename, body)
+    write_sidecar(filename, summary)
+    return summary
+
+
+def _summarize(filename):
+    # (filename, error) in a worker process, the sidecar written there
+    try:
+        summarize_dump(filename)
+    except _ERRORS as e:
+        return filename, f"{type(e).__name__}: {e}"
+    return filename, None
+
+
+def find_dumps(directory):
+    """Dump filenames in the directory, oldest first per prefix"""
+    dumps = [
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if _DUMP.match(name)
+    ]
+    return sorted(dumps, key=lambda d: parse_dump_name(d))
+
+
+def load_index(directory):
+    """Summaries by sidecar name in the index of the directory"""
+    try:
+        with open(os.path.join(directory, INDEX), "r") as entrada:
+            return json.load(entrada)["sidecars"]
+    except FileNotFoundError:
+        return {}
+
+
+def build_index(directory, workers=1):
+    """Write missing sidecars and the index, returning (index, built, errors)
+
+    errors is a list of (dump filename, error message).
+    """
+    dumps = find_dumps(directory)
+    todo = [d for d in dumps if not os.path.exists(sidecar_name(d))]
+    errors = []
+    if todo:
+        logger.info(f"Summarizing {len(todo)} of {len(dumps)} dumps in {directory}")
+        if workers > 1 and len(todo) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                for filename, error in ex.map(
+                    _summarize, todo, chunksize=max(1, len(todo) // (workers * 4))
+                ):
+                    if error:
+                        errors.append((filename, error))
+        else:
+            for filename in todo:
+                filename, error = _summarize(filename)
+                if error:
+                    errors.append((filename, error))
+
+    index = load_index(directory)
+    for dump in dumps:
+        name = os.path.basename(sidecar_name(dump))
+        if name not in index:
+            summary = read_sidecar(dump)
+            if summary is not None:
+                index[name] = summary
+    _write_json(os.path.join(directory, INDEX), {"sidecars": index})
+    return index, len(todo) - len(errors), errors
+
+
+def summaries(directory, cidr=None):
+    """Summaries of the dumps in the directory, of one prefix or all
+
+    Oldest first. The index and sidecars are used where they exist, and the
+    dumps without a sidecar are parsed, skipping those that cannot be read.
+    """
+    index = load_index(directory)
+    found = []
+    analyzer = None
+    for dump in find_dumps(directory):
+        if cidr is not None and parse_dump_name(dump)[0] != cidr:
+            continue
+        summary = index.get(os.path.basename(sidecar_name(dump)))
+        if summary is None:
+            summary = read_sidecar(dump)
+        if summary is None:
+            analyzer = analyzer or PathAnalyzer()
+            logger.debug(f"No sidecar for {dump}, parsing it")
+            try:
+                summary = summarize_dump(dump, analyzer)
+            except _ERRORS as e:
+                logger.warning(f"Skipping {dump}: {type(e).__name__}: {e}")
+                continue
+        found.append(summary)
+    return found
@@ -0,0 +1,182 @@
+"""Streaming sketches with fixed memory for peer ASN frequency
+
+SpaceSaving keeps the top-k heavy hitters with k counters. Every count is an
+overestimate by at most the item's recorded error, and the error is at most
+N/k for a stream of N items, so any item with frequency above N/k is kept.
+The counter to replace is found with a min-heap holding one entry per item,
+refreshed only when it comes to the top, so an increment is O(1) and a
+replacement O(log k) amortized.
+ref) Metwally et al., Efficient Computation of Frequent and Top-k Elements in
+Data Streams, 2005
+
+CountMinSketch estimates the frequency of any item. With width w=ceil(e/epsilon)
+and depth d=ceil(ln(1/delta)), the estimate is never below the true count and
+exceeds it by more than epsilon*N with probability at most delta.
+ref) Cormode and Muthukrishnan, An Improved Data Stream Summary: The Count-Min
+Sketch and its Applications, 2005
+
+Both can be merged, so parallel workers can sketch their share of the stream
+and combine the results.
+"""
+
+import hashlib
+import heapq
+import math
+from array import array
+
+
+class SpaceSaving:
+    """Top-k heavy hitters in k counters"""
+
+    def __init__(self, k=100):
+        self.k = k
+        self.n = 0
+        # item -> [count, error]
+        self.counters = {}
+        # (count, item) per item, the count at most the current one
+        self._heap = []
+
+    def add(self, item, count=1):
+        self.n += count
+        c = self.counters.get(item)
+        if c is not None:
+            c[0] += count
+        elif len(self.counters) < self.k:
+            self.counters[item] = [count, 0]
+            heapq.heappush(self._heap, (count, item))
+        else:
+            # replace the item with minimum count, inheriting it as error
+            victim, floor = self._pop_min()
+            del self.counters[victim]
+            self.counters[item] = [floor + count, floor]
+            heapq.heappush(self._heap, (floor + count, item))
+
+    def _pop_min(self):
+        # (item, count) of the minimum count, removed from the heap
+        heap = self._heap
+        while True:
+            count, item = heap[0]
+            current = self.counters[item][0]
+            if count == current:
+                heapq.heappop(heap)
+                return item, count
+            # outdated by increments since it was pushed
+            heapq.heapreplace(heap, (current, item))
+
+    def _heapify(self):
+        self._heap = [(c, item) for item, (c, _) in self.counters.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, n=None):
+        """List of (item, count, error) with highest count first"""
+        items = sorted(
+            ((item, c, e) for item, (c, e) in self.counters.items()),
+            key=lambda x: x[1],
+            reverse=True,
+        )
+        return items[:n] if n else items
+
+    def error_bound(self):
+        """Maximum overestimate of any reported count"""
+        return self.n / self.k
+
+    def merge(self, other):
+        """Combine with another SpaceSaving of the same k"""
+        if other.k != self.k:
+            raise ValueError("Cannot merge SpaceSaving of different k")
+        # items missing from a full sketch may have up to its minimum count
+        floor_self = self._floor()
+        floor_other = other._floor()
+        merged = {}
+        for item in set(self.counters) | set(other.counters):
+            c1, e1 = self.counters.get(item, (floor_self, floor_self))
+            c2, e2 = other.counters.get(item, (floor_other, floor_other))
+            merged[item] = [c1 + c2, e1 + e2]
+        top = sorted(merged.items(), key=lambda x: x[1][0], reverse=True)
+        self.counters = dict(top[: self.k])
+        self._heapify()
+        self.n += other.n
+        return self
+
+    def _floor(self):
+        if len(self.counters) < self.k:
+            return 0
+        return min(c for c, _ in self.counters.values())
+
+    def as_dict(self):
+        return {"k": self.k, "n": self.n, "counters": self.counters}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["k"])
+        sketch.n = data["n"]
+        sketch.counters = {k: list(v) for k, v in data["counters"].items()}
+        sketch._heapify()
+        return sketch
+
+
+def _hash_pair(item):
+    digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+
+
+class CountMinSketch:
+    """Frequency estimate of any item in width*depth counters"""
+
+    def __init__(self, epsilon=0.001, delta=0.01, width=None, depth=None):
+        self.width = width or math.ceil(math.e / epsilon)
+        self.depth = depth or math.ceil(math.log(1 / delta))
+        self.n = 0
+        self.table = array("q", bytes(8 * self.width * self.depth))
+
+    def _cells(self, item):
+        # d hash functions out of two, ref) Kirsch and Mitzenmacher, 2006
+        h1, h2 = _hash_pair(item)
+        w = self.width
+        return [row * w + (h1 + row * h2) % w for row in range(self.depth)]
+
+    def add(self, item, count=1):
+        self.n += count
+        for i in self._cells(item):
+            self.table[i] += count
+
+    def estimate(self, item):
+        return min(self.table[i] for i in self._cells(item))
+
+    __getitem__ = estimate
+
+    @property
+    def epsilon(self):
+        return math.e / self.width
+
+    @property
+    def delta(self):
+        return math.exp(-self.depth)
+
+    def error_bound(self):
+        """Overestimate not exceeded with probability 1 - delta"""
+        return self.epsilon * self.n
+
+    def merge(self, other):
+        """Combine with another CountMinSketch of the same width and depth"""
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge CountMinSketch of different size")
+        for i, v in enumerate(other.table):
+            self.table[i] += v
+        self.n += other.n
+        return self
+
+    def as_dict(self):
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "n": self.n,
+            "table": self.table.tobytes().hex(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(width=data["width"], depth=data["depth"])
+        sketch.n = data["n"]
+        sketch.table = array("q", bytes.fromhex(data["table"]))
+        return sketch
@@ -0,0 +1,224 @@
+"""Exact aggregation within a memory budget
+
+SpillingCounter sums fixed-width int tuples by string key. The size of the
+in-memory dict is estimated as keys are added, and when it goes over the
+limit the entries are written out sorted by key to a temporary run file and
+the dict starts over. items() merges the runs and what is still in memory
+with a k-way heapq.merge, summing equal keys, so the sums are the same as
+without a limit whatever the number of spills. Once MAX_RUNS runs are
+written they are merged into one, to keep the number of open files bounded.
+
+CrossPrefixReport keeps the peer and origin totals of many prefixes in two
+such counters, and its top lists are taken from the merged stream, so the
+report of a run with a memory limit is identical to one without.
+
+Spool keeps result dicts in a temporary jsonl file instead of a list.
+"""
+
+import heapq
+import json
+import os
+import sys
+import tempfile
+
+MAX_RUNS = 64
+
+
+def parse_size(text):
+    """Bytes of a size like 512M, 2G or 100000"""
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+class SpillingCounter:
+    """Sums of int tuples by string key, spilled to sorted runs over limit"""
+
+    def __init__(self, limit=None, width=1, directory=None):
+        self.limit = limit
+        self.width = width
+        self.directory = directory
+        self.runs = []
+        self.spilled = 0
+        self.peak = 0
+        self._counts = {}
+        self._bytes = 0
+        # estimated dict slot and value list of one entry, without the key
+        self._entry = 64 + sys.getsizeof([0] * width) + 28 * width
+
+    def __len__(self):
+        """Number of keys in memory, not counting the spilled runs"""
+        return len(self._counts)
+
+    def add(self, key, *values):
+        counts = self._counts.get(key)
+        if counts is None:
+            self._counts[key] = list(values)
+            self._bytes += sys.getsizeof(key) + self._entry
+            self.peak = max(self.peak, self._bytes)
+            if self.limit is not None and self._bytes > self.limit:
+                self.spill()
+        else:
+            for i, v in enumerate(values):
+                counts[i] += v
+
+    def spill(self):
+        """Write the in-memory entries to a sorted run file"""
+        if not self._counts:
+            return
+        self.runs.append(
+            self._write_run((key, self._counts[key]) for key in sorted(self._counts))
+        )
+        self.spilled += len(self._counts)
+        self._counts = {}
+        self._bytes = 0
+        if len(self.runs) >= MAX_RUNS:
+            runs = self.runs
+            self.runs = [self._write_run(self._merge(runs))]
+            for filename in runs:
+                os.remove(filename)
+
+    def _write_run(self, items):
+        # sorted (key, values) to a new run file
+        fd, filename = tempfile.mkstemp(
+            prefix="spill-", suffix=".tsv", dir=self.directory
+        )
+        with os.fdopen(fd, "w") as salida:
+            for key, values in items:
+                salida.write(key + "\t" + "\t".join(map(str, values)) + "\n")
+        return filename
+
+    @staticmethod
+    def _read_run(filename):
+        with open(filename, "r") as entrada:
+            for line in entrada:
+                key, *values = line.rstrip("\n").split("\t")
+                yield key, [int(v) for v in values]
+
+    def items(self):
+        """Yield (key, sums) for every key in key order"""
+        return self._merge(self.runs, self._counts)
+
+    def _merge(self, runs, counts=None):
+        streams = [self._read_run(filename) for filename in runs]
+        if counts:
+            streams.append((key, counts[key]) for key in sorted(counts))
+        current = None
+        sums = None
+        for key, values in heapq.merge(*streams, key=lambda item: item[0]):
+            if key == current:
+                for i, v in enumerate(values):
+                    sums[i] += v
+                continue
+            if current is not None:
+                yield current, tuple(sums)
+            current = key
+            sums = list(values)
+        if current is not None:
+            yield current, tuple(sums)
+
+    def close(self):
+        """Remove the run files"""
+        for filename in self.runs:
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+        self.runs = []
+
+
+class CrossPrefixReport:
+    """Exact path and prefix totals of peer and origin ASNs over prefixes
+
+    limit is the memory budget in bytes shared by the two counters, None for
+    no limit.
+    """
+
+    def __init__(self, limit=None, directory=None):
+        share = limit // 2 if limit is not None else None
+        self.peers = SpillingCounter(share, width=2, directory=directory)
+        self.origins = SpillingCounter(share, width=2, directory=directory)
+        self.prefixes = 0
+        self.path_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, result):
+        """Add a result dict or CheckResult"""
+        if not isinstance(result, dict):
+            result = result.as_dict()
+        self.prefixes += 1
+        self.path_count += result["path_count"]
+        for asn, n in result["peers"]:
+            self.peers.add(asn, n, 1)
+        for asn, n in result["origins"]:
+            self.origins.add(asn, n, 1)
+
+    @staticmethod
+    def _top(counter, k):
+        # highest path count first, ties by ASN, same as results.ranked
+        distinct = [0]
+
+        def stream():
+            for asn, (paths, prefixes) in counter.items():
+                distinct[0] += 1
+                yield -paths, asn, prefixes
+
+        top = heapq.nsmallest(k, stream())
+        return distinct[0], [(asn, -paths, prefixes) for paths, asn, prefixes in top]
+
+    def as_dict(self, k=20):
+        """Totals and the top k ASNs as (asn, paths, prefixes)"""
+        peers, top_peers = self._top(self.peers, k)
+        origins, top_origins = self._top(self.origins, k)
+        return {
+            "prefixes": self.prefixes,
+            "path_count": self.path_count,
+            "peers": peers,
+            "origins": origins,
+            "top_peers": top_peers,
+            "top_origins": top_origins,
+        }
+
+    def spill_stats(self):
+        """(run files on disk, entries spilled, peak estimated bytes in memory)"""
+        return (
+            len(self.peers.runs) + len(self.origins.runs),
+            self.peers.spilled + self.origins.spilled,
+            self.peers.peak + self.origins.peak,
+        )
+
+    def close(self):
+        self.peers.close()
+        self.origins.close()
+
+
+class Spool:
+    """Append-only list of dicts kept in a temporary jsonl file"""
+
+    def __init__(self, directory=None):
+        self._file = tempfile.TemporaryFile("w+", dir=directory)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, item):
+        self._file.write(json.dumps(item) + "\n")
+        self._count += 1
+
+    def __iter__(self):
+        self._file.flush()
+        self._file.seek(0)
+        for line in self._file:
+            yield json.loads(line)
+        self._file.seek(0, os.SEEK_END)
+
+    def close(self):
+        self._file.close()
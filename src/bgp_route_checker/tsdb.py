@@ -0,0 +1,227 @@
+"""Time-series store of per-prefix summaries
+
+Every check appends one raw point per prefix: path count, origin counts, peer
+counts, path-prepend peer counts and mean path length. Each point is also
+folded into an hourly and a daily rollup as it is appended, so the rollups
+never need to be rebuilt. Raw points and hourly rollups are expired after
+their retention, daily rollups are kept.
+
+A range query reads the finest tier still covering the start of the range,
+through the (cidr, time) primary key of that tier only.
+
+The store is a sqlite3 database, one file with no server to run.
+"""
+
+import json
+import sqlite3
+import time
+
+RAW = "raw"
+HOUR = "hour"
+DAY = "day"
+
+_BUCKETS = {HOUR: 3600, DAY: 86400}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS raw (
+    cidr TEXT NOT NULL,
+    ts REAL NOT NULL,
+    path_count INTEGER NOT NULL,
+    mean_path_length REAL NOT NULL,
+    origins TEXT NOT NULL,
+    peers TEXT NOT NULL,
+    prepends TEXT NOT NULL,
+    PRIMARY KEY (cidr, ts)
+);
+CREATE INDEX IF NOT EXISTS raw_ts ON raw (ts);
+CREATE TABLE IF NOT EXISTS rollup (
+    tier TEXT NOT NULL,
+    cidr TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    path_count_sum INTEGER NOT NULL,
+    path_count_min INTEGER NOT NULL,
+    path_count_max INTEGER NOT NULL,
+    mean_path_length_sum REAL NOT NULL,
+    origins TEXT NOT NULL,
+    peers TEXT NOT NULL,
+    prepends TEXT NOT NULL,
+    PRIMARY KEY (tier, cidr, ts)
+);
+CREATE INDEX IF NOT EXISTS rollup_ts ON rollup (tier, ts);
+"""
+
+
+def _counts(pairs):
+    # (asn, count) pairs of a summary dict, or a Counter
+    return dict(pairs.items() if isinstance(pairs, dict) else pairs)
+
+
+def _add_counts(a, b):
+    for k, v in b.items():
+        a[k] = a.get(k, 0) + v
+    return a
+
+
+class TimeSeriesStore:
+    """sqlite3 store of per-prefix metrics with hourly and daily rollups"""
+
+    def __init__(self, filename, raw_retention=7 * 86400, hour_retention=90 * 86400):
+        self.filename = filename
+        self.raw_retention = raw_retention
+        self.hour_retention = hour_retention
+        self.db = sqlite3.connect(filename)
+        self.db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.expire()
+        self.db.commit()
+        self.db.close()
+
+    def append(self, result, ts=None):
+        """Append a result dict or CheckResult as a raw point and roll it up"""
+        if not isinstance(result, dict):
+            result = result.as_dict()
+        ts = ts if ts is not None else time.time()
+        cidr = result["cidr"]
+        path_count = result["path_count"]
+        length = result["mean_path_length"]
+        origins = _counts(result["origins"])
+        peers = _counts(result["peers"])
+        prepends = _counts(result["peers_pathprepend"])
+
+        with self.db:
+            cursor = self.db.execute(
+                "INSERT OR IGNORE INTO raw VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    cidr,
+                    ts,
+                    path_count,
+                    length,
+                    json.dumps(origins),
+                    json.dumps(peers),
+                    json.dumps(prepends),
+                ),
+            )
+            # the same point appended twice is only rolled up once
+            if not cursor.rowcount:
+                return
+            for tier, size in _BUCKETS.items():
+                bucket = int(ts) - int(ts) % size
+                row = self.db.execute(
+                    "SELECT n, path_count_sum, path_count_min, path_count_max,"
+                    " mean_path_length_sum, origins, peers, prepends"
+                    " FROM rollup WHERE tier = ? AND cidr = ? AND ts = ?",
+                    (tier, cidr, bucket),
+                ).fetchone()
+                if row is None:
+                    values = (1, path_count, path_count, path_count, length)
+                    merged = (origins, peers, prepends)
+                else:
+                    values = (
+                        row[0] + 1,
+                        row[1] + path_count,
+                        min(row[2], path_count),
+                        max(row[3], path_count),
+                        row[4] + length,
+                    )
+                    merged = (
+                        _add_counts(json.loads(row[5]), origins),
+                        _add_counts(json.loads(row[6]), peers),
+                        _add_counts(json.loads(row[7]), prepends),
+                    )
+                self.db.execute(
+                    "INSERT OR REPLACE INTO rollup"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (tier, cidr, bucket)
+                    + values
+                    + tuple(json.dumps(m) for m in merged),
+                )
+
+    def expire(self, now=None):
+        """Delete raw points and hourly rollups older than their retention"""
+        now = now if now is not None else time.time()
+        with self.db:
+            self.db.execute("DELETE FROM raw WHERE ts < ?", (now - self.raw_retention,))
+            self.db.execute(
+                "DELETE FROM rollup WHERE tier = ? AND ts < ?",
+                (HOUR, now - self.hour_retention),
+            )
+
+    def tier_for(self, start, now=None):
+        """Finest tier still holding data from start"""
+        now = now if now is not None else time.time()
+        if start >= now - self.raw_retention:
+            return RAW
+        if start >= now - self.hour_retention:
+            return HOUR
+        return DAY
+
+    def query(self, cidr, start, end=None, tier=None):
+        """List of point dicts of cidr between start and end, oldest first
+
+        Rollup points have n, the number of raw points in them, min and max
+        path count, and summed origin, peer and prepend counts. path_count and
+        mean_path_length are averages over the bucket.
+        """
+        end = end if end is not None else time.time()
+        tier = tier or self.tier_for(start)
+        if tier == RAW:
+            rows = self.db.execute(
+                "SELECT ts, path_count, mean_path_length, origins, peers, prepends"
+                " FROM raw WHERE cidr = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+                (cidr, start, end),
+            )
+            return [
+                {
+                    "ts": ts,
+                    "n": 1,
+                    "path_count": path_count,
+                    "path_count_min": path_count,
+                    "path_count_max": path_count,
+                    "mean_path_length": length,
+                    "origins": json.loads(origins),
+                    "peers": json.loads(peers),
+                    "prepends": json.loads(prepends),
+                }
+                for ts, path_count, length, origins, peers, prepends in rows
+            ]
+
+        # buckets overlapping the range
+        start = start - start % _BUCKETS[tier]
+        rows = self.db.execute(
+            "SELECT ts, n, path_count_sum, path_count_min, path_count_max,"
+            " mean_path_length_sum, origins, peers, prepends FROM rollup"
+            " WHERE tier = ? AND cidr = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+            (tier, cidr, start, end),
+        )
+        return [
+            {
+                "ts": ts,
+                "n": n,
+                "path_count": count_sum / n,
+                "path_count_min": count_min,
+                "path_count_max": count_max,
+                "mean_path_length": length_sum / n,
+                "origins": json.loads(origins),
+                "peers": json.loads(peers),
+                "prepends": json.loads(prepends),
+            }
+            for (
+                ts,
+                n,
+                count_sum,
+                count_min,
+                count_max,
+                length_sum,
+                origins,
+                peers,
+                prepends,
+            ) in rows
+        ]
@@ -0,0 +1,22 @@
+"""Validation of the prefix given to check"""
+
+import ipaddress
+
+from .exceptions import InvalidCIDRError, PrivateCIDRError
+
+
+def validate_ipv4network(cidr):
+    """Return the CIDR if it is a public IPv4 network with a prefix length"""
+    try:
+        network = ipaddress.IPv4Network(cidr)
+    except ValueError:
+        raise InvalidCIDRError(
+            f"Expecting IPv4 prefix like 10.0.0.0/24. String given is {cidr}."
+        ) from None
+    if network.is_private:
+        raise PrivateCIDRError(f"{cidr} is on private IP range.")
+    if "/" not in cidr:
+        raise InvalidCIDRError(
+            f"No prefix was given in {cidr}, BGP route won't be checked with /32 netmask."
+        )
+    return cidr
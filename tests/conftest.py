@@ -0,0 +1,131 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import urllib.parse
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# the package is used from src without installing it, like the script does
+sys.path.insert(0, SRC)
+
+from bgp_route_checker import QratorResponse  # noqa: E402
+from bgp_route_checker.exceptions import QratorError  # noqa: E402
+
+PATHS = ["11039,6461,2516", "9902,1299,2516", "11071,3356,2516,2516"]
+
+
+def body(cidr, paths=PATHS):
+    """Qrator API reply body with paths for cidr"""
+    return json.dumps({"data": {cidr: paths}}).encode()
+
+
+class FakeClient:
+    """Qrator client answering without network
+
+    Answers the bodies given by CIDR, or else a reply with paths for any
+    CIDR. paths None fails with QratorError, and a wait Event holds fetches
+    until it is set.
+    """
+
+    def __init__(self, bodies=None, paths=PATHS, wait=None):
+        self.bodies = bodies
+        self.paths = paths
+        self.wait = wait
+        self.fetched = []
+        self.stats = {}
+
+    @property
+    def calls(self):
+        return len(self.fetched)
+
+    def fetch(self, cidr):
+        self.fetched.append(cidr)
+        if self.wait is not None:
+            self.wait.wait(5)
+        if self.bodies is not None:
+            return QratorResponse(cidr, "http://qrator/", self.bodies[cidr])
+        if self.paths is None:
+            raise QratorError("Failed to receive response")
+        return QratorResponse(cidr, "http://qrator/", body(cidr, self.paths))
+
+    def latency_percentile(self, p):
+        return None
+
+
+class QratorHandler(BaseHTTPRequestHandler):
+    """Stand-in Qrator API answering PATHS for any prefix, with an ETag
+
+    The headers of each request are kept in requests.
+    """
+
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(dict(self.headers.items()))
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        reply = body(query["prefix"][0])
+        etag = '"%d"' % zlib.crc32(reply)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def serve():
+    """Start a server with a handler class, returning the Qrator URL template"""
+    servers = []
+
+    def serve(handler):
+        handler.requests = []
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True).start()
+        servers.append(httpd)
+        return f"http://127.0.0.1:{httpd.server_port}/v1/get-all-paths?prefix={{}}"
+
+    yield serve
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+@pytest.fixture
+def qrator_url(serve):
+    return serve(QratorHandler)
+
+
+@pytest.fixture
+def run_script(tmp_path):
+    """Run bgp-route-checker.py with arguments, returning the CompletedProcess"""
+    # run from tmp_path, where it writes its log next to itself
+    script = shutil.copy(os.path.join(SRC, "bgp-route-checker.py"), tmp_path)
+
+    def run(*args, **kwargs):
+        return subprocess.run(
+            [sys.executable, script, *args],
+            cwd=tmp_path,
+            env=dict(os.environ, PYTHONPATH=SRC),
+            timeout=60,
+            **kwargs,
+        )
+
+    return run
@@ -0,0 +1,91 @@
+import gzip
+import json
+
+from bgp_route_checker.aggregate import (
+    PeerAggregate,
+    aggregate_files,
+    iter_saved,
+    peers_of,
+)
+from bgp_route_checker.persist import WriteBehindWriter
+
+PATHS = {
+    "1.1.0.0/16": ["11039,6461,2516", "9902,1299,2516", "11071,3356,2516,2516"],
+    "2.2.0.0/16": ["11039,1299,64500", "9902,1299,64500", "1,174,64501"],
+    "3.3.0.0/16": ["11039,3356,13335"],
+}
+
+
+def save(directory, compress=False):
+    filenames = []
+    with WriteBehindWriter(compress=compress) as writer:
+        for i, (cidr, paths) in enumerate(PATHS.items()):
+            filename = str(directory / f"qrator-{i}.json")
+            body = json.dumps({"data": {cidr: paths}}).encode()
+            writer.submit(filename, body)
+            filenames.append(filename + (".gz" if compress else ""))
+    return filenames
+
+
+def test_peers_of():
+    # next to the most common origin, the other origin being a peer
+    assert list(peers_of(PATHS["2.2.0.0/16"])) == ["1299", "1299", "64501"]
+    assert list(peers_of([])) == []
+
+
+def test_iter_saved(tmp_path):
+    assert dict(iter_saved(save(tmp_path, compress=True))) == PATHS
+
+
+def test_iter_saved_skips_unreadable(tmp_path, caplog):
+    bad = {
+        "error.json": b"<html>Bad Gateway</html>",
+        "gzip.json.gz": gzip.compress(b"<html>Bad Gateway</html>"),
+        "truncated.json.gz": gzip.compress(b'{"data": {}}')[:-8],
+        "null.json": b'{"data": null}',
+        "list.json": b'["data"]',
+        "paths.json": b'{"data": {"4.4.0.0/16": "1,2", "5.5.0.0/16": null}}',
+    }
+    filenames = []
+    for name, body in bad.items():
+        (tmp_path / name).write_bytes(body)
+        filenames.append(str(tmp_path / name))
+    filenames.append(str(tmp_path / "missing.json"))
+    good = save(tmp_path)
+    assert dict(iter_saved(filenames + good)) == PATHS
+    warned = [r.getMessage() for r in caplog.records if r.levelname == "WARNING"]
+    # the missing file too
+    assert len(warned) == len(bad) + 1
+    assert aggregate_files(filenames + good, k=10).prefixes == len(PATHS)
+
+
+def test_aggregate(tmp_path):
+    agg = aggregate_files(save(tmp_path), k=10)
+    assert agg.prefixes == 3
+    assert agg.top.top(1) == [("1299", 3, 0)]
+    assert agg.freq.estimate("3356") >= 2
+    assert agg.asns.count() == 12
+    assert agg.vantages.count() == 4
+    assert agg.prefix_vantages["1.1.0.0/16"].count() == 3
+
+
+def test_aggregate_workers_same(tmp_path):
+    filenames = save(tmp_path)
+    one = aggregate_files(filenames, k=10)
+    many = aggregate_files(filenames, k=10, workers=2)
+    assert many.prefixes == one.prefixes
+    assert sorted(many.top.top(10)) == sorted(one.top.top(10))
+    assert many.asns.count() == one.asns.count()
+
+
+def test_distinct_state(tmp_path):
+    agg = PeerAggregate()
+    agg.add_paths(PATHS["1.1.0.0/16"], "1.1.0.0/16")
+    filename = str(tmp_path / "distinct.json")
+    agg.save_distinct(filename)
+
+    later = PeerAggregate()
+    later.add_paths(PATHS["2.2.0.0/16"], "2.2.0.0/16")
+    later.load_distinct(filename)
+    assert later.vantages.count() == 4
+    assert set(later.prefix_vantages) == {"1.1.0.0/16", "2.2.0.0/16"}
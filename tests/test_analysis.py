@@ -0,0 +1,79 @@
+import pytest
+
+from bgp_route_checker import (
+    InvalidCIDRError,
+    PathAnalyzer,
+    PrivateCIDRError,
+    summarize,
+    validate_ipv4network,
+)
+
+PATHS = [
+    "1003,12186,32097,1299,2516",
+    "11039,6461,2516",
+    "11071,3356,2516,2516",
+    "9902,1299,2516",
+]
+
+
+def test_summarize():
+    assert summarize(PATHS) == {
+        "origin_asn": "2516",
+        "origins": [("2516", 4)],
+        "peers": [("1299", 2), ("3356", 1), ("6461", 1)],
+        "peers_pathprepend": [("3356", 1)],
+        "transits": [("12186", 1), ("32097", 1)],
+        "path_count": 4,
+        "mean_path_length": 3.75,
+    }
+
+
+def test_no_paths():
+    assert summarize([]) == {
+        "origin_asn": None,
+        "origins": [],
+        "peers": [],
+        "peers_pathprepend": [],
+        "transits": [],
+        "path_count": 0,
+        "mean_path_length": 0.0,
+    }
+
+
+def test_moas():
+    result = PathAnalyzer().analyze(PATHS + ["174,64500", "3356,64500"], "x")
+    assert result.moas
+    assert result.origin_asn == "2516"
+    # a path ending with another origin has that origin as its peer
+    assert result.peers["64500"] == 2
+
+
+def test_tied_origins_first_seen():
+    # the origin picked as Counter.most_common does, the lists ordered by ASN
+    paths = ["1,64500", "2,2516", "3,2516", "4,64500"]
+    result = summarize(paths)
+    assert result["origin_asn"] == "64500"
+    assert result["origins"] == [("2516", 2), ("64500", 2)]
+    assert summarize(paths[1:] + paths[:1])["origin_asn"] == "2516"
+
+
+def test_split_cache():
+    analyzer = PathAnalyzer(max_cached=2)
+    a = analyzer.split("1,2,3")
+    assert analyzer.split("1,2,3") is a
+    analyzer.split("4,5")
+    analyzer.split("6,7")
+    # dropped when it grew beyond max_cached
+    assert len(analyzer._split) == 1
+
+
+def test_validate():
+    assert validate_ipv4network("111.98.0.0/16") == "111.98.0.0/16"
+    with pytest.raises(PrivateCIDRError):
+        validate_ipv4network("10.0.0.0/8")
+    with pytest.raises(InvalidCIDRError):
+        validate_ipv4network("111.98.0.1/16")
+    with pytest.raises(InvalidCIDRError):
+        validate_ipv4network("111.98.0.0")
+    with pytest.raises(InvalidCIDRError):
+        validate_ipv4network("example.com")
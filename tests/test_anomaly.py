@@ -0,0 +1,80 @@
+import statistics
+
+import pytest
+
+from bgp_route_checker import AnomalyDetector, PathAnalyzer, observation
+from bgp_route_checker.anomaly import (
+    MOAS,
+    NEW_ORIGIN,
+    PATH_LENGTH_JUMP,
+    PEER_LOSS,
+    RunningStat,
+    result_observation,
+)
+
+PATHS = [
+    "1003,12186,32097,1299,2516",
+    "11039,6461,2516",
+    "11071,3356,2516,2516",
+    "9902,1299,2516",
+]
+
+
+def kinds(anomalies):
+    return [kind for kind, _ in anomalies]
+
+
+def test_running_stat():
+    values = [3, 1, 4, 1, 5, 9, 2, 6]
+    stat = RunningStat()
+    for x in values:
+        stat.update(x, 0.5)
+    assert stat.n == len(values)
+    assert stat.mean == pytest.approx(statistics.mean(values))
+    assert stat.variance == pytest.approx(statistics.variance(values))
+
+
+def test_observation():
+    assert observation(PATHS) == (4, 3, 3.75, {"2516"})
+    result = PathAnalyzer().analyze(PATHS, "10.0.0.0/8")
+    assert result_observation(result) == observation(PATHS)
+    assert result_observation(result.as_dict()) == observation(PATHS)
+
+
+def test_moas_and_new_origin():
+    detector = AnomalyDetector()
+    assert detector.observe("p", 4, 3, 3.0, {"1"}) == []
+    assert kinds(detector.observe("p", 4, 3, 3.0, {"1", "2"})) == [MOAS, NEW_ORIGIN]
+    assert kinds(detector.observe("p", 4, 3, 3.0, {"3"})) == [NEW_ORIGIN]
+
+
+def test_peer_loss_and_path_length_jump():
+    detector = AnomalyDetector(min_samples=5)
+    for _ in range(5):
+        assert detector.observe("p", 100, 20, 4.0, {"1"}) == []
+    assert kinds(detector.observe("p", 100, 5, 4.0, {"1"})) == [PEER_LOSS]
+    assert kinds(detector.observe("p", 100, 20, 7.0, {"1"})) == [PATH_LENGTH_JUMP]
+
+
+def test_state_file(tmp_path):
+    state = str(tmp_path / "anomaly.db")
+    with AnomalyDetector(state) as detector:
+        detector.observe("a", 4, 3, 3.0, {"1"})
+        detector.observe("b", 4, 3, 3.0, {"2"})
+
+    with AnomalyDetector(state) as detector:
+        assert kinds(detector.observe("a", 4, 3, 3.0, {"9"})) == [NEW_ORIGIN]
+        # only the prefix observed is read from the file
+        assert list(detector.prefixes) == ["a"]
+        assert detector.prefixes["a"].path_count.n == 2
+
+    with AnomalyDetector(state) as detector:
+        assert detector._state("a").origins == {"1", "9"}
+        assert detector._state("b").path_count.n == 1
+
+
+def test_not_a_state_file(tmp_path):
+    state = tmp_path / "anomaly.json"
+    state.write_text("{}")
+    with pytest.raises(ValueError):
+        AnomalyDetector(str(state))
@@ -0,0 +1,109 @@
+import json
+
+from bgp_route_checker import PathAnalyzer
+from bgp_route_checker.batch import (
+    batch_pipeline,
+    check_prefix,
+    check_prefixes,
+    prefix_checker,
+    read_prefixes,
+    run_batch,
+)
+from bgp_route_checker.profiling import CPU, Profiler
+from conftest import PATHS, FakeClient, body
+
+
+def test_read_prefixes(tmp_path):
+    filename = tmp_path / "prefixes.txt"
+    filename.write_text("# inventory\n1.1.0.0/16\n\n2.2.0.0/16  # comment\n")
+    assert read_prefixes(str(filename)) == ["1.1.0.0/16", "2.2.0.0/16"]
+
+
+def test_check_prefix_errors_in_dict():
+    client = FakeClient(
+        bodies={
+            "1.1.0.0/16": body("1.1.0.0/16"),
+            "2.2.0.0/16": b"<html>Bad Gateway</html>",
+            "3.3.0.0/16": json.dumps({"meta": {}}).encode(),
+            "4.4.0.0/16": body("9.9.0.0/16"),
+            "5.5.0.0/16": body("5.5.0.0/16", []),
+        }
+    )
+    analyzer = PathAnalyzer()
+    assert check_prefix(client, analyzer, "1.1.0.0/16")["origin_asn"] == "2516"
+    for cidr, error in [
+        ("2.2.0.0/16", "QratorError"),
+        ("3.3.0.0/16", "QratorError"),
+        ("4.4.0.0/16", "PrefixNotFoundError"),
+        ("5.5.0.0/16", "PrefixNotFoundError"),
+        ("10.0.0.0/8", "PrivateCIDRError"),
+    ]:
+        result = check_prefix(client, analyzer, cidr)
+        assert result["cidr"] == cidr
+        assert result["error"].startswith(error)
+
+
+def test_malformed_reply_does_not_stop_the_batch():
+    prefixes = [f"{i}.0.0.0/16" for i in range(1, 31) if i != 10]
+    bodies = {cidr: body(cidr) for cidr in prefixes}
+    bodies["7.0.0.0/16"] = b"{not json"
+    bodies["8.0.0.0/16"] = json.dumps({"data": None}).encode()
+    bodies["9.0.0.0/16"] = body("9.0.0.0/16", [])
+    results = list(check_prefixes(batch_pipeline(FakeClient(bodies=bodies)), prefixes))
+    assert sorted(r["cidr"] for r in results) == sorted(prefixes)
+    failed = sorted(r["cidr"] for r in results if "error" in r)
+    assert failed == ["7.0.0.0/16", "8.0.0.0/16", "9.0.0.0/16"]
+
+
+def test_pipeline_same_as_check_prefix():
+    prefixes = [f"{i}.0.0.0/16" for i in range(1, 10)]
+    client = FakeClient(bodies={cidr: body(cidr) for cidr in prefixes})
+    piped = {
+        r["cidr"]: r
+        for r in check_prefixes(
+            batch_pipeline(client, workers={"fetch": 3, "analyze": 2}), prefixes
+        )
+    }
+    analyzer = PathAnalyzer()
+    for cidr in prefixes:
+        assert piped[cidr] == check_prefix(client, analyzer, cidr)
+
+
+def test_pipeline_analyzer():
+    prefixes = [f"{i}.0.0.0/16" for i in range(1, 4)]
+    client = FakeClient(bodies={cidr: body(cidr) for cidr in prefixes})
+    analyzer = PathAnalyzer()
+    pipeline = batch_pipeline(client, workers={"analyze": 2}, analyzer=analyzer)
+    assert len(list(check_prefixes(pipeline, prefixes))) == 3
+    # the analyzer given, not one shared by the process
+    assert set(analyzer._split) == set(PATHS)
+
+    # a copy of it in each task of a process pool
+    analyzer = PathAnalyzer()
+    pipeline = batch_pipeline(client, processes=True, analyzer=analyzer)
+    results = list(check_prefixes(pipeline, prefixes))
+    assert [r["origin_asn"] for r in results] == ["2516"] * 3
+    assert analyzer._split == {}
+
+
+def test_prefix_checker_and_run_batch(tmp_path):
+    client = FakeClient(
+        bodies={cidr: body(cidr) for cidr in ("1.1.0.0/16", "2.2.0.0/16")}
+    )
+    prefixes = ["1.1.0.0/16", "10.0.0.0/8", "2.2.0.0/16"]
+    check, pipeline = prefix_checker(client)
+    assert pipeline is not None
+    checked = []
+
+    class Checks:
+        add = checked.append
+
+    assert run_batch(check(prefixes), Checks()) == (3, 1)
+    assert [r["cidr"] for r in checked] == ["1.1.0.0/16", "2.2.0.0/16"]
+
+    # one prefix at a time when profiling
+    profiler = Profiler([CPU], str(tmp_path))
+    check, pipeline = prefix_checker(client, profiler=profiler)
+    assert pipeline is None
+    assert [r["cidr"] for r in check(prefixes)] == prefixes
+    assert len(profiler.written) == 3
@@ -0,0 +1,63 @@
+import pytest
+
+from bgp_route_checker.batch import batch_pipeline, check_prefixes
+from bgp_route_checker.bloom import ScalableBloomFilter
+from conftest import PATHS, FakeClient
+
+PREFIXES = ["1.1.0.0/16", "2.2.0.0/16", "3.3.0.0/16"]
+
+
+def test_add_paths(tmp_path):
+    with ScalableBloomFilter(str(tmp_path / "seen.bloom")) as bloom:
+        assert len(bloom) == 0
+        assert bloom.add_paths("1.1.0.0/16", PATHS) == PATHS
+        assert bloom.add_paths("1.1.0.0/16", PATHS + ["1,2516"]) == ["1,2516"]
+        # the pair is the key, not the path alone
+        assert bloom.add("2.2.0.0/16", PATHS[0])
+        assert ("1.1.0.0/16", PATHS[0]) in bloom
+        assert ("3.3.0.0/16", PATHS[0]) not in bloom
+        assert len(bloom) == 5
+
+
+def test_grows_and_persists(tmp_path):
+    filename = str(tmp_path / "seen.bloom")
+    with ScalableBloomFilter(filename, capacity=1000, error_rate=0.01) as bloom:
+        for i in range(5000):
+            bloom.add("1.1.0.0/16", f"{i},2516")
+        assert len(bloom._slices) == 3
+        assert bloom.false_positive_rate() < 0.01
+
+    with ScalableBloomFilter(filename) as bloom:
+        assert bloom.capacity == 1000
+        # a pair taken for one already added is not counted
+        assert 4950 <= len(bloom) <= 5000
+        assert all(("1.1.0.0/16", f"{i},2516") in bloom for i in range(5000))
+        false = sum(("1.1.0.0/16", f"{i},2516") in bloom for i in range(5000, 25000))
+        # the rate is expected, the margin is for the sample
+        assert false < 0.015 * 20000
+
+
+def test_not_a_filter(tmp_path):
+    filename = tmp_path / "other"
+    filename.write_bytes(b"x" * 100)
+    with pytest.raises(ValueError):
+        ScalableBloomFilter(str(filename))
+
+
+def test_pipeline_fills_fresh_filter(tmp_path):
+    with ScalableBloomFilter(str(tmp_path / "seen.bloom")) as bloom:
+        pipeline = batch_pipeline(FakeClient(), on_paths=bloom.add_paths)
+        assert len(list(check_prefixes(pipeline, PREFIXES))) == len(PREFIXES)
+        assert len(bloom) == len(PREFIXES) * len(PATHS)
+
+
+def test_batch_fills_fresh_filter(tmp_path, qrator_url, run_script):
+    prefixes = tmp_path / "prefixes.txt"
+    prefixes.write_text("\n".join(PREFIXES) + "\n")
+    filename = str(tmp_path / "seen.bloom")
+    args = ["--qrator-url", qrator_url, "--batch", str(prefixes), "--bloom", filename]
+    for _ in range(2):
+        run_script(*args, check=True)
+        with ScalableBloomFilter(filename) as bloom:
+            assert len(bloom) == len(PREFIXES) * len(PATHS)
+            assert (PREFIXES[0], PATHS[0]) in bloom
@@ -0,0 +1,111 @@
+import json
+import os
+
+from bgp_route_checker import QratorResponse
+from bgp_route_checker.cache import ResponseCache, TTLCache
+
+METRICS = {
+    "encoding": "gzip",
+    "wire_bytes": 40,
+    "body_bytes": 120,
+    "compression_ratio": 3.0,
+    "fetch_seconds": 0.25,
+    "attempts": 1,
+    "hedge_won": False,
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expires():
+    clock = Clock()
+    cache = TTLCache(ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=30)
+    clock.now = 20
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert len(cache) == 1
+
+
+def test_ttl_cache_evicts_oldest():
+    cache = TTLCache(ttl=10, maxsize=2, clock=Clock())
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert cache.get("a") is None
+    assert [cache.get("b"), cache.get("c")] == [2, 3]
+
+
+def response(cidr="1.1.0.0/16"):
+    body = json.dumps({"data": {cidr: ["6461,2516"]}}).encode()
+    return QratorResponse(
+        cidr,
+        "http://qrator/",
+        body,
+        {"ETag": '"v1"', "Last-Modified": "Mon, 19 Oct 2026 10:00:00 GMT"},
+        metrics=dict(METRICS),
+    )
+
+
+def test_disk_hit_keeps_metrics(tmp_path):
+    ResponseCache(ttl=60, directory=str(tmp_path)).put(response())
+
+    # a new run finds the entry on disk only
+    entry = ResponseCache(ttl=60, directory=str(tmp_path)).get("1.1.0.0/16")
+    assert entry.fresh()
+    assert entry.etag == '"v1"'
+    assert entry.last_modified == "Mon, 19 Oct 2026 10:00:00 GMT"
+    assert entry.response.paths == ["6461,2516"]
+    assert entry.response.metrics == METRICS
+
+
+def test_disk_hit_of_old_meta(tmp_path):
+    cache = ResponseCache(ttl=60, directory=str(tmp_path))
+    cache.put(response())
+    meta = os.path.join(str(tmp_path), "1.1.0.0-16.meta")
+    with open(meta) as entrada:
+        data = json.load(entrada)
+    del data["metrics"]
+    with open(meta, "w") as salida:
+        json.dump(data, salida)
+
+    entry = ResponseCache(ttl=60, directory=str(tmp_path)).get("1.1.0.0/16")
+    m = entry.response.metrics
+    assert m["body_bytes"] == len(entry.response.body)
+    assert m["wire_bytes"] == 0
+    assert m["fetch_seconds"] == 0.0
+
+
+def test_stale_entry_kept():
+    cache = ResponseCache(ttl=-1)
+    entry = cache.put(response())
+    assert not entry.fresh()
+    assert cache.get("1.1.0.0/16") is entry
+    cache.ttl = 60
+    cache.rearm(entry)
+    assert entry.fresh()
+
+
+def test_least_recently_used_dropped(tmp_path):
+    cache = ResponseCache(ttl=60, maxsize=2)
+    for cidr in ("1.1.0.0/16", "2.2.0.0/16"):
+        cache.put(response(cidr))
+    cache.get("1.1.0.0/16")
+    cache.put(response("3.3.0.0/16"))
+    assert list(cache._entries) == ["1.1.0.0/16", "3.3.0.0/16"]
+    assert cache.get("2.2.0.0/16") is None
+
+    # loaded again from disk once dropped from memory
+    cache = ResponseCache(ttl=60, directory=str(tmp_path), maxsize=1)
+    cache.put(response("1.1.0.0/16"))
+    cache.put(response("2.2.0.0/16"))
+    assert list(cache._entries) == ["2.2.0.0/16"]
+    assert cache.get("1.1.0.0/16").response.paths == ["6461,2516"]
+    assert list(cache._entries) == ["1.1.0.0/16"]
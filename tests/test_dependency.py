@@ -0,0 +1,69 @@
+import pytest
+
+from bgp_route_checker import DependencyReport, analyze_dependencies
+
+PATHS = ["10,20,30,100", "11,21,30,100,100", "10,20,30,100"]
+
+
+def test_coverage():
+    report = analyze_dependencies(PATHS)
+    assert report.path_count == 3
+    assert report.origins == {"100": 3}
+    # a prepended ASN counted once per path
+    assert report.coverage["100"] == 3
+    assert report.share("30") == 1.0
+    assert report.share("21") == pytest.approx(1 / 3)
+    assert report.share("999") == 0.0
+    assert DependencyReport().share("30") == 0.0
+
+
+def test_chokepoints():
+    report = analyze_dependencies(PATHS)
+    # origin excluded
+    assert report.chokepoints() == [("30", 1.0)]
+    assert report.chokepoints(0.5) == [
+        ("30", 1.0),
+        ("10", pytest.approx(2 / 3)),
+        ("20", pytest.approx(2 / 3)),
+    ]
+
+
+def test_dominators():
+    report = analyze_dependencies(PATHS)
+    assert report.dominators() == ["100", "30"]
+    assert report.dominators("20") == ["100", "30"]
+    assert report.dominators("30") == ["100"]
+    assert report.dominators("999") == []
+    assert DependencyReport().dominators() == []
+
+
+def test_dominators_updated_by_add():
+    report = analyze_dependencies(["1,2,3,100"])
+    assert report.dominators() == ["100", "3", "2", "1"]
+    # a route around 2 leaves 3 the only transit all paths share
+    report.add("4,5,3,100")
+    assert report.dominators() == ["100", "3"]
+
+
+def test_multiple_origins():
+    report = analyze_dependencies(["1,2,100", "3,2,200"])
+    assert report.origins == {"100": 1, "200": 1}
+    assert report.dominators() == ["2"]
+
+
+def test_as_dict():
+    report = analyze_dependencies(PATHS)
+    assert report.as_dict() == {
+        "path_count": 3,
+        "origins": {"100": 3},
+        "coverage": {
+            "100": 1.0,
+            "30": 1.0,
+            "10": pytest.approx(2 / 3),
+            "20": pytest.approx(2 / 3),
+            "11": pytest.approx(1 / 3),
+            "21": pytest.approx(1 / 3),
+        },
+        "dominators": ["100", "30"],
+        "chokepoints": [("30", 1.0)],
+    }
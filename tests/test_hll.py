@@ -0,0 +1,35 @@
+import pytest
+
+from bgp_route_checker.hll import HyperLogLog
+
+
+@pytest.mark.parametrize("n", [0, 10, 1000, 100000])
+def test_count(n):
+    hll = HyperLogLog()
+    hll.update(str(i) for i in range(n))
+    # duplicates do not count
+    hll.update(str(i) for i in range(n // 2))
+    assert abs(hll.count() - n) <= max(1, 4 * hll.error * n)
+
+
+def test_merge_is_union():
+    a, b, union = HyperLogLog(10), HyperLogLog(10), HyperLogLog(10)
+    a.update(f"a{i}" for i in range(5000))
+    b.update(f"a{i}" for i in range(2500, 7500))
+    union.update(f"a{i}" for i in range(7500))
+    assert a.merge(b).registers == union.registers
+
+
+def test_round_trip():
+    hll = HyperLogLog(8)
+    hll.update(str(i) for i in range(300))
+    assert HyperLogLog.from_str(hll.to_str()).registers == hll.registers
+    with pytest.raises(ValueError):
+        HyperLogLog.from_bytes(hll.to_bytes()[:-1])
+
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        HyperLogLog(3)
+    with pytest.raises(ValueError):
+        HyperLogLog(10).merge(HyperLogLog(12))
@@ -0,0 +1,74 @@
+import random
+
+from bgp_route_checker import summarize
+from bgp_route_checker.incremental import IncrementalAnalyzer
+
+PATHS = [
+    "1003,12186,32097,1299,2516",
+    "11039,6461,2516",
+    "11071,3356,2516,2516",
+    "9902,1299,2516",
+]
+
+
+def test_update_churn():
+    analyzer = IncrementalAnalyzer()
+    assert analyzer.update("x", PATHS) == summarize(PATHS)
+    assert analyzer.last_churn == 4
+
+    paths = PATHS[1:] + ["174,64500,2516"]
+    assert analyzer.update("x", paths) == summarize(paths)
+    assert analyzer.last_churn == 2
+    assert analyzer.update("x", paths) == summarize(paths)
+    assert analyzer.last_churn == 0
+
+
+def test_origin_change():
+    analyzer = IncrementalAnalyzer()
+    analyzer.update("x", PATHS)
+    # the most common origin is now another one
+    paths = PATHS[:1] + ["1,64500", "2,3,64500", "4,64500,64500"]
+    assert analyzer.update("x", paths) == summarize(paths)
+    assert analyzer.summary("x")["origin_asn"] == "64500"
+
+
+def test_same_as_summarize():
+    rng = random.Random(5)
+    analyzer = IncrementalAnalyzer()
+    paths = []
+    for _ in range(300):
+        # few ASNs, so paths loop, prepend and change origin
+        keep = [p for p in paths if rng.random() < 0.7]
+        new = [
+            ",".join(str(rng.randint(1, 6)) for _ in range(rng.randint(1, 7)))
+            for _ in range(rng.randint(0, 6))
+        ]
+        paths = keep + new
+        assert analyzer.update("x", paths) == summarize(paths)
+
+
+def test_tied_origins_first_seen():
+    analyzer = IncrementalAnalyzer()
+    paths = ["1,2516", "2,64500"]
+    assert analyzer.update("x", paths)["origin_asn"] == "2516"
+    # same counts, the path of the other origin now first
+    paths = ["3,64500", "1,2516"]
+    assert analyzer.update("x", paths) == summarize(paths)
+    assert analyzer.summary("x")["origin_asn"] == "64500"
+
+
+def test_no_paths():
+    analyzer = IncrementalAnalyzer()
+    analyzer.update("x", PATHS)
+    assert analyzer.update("x", []) == summarize([])
+    assert analyzer.summary("x")["origin_asn"] is None
+    assert analyzer.update("x", PATHS) == summarize(PATHS)
+
+
+def test_forget():
+    analyzer = IncrementalAnalyzer()
+    analyzer.update("x", PATHS)
+    analyzer.forget("x")
+    analyzer.forget("y")
+    analyzer.update("x", PATHS[:1])
+    assert analyzer.last_churn == 1
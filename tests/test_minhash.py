@@ -0,0 +1,76 @@
+from bgp_route_checker import PathAnalyzer
+from bgp_route_checker.minhash import (
+    LSHIndex,
+    MinHasher,
+    features,
+    load_signatures,
+    save_signatures,
+)
+
+PATHS = [
+    "1003,12186,32097,1299,2516",
+    "11039,6461,2516",
+    "11071,3356,2516,2516",
+]
+
+
+def test_features():
+    result = PathAnalyzer().analyze(PATHS, "111.98.0.0/16")
+    expected = {
+        "peer:1299",
+        "peer:6461",
+        "peer:3356",
+        "prepend:3356",
+        "transit:12186",
+        "transit:32097",
+    }
+    assert features(result) == expected
+    assert features(result.as_dict()) == expected
+    # saved before transits were analyzed
+    old = result.as_dict()
+    del old["transits"]
+    assert features(old) == expected - {"transit:12186", "transit:32097"}
+
+
+def test_transits_tell_profiles_apart():
+    analyzer = PathAnalyzer()
+    a = analyzer.analyze(["1,174,1299,64500", "2,174,1299,64500"])
+    b = analyzer.analyze(["1,3356,1299,64501", "2,3356,1299,64501"])
+    # same upstream, through different transits
+    assert features(a) != features(b)
+
+
+def test_signature_jaccard():
+    hasher = MinHasher(num_perm=256)
+    a = {f"peer:{i}" for i in range(100)}
+    b = {f"peer:{i}" for i in range(50, 150)}
+    estimate = MinHasher.jaccard(hasher.signature(a), hasher.signature(b))
+    assert abs(estimate - 1 / 3) < 0.1
+    assert hasher.signature(a) == MinHasher(num_perm=256).signature(a)
+    assert hasher.signature(set()) == hasher.signature(set())
+
+
+def test_clusters():
+    hasher = MinHasher()
+    index = LSHIndex()
+    profiles = {
+        "a1": {f"peer:{i}" for i in range(40)},
+        "a2": {f"peer:{i}" for i in range(2, 40)},
+        "a3": {f"peer:{i}" for i in range(40)},
+        "b1": {f"peer:{i}" for i in range(100, 140)},
+        "b2": {f"peer:{i}" for i in range(101, 140)},
+        "c": {"peer:7000", "transit:174"},
+    }
+    for key, profile in profiles.items():
+        index.add(key, hasher.signature(profile))
+    assert index.clusters(0.8) == [["a1", "a2", "a3"], ["b1", "b2"], ["c"]]
+
+
+def test_save_load(tmp_path):
+    hasher = MinHasher(num_perm=64, seed=3)
+    signatures = {"x": hasher.signature({"peer:1"})}
+    filename = str(tmp_path / "signatures.json")
+    save_signatures(filename, hasher, signatures)
+    loaded, loaded_signatures = load_signatures(filename)
+    assert (loaded.num_perm, loaded.seed) == (64, 3)
+    assert loaded_signatures == signatures
@@ -0,0 +1,95 @@
+import ipaddress
+import struct
+
+import pytest
+
+from bgp_route_checker.batch import check_rib
+from bgp_route_checker.exceptions import InvalidCIDRError
+from bgp_route_checker.mrt import MRTError, iter_rib
+
+PEERS = [(64500, "192.0.2.1"), (3356, "192.0.2.2"), (70000, "2001:db8::1")]
+
+
+def record(subtype, body, mrt_type=13):
+    return struct.pack("!IHHI", 0, mrt_type, subtype, len(body)) + body
+
+
+def peer_index():
+    body = struct.pack("!IHH", 0, 0, len(PEERS))
+    for asn, ip in PEERS:
+        address = ipaddress.ip_address(ip)
+        body += bytes([2 | (address.version == 6)]) + b"\0\0\0\1"
+        body += address.packed + struct.pack("!I", asn)
+    return record(1, body)
+
+
+def rib(subtype, seq, cidr, entries):
+    network = ipaddress.ip_network(cidr)
+    raw = network.network_address.packed[: (network.prefixlen + 7) // 8]
+    body = struct.pack("!IB", seq, network.prefixlen) + raw
+    body += struct.pack("!H", len(entries))
+    for peer, asns in entries:
+        segment = bytes([2, len(asns)]) + struct.pack(f"!{len(asns)}I", *asns)
+        attrs = bytes([0x40, 1, 1, 0, 0x40, 2, len(segment)]) + segment
+        body += struct.pack("!HIH", peer, 0, len(attrs)) + attrs
+    return record(subtype, body)
+
+
+@pytest.fixture
+def dump(tmp_path):
+    filename = tmp_path / "rib.mrt"
+    filename.write_bytes(
+        peer_index()
+        + rib(2, 0, "111.98.0.0/16", [(0, [64500, 1299, 2516]), (1, [2516])])
+        + rib(2, 1, "1.0.0.0/24", [(0, [64500, 13335])])
+        + rib(4, 2, "2001:db8::/32", [(2, [70000, 174, 65001])])
+    )
+    return str(filename)
+
+
+def test_iter_rib(dump):
+    assert list(iter_rib(dump)) == [
+        ("111.98.0.0/16", ["64500,1299,2516", "3356,2516"]),
+        ("1.0.0.0/24", ["64500,13335"]),
+        ("2001:db8::/32", ["70000,174,65001"]),
+    ]
+
+
+def test_iter_rib_prefixes(dump):
+    found = list(iter_rib(dump, ["2001:db8::/32", "1.0.0.0/24", "9.9.9.0/24"]))
+    assert [cidr for cidr, _ in found] == ["1.0.0.0/24", "2001:db8::/32"]
+
+
+@pytest.mark.parametrize("cidr", ["8.8.8.1/24", "8.8.8.0/33", "example"])
+def test_iter_rib_invalid_prefix(dump, cidr):
+    with pytest.raises(InvalidCIDRError):
+        list(iter_rib(dump, [cidr]))
+
+
+def test_iter_rib_truncated(tmp_path):
+    filename = tmp_path / "bad.mrt"
+    filename.write_bytes(peer_index() + rib(2, 0, "1.0.0.0/24", [(0, [13335])])[:-3])
+    with pytest.raises(MRTError):
+        list(iter_rib(str(filename)))
+
+
+def test_check_rib(dump):
+    seen = []
+    checked = []
+
+    class Checks:
+        add = checked.append
+
+    count = check_rib(
+        dump,
+        ["111.98.0.0/16", "1.0.0.0/24"],
+        checks=Checks(),
+        on_paths=lambda cidr, paths: seen.append(cidr),
+        on_result=lambda paths, result: seen.append(result.cidr),
+    )
+    assert count == 2
+    assert seen == ["111.98.0.0/16"] * 2 + ["1.0.0.0/24"] * 2
+    assert [(r.cidr, r.origin_asn) for r in checked] == [
+        ("111.98.0.0/16", "2516"),
+        ("1.0.0.0/24", "13335"),
+    ]
@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from bgp_route_checker import PathAnalyzer, PathTrie
+
+PATHS = [
+    "1003,12186,32097,1299,2516",
+    "11039,6461,2516",
+    "11071,3356,2516,2516",
+    "9902,1299,2516",
+]
+
+
+def test_counts():
+    trie = PathTrie(PATHS)
+    assert len(trie) == 4
+    assert trie.origins() == {"2516": 4}
+    assert trie.peers("2516") == {"1299": 2, "6461": 1, "3356": 1}
+    assert trie.prepend_peers("2516") == {"3356": 1}
+    assert trie.prepend_depths("2516") == {1: 3, 2: 1}
+    assert trie.hop_count == 15
+    assert sorted(trie.paths()) == sorted(PATHS)
+
+
+def test_shared_suffixes_stored_once():
+    trie = PathTrie(["1,2,3", "4,2,3", "5,2,3"])
+    # 3, 2, then one node per vantage point
+    assert trie.node_count == 5
+
+
+def test_remove():
+    trie = PathTrie(PATHS + [PATHS[0]])
+    trie.remove(PATHS[0])
+    assert PATHS[0] in trie
+    trie.remove(PATHS[0])
+    assert PATHS[0] not in trie
+    assert len(trie) == 3
+    assert trie.hop_count == 10
+    assert sorted(trie.paths()) == sorted(PATHS[1:])
+    assert trie.node_count == PathTrie(PATHS[1:]).node_count
+    with pytest.raises(KeyError):
+        trie.remove(PATHS[0])
+
+
+def test_analyze_trie_same_as_analyze():
+    rng = random.Random(7)
+    analyzer = PathAnalyzer()
+    for _ in range(200):
+        paths = []
+        origins = [str(rng.randint(1, 3)) for _ in range(2)]
+        for _ in range(rng.randint(1, 30)):
+            # loop-free paths of distinct transit ASNs, origin maybe prepended
+            origin = rng.choice(origins)
+            transit = rng.sample([str(a) for a in range(10, 30)], rng.randint(0, 4))
+            paths.append(",".join(transit + [origin] * rng.randint(1, 3)))
+        assert analyzer.analyze_trie(PathTrie(paths), "x").as_dict() == (
+            analyzer.analyze(paths, "x").as_dict()
+        )
+
+
+def test_analyze_empty_trie():
+    analyzer = PathAnalyzer()
+    assert analyzer.analyze_trie(PathTrie(), "x") == analyzer.analyze([], "x")
+
+
+def test_transits():
+    assert PathTrie(PATHS).transits() == {"12186": 1, "32097": 1}
+    # an ASN repeated in a path, prepended or in a loop, is on it once
+    looped = ["1,20,30,20,5,9", "1,1,20,20,5,9,9", "20,30,5,9", "7,20,9", "30,20"]
+    assert PathTrie(looped).transits() == {"20": 2, "30": 2}
+
+
+def test_transits_same_as_analyze():
+    rng = random.Random(11)
+    analyzer = PathAnalyzer()
+    for _ in range(200):
+        # few ASNs, so paths loop and share ASNs at every position
+        paths = [
+            ",".join(str(rng.randint(1, 6)) for _ in range(rng.randint(1, 8)))
+            for _ in range(rng.randint(1, 20))
+        ]
+        assert PathTrie(paths).transits() == analyzer.transit_check(paths)
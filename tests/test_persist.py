@@ -0,0 +1,62 @@
+import gzip
+import os
+
+from bgp_route_checker import WriteBehindWriter
+from bgp_route_checker.persist import read_saved
+
+
+def test_write_and_read(tmp_path):
+    plain = str(tmp_path / "a.json")
+    packed = str(tmp_path / "b.json")
+    with WriteBehindWriter() as writer:
+        writer.submit(plain, b"plain")
+    with WriteBehindWriter(compress=True) as writer:
+        writer.submit(packed, b"packed")
+        # gzip encoded data is written as received
+        writer.submit(str(tmp_path / "c.json"), b"wire", gzip.compress(b"wire"))
+    assert read_saved(plain) == b"plain"
+    assert read_saved(packed + ".gz") == b"packed"
+    assert read_saved(str(tmp_path / "c.json.gz")) == b"wire"
+    assert writer.written == 2
+    assert writer.errors == []
+
+
+def test_write_error_keeps_writer_running(tmp_path):
+    missing = str(tmp_path / "missing" / "a.json")
+    good = str(tmp_path / "b.json")
+    with WriteBehindWriter() as writer:
+        writer.submit(missing, b"lost")
+        writer.flush()
+        writer.submit(good, b"kept")
+        writer.flush()
+        assert writer._thread.is_alive()
+    assert [filename for filename, _ in writer.errors] == [missing]
+    assert writer.written == 1
+    assert read_saved(good) == b"kept"
+
+
+def test_fsync_error_not_counted(tmp_path, monkeypatch):
+    bad = str(tmp_path / "bad.json")
+    good = str(tmp_path / "good.json")
+    fsync = os.fsync
+    calls = []
+
+    def flaky_fsync(fd):
+        # the first file of the batch fails to sync
+        calls.append(fd)
+        if len(calls) == 1:
+            raise OSError(5, "Input/output error")
+        return fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", flaky_fsync)
+    writer = WriteBehindWriter(batch=2)
+    # both queued before the writer thread takes them as one batch
+    writer.queue.put((bad, b"x", False))
+    writer.queue.put((good, b"y", False))
+    writer.flush()
+    assert writer._thread.is_alive()
+    writer.submit(good, b"z")
+    writer.close()
+    assert [filename for filename, _ in writer.errors] == [bad]
+    assert writer.written == 2
+    assert read_saved(good) == b"z"
@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from bgp_route_checker import QratorResponse
+from bgp_route_checker.batch import batch_pipeline, check_prefixes
+from bgp_route_checker.pipeline import Pipeline, Stage
+from bgp_route_checker.sidecar import read_sidecar
+
+
+def test_pipeline_results_and_errors():
+    def parse(value):
+        return int(value)
+
+    pipeline = Pipeline([Stage("parse", parse, 2), Stage("square", lambda v: v * v, 3)])
+    out = dict(pipeline.run(["1", "2", "x", "4"]))
+    assert {k: v for k, v in out.items() if k != "x"} == {"1": 1, "2": 4, "4": 16}
+    assert isinstance(out["x"], ValueError)
+    metrics = pipeline.metrics()
+    assert metrics["parse"]["processed"] == 4
+    assert metrics["parse"]["failed"] == 1
+    assert metrics["square"]["processed"] == 3
+
+
+@pytest.mark.parametrize("workers, maxsize", [(0, None), (-1, None), (1, 0), (2, -1)])
+def test_stage_needs_workers_and_queue(workers, maxsize):
+    with pytest.raises(ValueError):
+        Stage("analyze", int, workers, maxsize)
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["--workers", "0"],
+        ["--queue-size", "0"],
+        ["--stage-workers", "analyze=0"],
+    ],
+)
+def test_cli_rejects_no_workers(tmp_path, run_script, args):
+    prefixes = tmp_path / "prefixes.txt"
+    prefixes.write_text("1.1.0.0/16\n")
+    run = run_script("--batch", str(prefixes), *args, capture_output=True, text=True)
+    assert run.returncode == 2
+    assert args[0] in run.stderr
+
+
+def test_pipeline_backpressure():
+    # the feeding stops while the slow stage is saturated
+    running = []
+    lock = threading.Lock()
+
+    def slow(value):
+        with lock:
+            running.append(value)
+        time.sleep(0.01)
+        return value
+
+    pipeline = Pipeline([Stage("slow", slow, 1, maxsize=2)])
+    fed = []
+
+    def items():
+        for i in range(20):
+            fed.append(i)
+            # never more than the queue and the worker ahead of the slow stage
+            assert len(fed) - len(running) <= 4
+            yield i
+
+    assert sorted(v for _, v in pipeline.run(items())) == list(range(20))
+    assert pipeline.metrics()["slow"]["max_depth"] <= 2
+
+
+class NotModifiedClient:
+    """Fetched once per CIDR, then the same response not modified"""
+
+    def __init__(self):
+        self.responses = {}
+
+    def fetch(self, cidr):
+        response = self.responses.get(cidr)
+        if response is None:
+            body = json.dumps({"data": {cidr: ["6461,2516", "1299,2516"]}})
+            response = QratorResponse(cidr, "http://qrator/", body.encode())
+            self.responses[cidr] = response
+        else:
+            response.status = "not-modified"
+        return response
+
+
+def test_batch_pipeline_keeps_analysis():
+    client = NotModifiedClient()
+    prefixes = ["1.1.0.0/16", "2.2.0.0/16", "3.3.0.0/16"]
+    parsed = []
+
+    def on_paths(cidr, paths):
+        parsed.append(cidr)
+
+    first = list(check_prefixes(batch_pipeline(client, on_paths=on_paths), prefixes))
+    for cidr in prefixes:
+        assert client.responses[cidr].results["check"].cidr == cidr
+
+    pipeline = batch_pipeline(client, on_paths=on_paths)
+    second = list(check_prefixes(pipeline, prefixes))
+    # not modified, so neither parsed nor analyzed again
+    assert sorted(parsed) == prefixes
+    assert sorted(first, key=lambda r: r["cidr"]) == sorted(
+        second, key=lambda r: r["cidr"]
+    )
+    assert pipeline.metrics()["store"]["processed"] == len(prefixes)
+
+
+def test_batch_pipeline_sidecars(tmp_path, monkeypatch):
+    class Writer:
+        def __init__(self):
+            self.submitted = []
+
+        def submit(self, filename, body, wire=None):
+            self.submitted.append(filename)
+
+    monkeypatch.chdir(tmp_path)
+    writer = Writer()
+    prefixes = ["1.1.0.0/16", "2.2.0.0/16"]
+    pipeline = batch_pipeline(NotModifiedClient(), writer, sidecars=True)
+    results = list(check_prefixes(pipeline, prefixes))
+    assert len(results) == len(writer.submitted) == 2
+    for filename in writer.submitted:
+        summary = read_sidecar(filename)
+        assert summary["dump"] == os.path.basename(filename)
+        assert summary["path_count"] == 2
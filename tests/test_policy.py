@@ -0,0 +1,69 @@
+import json
+
+from bgp_route_checker import PathAnalyzer, Policy
+from bgp_route_checker.policy import (
+    MISSING_PEER,
+    MISSING_PREPEND,
+    UNEXPECTED_ORIGIN,
+    UNEXPECTED_PREPEND,
+)
+
+PATHS = ["11039,6461,2516", "9902,1299,2516", "11071,3356,2516,2516"]
+RULES = {
+    "1.1.0.0/16": {"origins": ["2516"], "required_peers": ["1299"], "prepend": True},
+    "2.2.0.0/16": {"origins": [64500], "required_peers": ["174", "1299"]},
+    "3.3.0.0/16": {"prepend": False},
+}
+
+
+def kinds(policy, result):
+    return [v.kind for v in policy.evaluate(result)]
+
+
+def test_evaluate():
+    policy = Policy(RULES)
+    analyzer = PathAnalyzer()
+    assert kinds(policy, analyzer.analyze(PATHS, "1.1.0.0/16")) == []
+    assert kinds(policy, analyzer.analyze(PATHS, "2.2.0.0/16")) == [
+        UNEXPECTED_ORIGIN,
+        MISSING_PEER,
+    ]
+    assert kinds(policy, analyzer.analyze(PATHS, "3.3.0.0/16")) == [UNEXPECTED_PREPEND]
+    assert kinds(policy, analyzer.analyze(PATHS[:2], "1.1.0.0/16")) == [MISSING_PREPEND]
+    # no rule
+    assert kinds(policy, analyzer.analyze(PATHS, "4.4.0.0/16")) == []
+
+
+def test_evaluate_dict_same():
+    policy = Policy(RULES)
+    for cidr in RULES:
+        result = PathAnalyzer().analyze(PATHS, cidr)
+        as_json = json.loads(json.dumps(result.as_dict()))
+        assert [v.as_dict() for v in policy.evaluate(as_json)] == [
+            v.as_dict() for v in policy.evaluate(result)
+        ]
+    assert policy.evaluate({"cidr": "2.2.0.0/16", "error": "QratorError"}) == []
+
+
+def test_messages():
+    (missing,) = [
+        v
+        for v in Policy(RULES).evaluate(PathAnalyzer().analyze(PATHS, "2.2.0.0/16"))
+        if v.kind == MISSING_PEER
+    ]
+    assert missing.cidr == "2.2.0.0/16"
+    assert missing.message == "Required peer ASN ['174'] not seen"
+
+
+def test_load_and_evaluate_all(tmp_path):
+    filename = tmp_path / "policy.json"
+    filename.write_text(json.dumps(RULES))
+    policy = Policy.load(str(filename))
+    assert len(policy) == 3
+    analyzer = PathAnalyzer()
+    results = [analyzer.analyze(PATHS, cidr) for cidr in RULES]
+    assert [v.cidr for v in policy.evaluate_all(results)] == [
+        "2.2.0.0/16",
+        "2.2.0.0/16",
+        "3.3.0.0/16",
+    ]
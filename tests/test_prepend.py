@@ -0,0 +1,48 @@
+from bgp_route_checker.prepend import (
+    ORIGIN,
+    TRANSIT,
+    VANTAGE,
+    analyze_prepends,
+    rle_path,
+)
+
+
+def test_rle_path():
+    assert rle_path("1,1,2,3,3,3") == [["1", 2], ["2", 1], ["3", 3]]
+    assert rle_path(["1", "2", "1"]) == [["1", 1], ["2", 1], ["1", 1]]
+    assert rle_path([]) == []
+
+
+def test_positions():
+    report = analyze_prepends(
+        [
+            "11071,3356,2516,2516",
+            "9902,9902,1299,1299,1299,2516",
+            "11039,6461,2516",
+        ]
+    )
+    assert report.path_count == 3
+    assert report.positions == {ORIGIN: 1, TRANSIT: 1, VANTAGE: 1}
+    assert report.asns["2516"] == {2: 1}
+    assert report.asns["1299"] == {3: 1}
+    assert report.asns["9902"] == {2: 1}
+    # toward the neighbor closer to the vantage point
+    assert report.toward["2516"] == {"3356": 1}
+    assert report.toward["1299"] == {"9902": 1}
+    assert "9902" not in report.toward
+    assert report.path_lengths == {3: 3}
+    assert report.raw_path_lengths == {4: 1, 6: 1, 3: 1}
+    assert report.mean_path_length() == 3.0
+
+
+def test_empty():
+    report = analyze_prepends([])
+    assert report.mean_path_length() == 0.0
+    assert report.as_dict() == {
+        "path_count": 0,
+        "positions": {},
+        "asns": {},
+        "toward": {},
+        "path_lengths": {},
+        "raw_path_lengths": {},
+    }
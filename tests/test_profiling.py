@@ -0,0 +1,52 @@
+import os
+import pstats
+import time
+
+import pytest
+
+from bgp_route_checker.profiling import CPU, MEM, Profiler
+
+
+def test_capture(tmp_path):
+    profiler = Profiler([CPU, MEM], str(tmp_path))
+    with profiler.capture("111.98.0.0/16"):
+        with profiler.stage("fetch"):
+            data = [str(i) * 10 for i in range(10000)]
+        with profiler.stage("analysis"):
+            sorted(data)
+        # nested captures are part of the outer one
+        with profiler.capture("inner"):
+            pass
+
+    (base,) = profiler.written
+    assert os.path.basename(base).startswith("profile-111.98.0.0-16-")
+    assert pstats.Stats(base + ".pstats").total_calls > 0
+    with open(base + ".txt") as entrada:
+        text = entrada.read()
+    assert "111.98.0.0/16 took" in text
+    assert "  fetch:" in text and "  analysis:" in text
+    assert "Peak traced memory" in text
+
+
+def test_threshold(tmp_path):
+    profiler = Profiler([CPU], str(tmp_path), threshold=0.05)
+    with profiler.capture("fast"):
+        pass
+    with profiler.capture("slow"):
+        time.sleep(0.06)
+    assert [os.path.basename(b).split("-")[1] for b in profiler.written] == ["slow"]
+    # only cProfile asked for
+    with open(profiler.written[0] + ".txt") as entrada:
+        assert "Peak" not in entrada.read()
+
+
+def test_stage_outside_capture(tmp_path):
+    profiler = Profiler([MEM], str(tmp_path))
+    with profiler.stage("fetch"):
+        pass
+    assert profiler.written == []
+
+
+def test_unknown_mode(tmp_path):
+    with pytest.raises(ValueError):
+        Profiler(["gpu"], str(tmp_path))
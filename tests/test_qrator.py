@@ -0,0 +1,177 @@
+import gzip
+import json
+import time
+import urllib.parse
+import zlib
+
+import pytest
+
+from bgp_route_checker import QratorClient, QratorError, WriteBehindWriter
+from bgp_route_checker.cache import ResponseCache
+from bgp_route_checker.persist import read_saved
+from bgp_route_checker.qrator import HEDGE_MIN_SAMPLES
+from conftest import PATHS, QratorHandler
+
+
+def test_fetch(serve):
+    client = QratorClient(serve(QratorHandler))
+    response = client.fetch("111.98.0.0/16")
+    assert response.status == "fetched"
+    assert response.paths == PATHS
+    assert response.url.endswith("prefix=111.98.0.0%2F16")
+    assert client.get_paths("111.98.0.0/16") == PATHS
+    assert client.stats["requests"] == 2
+
+
+def test_cache_fresh_and_revalidated(serve):
+    cache = ResponseCache(ttl=60)
+    client = QratorClient(serve(QratorHandler), cache=cache)
+    response = client.fetch("111.98.0.0/16")
+    response.results["check"] = "analysis"
+
+    # fresh, no request
+    cached = client.fetch("111.98.0.0/16")
+    assert cached.status == "cached"
+    assert cached.metrics == response.metrics
+    assert len(QratorHandler.requests) == 1
+
+    # stale, revalidated and reused with the results kept on it
+    cache.get("111.98.0.0/16").expires = 0
+    again = client.fetch("111.98.0.0/16")
+    assert again.status == "not-modified"
+    assert again.results["check"] == "analysis"
+    assert again.metrics["wire_bytes"] == 0
+    # copies, the cached response and the one of each caller unchanged
+    assert again is not response and cached is not response
+    assert cache.get("111.98.0.0/16").response is response
+    assert response.status == "fetched"
+    assert cached.status == "cached"
+    assert response.metrics["wire_bytes"] > 0
+    assert (
+        QratorHandler.requests[-1]["If-None-Match"] == cache.get("111.98.0.0/16").etag
+    )
+    assert cache.get("111.98.0.0/16").fresh()
+
+
+def compressing(encoding):
+    class Compressing(QratorHandler):
+        def do_GET(self):
+            self.requests.append(dict(self.headers.items()))
+            cidr = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+            body = json.dumps({"data": {cidr["prefix"][0]: PATHS * 50}}).encode()
+            if encoding == "gzip":
+                body = gzip.compress(body)
+            elif encoding == "deflate":
+                body = zlib.compress(body)
+            elif encoding == "raw":
+                c = zlib.compressobj(wbits=-15)
+                body = c.compress(body) + c.flush()
+            elif encoding == "truncated":
+                body = gzip.compress(body)[:-20]
+            self.send_response(200)
+            if encoding != "identity":
+                name = "deflate" if encoding == "raw" else encoding
+                self.send_header("Content-Encoding", name.replace("truncated", "gzip"))
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Compressing
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate", "raw", "identity"])
+def test_compressed(serve, encoding):
+    handler = compressing(encoding)
+    response = QratorClient(serve(handler)).fetch("111.98.0.0/16")
+    assert response.paths == PATHS * 50
+    assert "gzip" in handler.requests[0]["Accept-Encoding"]
+    m = response.metrics
+    assert m["encoding"] == ("deflate" if encoding == "raw" else encoding)
+    assert m["body_bytes"] == len(response.body)
+    if encoding == "identity":
+        assert m["compression_ratio"] == 1.0
+    else:
+        assert m["wire_bytes"] < m["body_bytes"]
+
+
+def test_not_compressed(serve):
+    handler = compressing("identity")
+    QratorClient(serve(handler), compress=False).fetch("111.98.0.0/16")
+    assert "Accept-Encoding" not in handler.requests[0] or (
+        "gzip" not in handler.requests[0]["Accept-Encoding"]
+    )
+
+
+def test_truncated_encoding(serve):
+    with pytest.raises(QratorError, match="Truncated gzip"):
+        QratorClient(serve(compressing("truncated"))).fetch("111.98.0.0/16")
+
+
+class Slow(QratorHandler):
+    """QratorHandler answering the first request of a 9.x prefix late"""
+
+    delay = 1.0
+    seen = set()
+
+    def do_GET(self):
+        cidr = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        cidr = cidr["prefix"][0]
+        if cidr.startswith("9.") and cidr not in self.seen:
+            self.seen.add(cidr)
+            time.sleep(self.delay)
+        super().do_GET()
+
+
+def test_timeout(serve):
+    Slow.seen = set()
+    client = QratorClient(serve(Slow), timeout=0.2)
+    with pytest.raises(QratorError, match="Timed out"):
+        client.fetch("9.9.0.0/16")
+    assert client.stats["timeouts"] == 1
+    # the second request of the prefix is answered at once
+    assert client.fetch("9.9.0.0/16").paths == PATHS
+
+
+def test_deadline(serve):
+    client = QratorClient(serve(QratorHandler), deadline=0.05)
+    client.fetch("1.1.0.0/16")
+    time.sleep(0.1)
+    with pytest.raises(QratorError, match="Deadline exceeded"):
+        client.fetch("1.1.0.0/16")
+    assert client.stats["deadline_exceeded"] == 1
+
+
+def test_hedged(serve):
+    Slow.seen = set()
+    client = QratorClient(serve(Slow), hedge=95)
+    assert client.latency_percentile(95) is None
+    for i in range(HEDGE_MIN_SAMPLES):
+        client.fetch(f"1.{i}.0.0/16")
+    assert client.latency_percentile(95) < Slow.delay
+
+    started = time.perf_counter()
+    response = client.fetch("9.9.0.0/16")
+    assert time.perf_counter() - started < Slow.delay
+    assert response.paths == PATHS
+    assert response.metrics["attempts"] == 2
+    assert response.metrics["hedge_won"]
+    assert client.stats["hedged"] == client.stats["hedge_wins"] == 1
+
+
+def test_keep_wire(serve, tmp_path):
+    client = QratorClient(serve(compressing("gzip")), keep_wire=True)
+    response = client.fetch("111.98.0.0/16")
+    assert gzip.decompress(response.wire) == response.body
+    assert len(response.wire) == response.metrics["wire_bytes"]
+
+    # saved as received, read back as the body
+    filename = str(tmp_path / response.filename)
+    with WriteBehindWriter(compress=True) as writer:
+        writer.submit(filename, response.body, response.wire)
+    with open(filename + ".gz", "rb") as entrada:
+        assert entrada.read() == response.wire
+    assert read_saved(filename + ".gz") == response.body
+
+    # only a gzip encoding is kept
+    client = QratorClient(serve(compressing("deflate")), keep_wire=True)
+    assert client.fetch("111.98.0.0/16").wire is None
@@ -0,0 +1,59 @@
+import logging
+
+from bgp_route_checker import CrossPrefixReport, PathAnalyzer, Policy
+from bgp_route_checker.minhash import load_signatures
+from bgp_route_checker.report import Checks, validate_origins
+from bgp_route_checker.rpki import INVALID, NOT_FOUND, VALID, RoaIndex
+from bgp_route_checker.tsdb import RAW, TimeSeriesStore
+from conftest import PATHS
+
+ROAS = [("1.1.0.0/16", "2516", 24), ("2.2.0.0/16", "64500", None)]
+
+
+def results():
+    analyzer = PathAnalyzer()
+    return [analyzer.analyze(PATHS, cidr) for cidr in ("1.1.0.0/16", "2.2.0.0/16")]
+
+
+def test_validate_origins(caplog):
+    observations = [("1.1.0.0/16", "2516"), ("2.2.0.0/16", "2516"), ("3.3.0.0/16", "1")]
+    with caplog.at_level(logging.DEBUG, logger="bgp_route_checker"):
+        states = validate_origins(RoaIndex(ROAS), observations)
+    assert [state for _, _, state in states] == [VALID, INVALID, NOT_FOUND]
+    warnings = [r.getMessage() for r in caplog.records if r.levelno == logging.WARNING]
+    assert warnings == ["RPKI invalid: 2.2.0.0/16 originated by ASN 2516"]
+
+
+def test_no_checks():
+    with Checks() as checks:
+        for result in results():
+            checks.add(result)
+        assert checks.finish() == {"results": 2}
+
+
+def test_checks(tmp_path, caplog):
+    policy = Policy({"2.2.0.0/16": {"origins": [64500]}})
+    store = TimeSeriesStore(str(tmp_path / "tsdb.db"))
+    minhash = str(tmp_path / "minhash.json")
+    with caplog.at_level(logging.INFO, logger="bgp_route_checker"):
+        with Checks(
+            policy, RoaIndex(ROAS), store, minhash, report=CrossPrefixReport()
+        ) as checks:
+            for result in results():
+                # dicts as well, as a batch hands them over
+                checks.add(result.as_dict())
+            summary = checks.finish()
+    assert summary["results"] == 2
+    assert summary["violations"] == 1
+    assert summary["cross_report"]["prefixes"] == 2
+    assert summary["cross_report"]["top_origins"] == [("2516", 6, 2)]
+    assert [state for _, _, state in summary["rpki"]] == [VALID, INVALID]
+    assert checks.store is None and checks.report is None
+
+    _, signatures = load_signatures(minhash)
+    assert sorted(signatures) == ["1.1.0.0/16", "2.2.0.0/16"]
+    with TimeSeriesStore(str(tmp_path / "tsdb.db")) as store:
+        assert len(store.query("1.1.0.0/16", 0, tier=RAW)) == 1
+    messages = [r.getMessage() for r in caplog.records]
+    assert "1 policy violations" in messages
+    assert f"Appended 2 points to {tmp_path / 'tsdb.db'}" in messages
@@ -0,0 +1,87 @@
+import json
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from bgp_route_checker import (
+    BGPRouteCheckerError,
+    CheckResult,
+    PrefixNotFoundError,
+    QratorError,
+    QratorResponse,
+)
+from bgp_route_checker.results import ranked
+
+CIDR = "111.98.0.0/16"
+
+
+def response(body):
+    if not isinstance(body, bytes):
+        body = json.dumps(body).encode()
+    return QratorResponse(CIDR, "http://qrator/", body)
+
+
+def test_paths():
+    r = response({"meta": {}, "data": {CIDR: ["1,2", "3,2"]}})
+    assert r.paths == ["1,2", "3,2"]
+
+
+def test_prefix_not_found():
+    with pytest.raises(PrefixNotFoundError):
+        response({"data": {}}).paths
+    with pytest.raises(PrefixNotFoundError):
+        response({"data": {CIDR: None}}).paths
+    with pytest.raises(PrefixNotFoundError):
+        response({"data": {CIDR: []}}).paths
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"<html>Bad Gateway</html>",
+        b"\xff\xfe",
+        {"meta": {"status": "error"}},
+        {"data": None},
+        {"data": [CIDR]},
+        {"data": {CIDR: "1,2"}},
+        ["data"],
+    ],
+)
+def test_malformed_body(body):
+    with pytest.raises(QratorError) as e:
+        response(body).paths
+    assert isinstance(e.value, BGPRouteCheckerError)
+
+
+def test_filename():
+    r = QratorResponse(CIDR, "", b"", timestamp=datetime(2024, 1, 2, 3, 4, 5))
+    assert r.filename == "qrator-111.98.0.0-16-20240102-030405.json"
+
+
+def test_check_result():
+    result = CheckResult(
+        CIDR,
+        "2516",
+        Counter({"2516": 3, "1": 1}),
+        Counter({"3356": 1, "1299": 1, "174": 2}),
+        Counter(),
+        4,
+        3.5,
+    )
+    assert result.moas
+    assert result.as_dict() == {
+        "cidr": CIDR,
+        "origin_asn": "2516",
+        "origins": [("2516", 3), ("1", 1)],
+        # ties ordered by ASN
+        "peers": [("174", 2), ("1299", 1), ("3356", 1)],
+        "peers_pathprepend": [],
+        "transits": [],
+        "path_count": 4,
+        "mean_path_length": 3.5,
+    }
+
+
+def test_ranked():
+    assert ranked(Counter({"b": 1, "a": 1, "c": 2})) == [("c", 2), ("a", 1), ("b", 1)]
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from bgp_route_checker.rpki import INVALID, NOT_FOUND, VALID, RoaIndex, load_roas
+
+ROAS = [
+    ("1.1.0.0/16", "AS13335", 24),
+    ("1.1.1.0/24", "64500", None),
+    ("10.0.0.0/8", "AS0", 8),
+    ("2001:db8::/32", 65000, 48),
+]
+
+
+@pytest.mark.parametrize(
+    "prefix, origin, state",
+    [
+        ("1.1.0.0/16", "13335", VALID),
+        ("1.1.2.0/24", "AS13335", VALID),
+        # longer than maxLength
+        ("1.1.2.0/25", "13335", INVALID),
+        # covered by two ROAs
+        ("1.1.1.0/24", "64500", VALID),
+        ("1.1.1.0/24", "13335", VALID),
+        ("1.1.0.0/16", "64500", INVALID),
+        ("1.2.0.0/16", "13335", NOT_FOUND),
+        ("1.0.0.0/8", "13335", NOT_FOUND),
+        # AS0 never matches
+        ("10.0.0.0/8", "0", INVALID),
+        # an AS_SET origin has no ASN to match
+        ("1.1.0.0/16", "{13335 64500}", INVALID),
+        ("2001:db8:1::/48", "65000", VALID),
+        ("2001:db8:1::/49", "65000", INVALID),
+    ],
+)
+def test_validate(prefix, origin, state):
+    index = RoaIndex(ROAS)
+    assert index.validate(prefix, origin) == state
+    assert list(index.validate_many([(prefix, origin)])) == [(prefix, origin, state)]
+
+
+def test_validate_many_cached():
+    index = RoaIndex(ROAS)
+    observations = [("1.1.0.0/16", "13335"), ("1.1.0.0/16", "64500")] * 3
+    states = [state for _, _, state in index.validate_many(observations)]
+    assert states == [VALID, INVALID] * 3
+    assert index.count == 4
+    assert sorted(index.covering("1.1.1.0/24")) == [(13335, 24), (64500, 24)]
+
+
+def test_load_csv(tmp_path):
+    filename = tmp_path / "roas.csv"
+    filename.write_text(
+        "ASN,IP Prefix,Max Length,Trust Anchor\n"
+        "AS13335,1.1.0.0/16,24,apnic\n"
+        "\n"
+        "AS64500,2001:db8::/32,,ripe\n"
+    )
+    index = load_roas(str(filename))
+    assert index.count == 2
+    assert index.validate("1.1.1.0/24", "13335") == VALID
+    assert index.validate("2001:db8::/33", "64500") == INVALID
+
+
+def test_load_json(tmp_path):
+    filename = tmp_path / "roas.json"
+    roas = [{"asn": "AS13335", "prefix": "1.1.0.0/16", "maxLength": 24}]
+    for data in [{"roas": roas}, roas]:
+        filename.write_text(json.dumps(data))
+        assert load_roas(str(filename)).validate("1.1.1.0/24", "13335") == VALID
+
+
+def test_invalid_prefix():
+    with pytest.raises(ValueError):
+        RoaIndex([("1.1.0.0/33", "13335", None)])
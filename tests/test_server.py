@@ -0,0 +1,172 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from bgp_route_checker import Policy
+from bgp_route_checker import server
+from bgp_route_checker.exceptions import PrefixNotFoundError, QratorError
+from bgp_route_checker.server import CheckerService, Handler
+from conftest import FakeClient
+
+POLICY = {"111.98.0.0/16": {"origins": ["2516"], "required_peers": ["174"]}}
+
+
+def test_lookup_cached():
+    client = FakeClient()
+    service = CheckerService(client=client)
+    result = service.lookup("111.98.0.0/16")
+    assert result["origin_asn"] == "2516"
+    assert "violations" not in result
+    assert service.lookup("111.98.0.0/16") is result
+    assert client.calls == service.upstream_calls == 1
+    service.close()
+
+
+def test_lookup_coalesced():
+    release = threading.Event()
+    client = FakeClient(wait=release)
+    service = CheckerService(client=client, workers=4)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(service.lookup("1.1.0.0/16")))
+        for _ in range(8)
+    ]
+    missed = set()
+    get = service.cache.get
+
+    def counting_get(key, default=None):
+        # the fetch waits until every caller has missed the cache
+        value = get(key, default)
+        if value is None and threading.current_thread() in threads:
+            missed.add(threading.current_thread())
+            if len(missed) == len(threads):
+                release.set()
+        return value
+
+    service.cache.get = counting_get
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert release.is_set()
+    assert len(results) == 8
+    assert client.calls == service.upstream_calls == 1
+    service.close()
+
+
+def test_lookup_error_not_cached():
+    client = FakeClient(paths=None)
+    service = CheckerService(client=client)
+    for _ in range(2):
+        with pytest.raises(QratorError):
+            service.lookup("1.1.0.0/16")
+    assert client.calls == 2
+    service.close()
+
+
+def test_lookup_no_paths():
+    service = CheckerService(client=FakeClient(paths=[]))
+    with pytest.raises(PrefixNotFoundError):
+        service.lookup("1.1.0.0/16")
+    service.close()
+
+
+def test_lookup_policy():
+    service = CheckerService(client=FakeClient(), policy=Policy(POLICY))
+    violations = service.lookup("111.98.0.0/16")["violations"]
+    assert [v["kind"] for v in violations] == ["missing-peer"]
+    assert service.lookup("2.2.0.0/16")["violations"] == []
+    service.close()
+
+
+def test_serve_policy(monkeypatch):
+    served = {}
+
+    class Server:
+        def __init__(self, address, handler):
+            served["service"] = handler.service
+            self.server_port = address[1]
+
+        def serve_forever(self):
+            raise KeyboardInterrupt
+
+        def server_close(self):
+            pass
+
+    monkeypatch.setattr(server, "ThreadingHTTPServer", Server)
+    policy = Policy(POLICY)
+    server.serve(port=0, client=FakeClient(), policy=policy)
+    assert served["service"].policy is policy
+
+
+@pytest.fixture
+def start():
+    started = []
+
+    def start(service):
+        handler = type("BoundHandler", (Handler,), {"service": service})
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        started.append((httpd, service))
+        return f"http://127.0.0.1:{httpd.server_port}"
+
+    yield start
+    for httpd, service in started:
+        httpd.shutdown()
+        httpd.server_close()
+        service.close()
+
+
+@pytest.fixture
+def url(start):
+    return start(CheckerService(client=FakeClient(), policy=Policy(POLICY)))
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as r:
+            return r.code, json.load(r)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_http(url):
+    code, result = get(url + "/check?cidr=111.98.0.0/16")
+    assert code == 200
+    assert result["cidr"] == "111.98.0.0/16"
+    assert result["violations"][0]["kind"] == "missing-peer"
+    assert get(url + "/check?cidr=10.0.0.0/8")[0] == 400
+    assert get(url + "/check?cidr=example")[0] == 400
+    assert get(url + "/other")[0] == 404
+    code, health = get(url + "/health")
+    assert code == 200
+    assert health["cached"] == health["upstream_calls"] == 1
+
+
+def test_http_no_paths(start):
+    url = start(CheckerService(client=FakeClient(paths=[])))
+    code, result = get(url + "/check?cidr=1.1.0.0/16")
+    assert code == 404
+    assert result == {"error": "1.1.0.0/16 was not found"}
+
+
+def test_http_errors(start, caplog):
+    url = start(CheckerService(client=FakeClient(paths=None)))
+    code, result = get(url + "/check?cidr=1.1.0.0/16")
+    assert code == 502
+    assert result == {"error": "Failed to check 1.1.0.0/16"}
+
+    class Broken(FakeClient):
+        def fetch(self, cidr):
+            raise RuntimeError("bug")
+
+    # a bug is not an upstream error
+    url = start(CheckerService(client=Broken()))
+    code, result = get(url + "/check?cidr=1.1.0.0/16")
+    assert code == 500
+    assert result == {"error": "Error checking 1.1.0.0/16"}
+    assert any(r.exc_info for r in caplog.records if r.levelname == "ERROR")
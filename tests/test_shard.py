@@ -0,0 +1,77 @@
+import json
+import os
+
+import pytest
+
+from bgp_route_checker.shard import Coordinator, HashRing, ShardWorker
+
+PREFIXES = [f"{i}.{j}.0.0/16" for i in range(1, 21) for j in range(10)]
+NODES = ["a", "b", "c"]
+
+
+def fake_check(failing=()):
+    calls = []
+
+    def check(todo):
+        calls.append(list(todo))
+        for cidr in todo:
+            if cidr in failing:
+                yield {"cidr": cidr, "error": "QratorError: timed out"}
+            else:
+                yield {"cidr": cidr, "origin_asn": "2516"}
+
+    return check, calls
+
+
+def test_ring_moves_few_keys():
+    ring = HashRing(NODES)
+    before = {key: ring.node_for(key) for key in PREFIXES}
+    assert set(before.values()) == set(NODES)
+
+    ring.add("d")
+    moved = [key for key in PREFIXES if ring.node_for(key) != before[key]]
+    # only keys taken over by the new node move
+    assert all(ring.node_for(key) == "d" for key in moved)
+    assert len(moved) < len(PREFIXES) / 2
+
+    ring.remove("d")
+    assert {key: ring.node_for(key) for key in PREFIXES} == before
+
+
+def test_shards_cover_all_once():
+    ring = HashRing(NODES)
+    shards = [ring.shard(PREFIXES, node) for node in NODES]
+    assert sorted(sum(shards, [])) == sorted(PREFIXES)
+
+
+def test_worker_and_coordinator(tmp_path):
+    shard_dir = str(tmp_path)
+    failing = {HashRing(NODES).shard(PREFIXES, "a")[0]}
+    check, calls = fake_check(failing)
+    worker = ShardWorker(shard_dir, "a", NODES)
+    results = list(worker.check(PREFIXES, check))
+    shard = HashRing(NODES).shard(PREFIXES, "a")
+    assert sorted(r["cidr"] for r in results) == sorted(shard)
+    # the whole shard goes to check at once, so it can run concurrently
+    assert calls == [shard]
+    assert worker.progress["done"] == len(shard) - 1
+    assert worker.progress["failed"] == 1
+
+    # only the failed prefix is checked again
+    check, calls = fake_check()
+    progress = ShardWorker(shard_dir, "a", NODES).run(PREFIXES, check)
+    assert calls == [sorted(failing)]
+    assert progress["done"] == len(shard)
+
+    merged = Coordinator(shard_dir, NODES).merge(PREFIXES)
+    assert len(merged["results"]) == len(shard)
+    assert merged["failed"] == []
+    assert set(merged["pending"].values()) == {"b", "c"}
+    assert merged["progress"]["a"]["done"] == len(shard)
+    with open(os.path.join(shard_dir, "merged.json")) as entrada:
+        assert json.load(entrada)["failed"] == []
+
+
+def test_unknown_worker(tmp_path):
+    with pytest.raises(ValueError):
+        ShardWorker(str(tmp_path), "z", NODES)
@@ -0,0 +1,107 @@
+import glob
+import gzip
+import json
+import os
+
+from bgp_route_checker.sidecar import (
+    build_index,
+    parse_dump_name,
+    read_sidecar,
+    sidecar_name,
+    summaries,
+    summarize_dump,
+)
+
+PATHS = ["11039,6461,2516", "9902,1299,2516", "11071,3356,2516,2516"]
+
+
+def dump(directory, cidr, timestamp, data, compress=False):
+    name = f"qrator-{cidr.replace('/', '-')}-{timestamp}.json"
+    filename = os.path.join(str(directory), name)
+    body = json.dumps({"data": data}).encode()
+    if compress:
+        filename += ".gz"
+        body = gzip.compress(body)
+    with open(filename, "wb") as salida:
+        salida.write(body)
+    return filename
+
+
+def test_names():
+    name = "/a/qrator-111.98.0.0-16-20261019-101500.json"
+    cidr, timestamp = parse_dump_name(name + ".gz")
+    assert cidr == "111.98.0.0/16"
+    assert timestamp.isoformat() == "2026-10-19T10:15:00"
+    assert sidecar_name(name) == sidecar_name(name + ".gz")
+    assert sidecar_name(name) == "/a/qrator-111.98.0.0-16-20261019-101500.summary"
+    assert parse_dump_name(sidecar_name(name)) is None
+
+
+def test_sidecar_not_in_dump_glob(tmp_path):
+    filename = dump(tmp_path, "1.1.0.0/16", "20261019-101500", {"1.1.0.0/16": PATHS})
+    summarize_dump(filename)
+    assert os.path.exists(sidecar_name(filename))
+    assert glob.glob(str(tmp_path / "qrator-*.json")) == [filename]
+
+
+def test_summarize_dump(tmp_path):
+    filename = dump(
+        tmp_path, "1.1.0.0/16", "20261019-101500", {"1.1.0.0/16": PATHS}, True
+    )
+    summary = summarize_dump(filename)
+    assert summary["origin_asn"] == "2516"
+    assert summary["path_count"] == 3
+    assert summary["dump"] == os.path.basename(filename)[:-3]
+    assert summary["timestamp"] == "2026-10-19T10:15:00"
+    assert read_sidecar(filename) == json.loads(json.dumps(summary))
+
+
+def test_summarize_empty_dumps(tmp_path):
+    for data in [{}, {"1.1.0.0/16": []}]:
+        filename = dump(tmp_path, "1.1.0.0/16", "20261019-101500", data)
+        summary = summarize_dump(filename)
+        assert summary["cidr"] == "1.1.0.0/16"
+        assert summary["origin_asn"] is None
+        assert summary["path_count"] == 0
+
+    filename = dump(tmp_path, "2.2.0.0/16", "20261019-101500", {"2.2.0.0/16": None})
+    assert summarize_dump(filename)["error"].startswith("2.2.0.0/16")
+
+
+def test_summaries_skip_unreadable(tmp_path):
+    first = dump(tmp_path, "1.1.0.0/16", "20261019-101500", {"1.1.0.0/16": PATHS})
+    dump(tmp_path, "1.1.0.0/16", "20261019-111500", {})
+    with open(str(tmp_path / "qrator-1.1.0.0-16-20261019-121500.json"), "w") as salida:
+        salida.write("<html>Bad Gateway</html>")
+    with open(
+        str(tmp_path / "qrator-1.1.0.0-16-20261019-131500.json.gz"), "wb"
+    ) as salida:
+        salida.write(gzip.compress(b'{"data": {}}')[:10])
+    dump(tmp_path, "2.2.0.0/16", "20261019-101500", {"2.2.0.0/16": PATHS})
+
+    found = summaries(str(tmp_path), "1.1.0.0/16")
+    assert [s["path_count"] for s in found] == [3, 0]
+    assert found[0]["dump"] == os.path.basename(first)
+    assert len(summaries(str(tmp_path))) == 3
+
+
+def test_build_index(tmp_path):
+    for hour in range(10, 14):
+        dump(tmp_path, "1.1.0.0/16", f"20261019-{hour}1500", {"1.1.0.0/16": PATHS})
+    with open(str(tmp_path / "qrator-1.1.0.0-16-20261019-141500.json"), "w") as salida:
+        salida.write("not json")
+
+    index, built, errors = build_index(str(tmp_path), workers=2)
+    assert built == 4
+    assert len(index) == 4
+    assert [os.path.basename(f) for f, _ in errors] == [
+        "qrator-1.1.0.0-16-20261019-141500.json"
+    ]
+    # resumed, only the dump that failed is tried again
+    index, built, errors = build_index(str(tmp_path))
+    assert (len(index), built, len(errors)) == (4, 0, 1)
+    # the index is read instead of the sidecars
+    for name in os.listdir(str(tmp_path)):
+        if name.endswith(".summary"):
+            os.remove(str(tmp_path / name))
+    assert len(summaries(str(tmp_path), "1.1.0.0/16")) == 4
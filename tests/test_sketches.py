@@ -0,0 +1,83 @@
+import random
+from collections import Counter
+
+import pytest
+
+from bgp_route_checker.sketches import CountMinSketch, SpaceSaving
+
+
+def zipf_stream(n, seed=1):
+    rng = random.Random(seed)
+    return [str(int(rng.paretovariate(1.2))) for _ in range(n)]
+
+
+def check_bounds(sketch, truth):
+    for item, count, error in sketch.top():
+        assert count - error <= truth[item] <= count
+    # every item above N/k is kept
+    for item, count in truth.items():
+        if count > sketch.n / sketch.k:
+            assert item in sketch.counters
+
+
+def test_space_saving_bounds():
+    stream = zipf_stream(20000)
+    sketch = SpaceSaving(k=50)
+    for item in stream:
+        sketch.add(item)
+    truth = Counter(stream)
+    assert sketch.n == len(stream)
+    assert len(sketch.counters) == 50
+    assert len(sketch._heap) == 50
+    check_bounds(sketch, truth)
+    assert [item for item, _, _ in sketch.top(3)] == [
+        i for i, _ in truth.most_common(3)
+    ]
+
+
+def test_space_saving_replaces_minimum():
+    sketch = SpaceSaving(k=2)
+    for item in "aaabbbb":
+        sketch.add(item)
+    sketch.add("c")
+    # a had the lower count and is replaced, c inherits it as error
+    assert sketch.counters == {"b": [4, 0], "c": [4, 3]}
+
+
+def test_space_saving_merge_and_round_trip():
+    a, b = zipf_stream(10000, seed=1), zipf_stream(10000, seed=2)
+    s1, s2 = SpaceSaving(k=40), SpaceSaving(k=40)
+    for item in a:
+        s1.add(item)
+    for item in b:
+        s2.add(item)
+    s1.merge(s2)
+    check_bounds(s1, Counter(a + b))
+
+    copy = SpaceSaving.from_dict(s1.as_dict())
+    more = zipf_stream(5000, seed=3)
+    for item in more:
+        copy.add(item)
+    check_bounds(copy, Counter(a + b + more))
+
+    with pytest.raises(ValueError):
+        s1.merge(SpaceSaving(k=10))
+
+
+def test_count_min():
+    stream = zipf_stream(20000)
+    truth = Counter(stream)
+    sketch = CountMinSketch(epsilon=0.01, delta=0.01)
+    for item in stream:
+        sketch.add(item)
+    over = [sketch[item] - count for item, count in truth.items()]
+    assert min(over) >= 0
+    assert sum(o > sketch.error_bound() for o in over) <= len(over) * sketch.delta
+
+    half = CountMinSketch(epsilon=0.01, delta=0.01)
+    rest = CountMinSketch(epsilon=0.01, delta=0.01)
+    for i, item in enumerate(stream):
+        (half if i % 2 else rest).add(item)
+    merged = CountMinSketch.from_dict(half.merge(rest).as_dict())
+    assert merged.table == sketch.table
+    assert merged.n == sketch.n
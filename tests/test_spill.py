@@ -0,0 +1,121 @@
+import os
+import random
+
+import pytest
+
+from bgp_route_checker import CrossPrefixReport
+from bgp_route_checker import spill
+from bgp_route_checker.spill import SpillingCounter, Spool, parse_size
+
+
+@pytest.mark.parametrize(
+    "text, size",
+    [("100000", 100000), ("512K", 512 << 10), ("2M", 2 << 20), ("1.5gb", 3 << 29)],
+)
+def test_parse_size(text, size):
+    assert parse_size(text) == size
+
+
+def items(n=2000, seed=1):
+    rng = random.Random(seed)
+    return [(str(rng.randrange(300)), rng.randrange(10), 1) for _ in range(n)]
+
+
+def totals(pairs):
+    sums = {}
+    for key, a, b in pairs:
+        x, y = sums.get(key, (0, 0))
+        sums[key] = (x + a, y + b)
+    return sorted(sums.items())
+
+
+def test_spilled_sums_exact(tmp_path):
+    counter = SpillingCounter(limit=2000, width=2, directory=str(tmp_path))
+    for key, a, b in items():
+        counter.add(key, a, b)
+    assert counter.runs
+    assert counter.spilled > 0
+    assert list(counter.items()) == totals(items())
+    counter.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_runs_merged_over_max(tmp_path, monkeypatch):
+    monkeypatch.setattr(spill, "MAX_RUNS", 4)
+    counter = SpillingCounter(limit=1, width=2, directory=str(tmp_path))
+    for key, a, b in items(200):
+        counter.add(key, a, b)
+    # every new key spills, so the runs are merged every fourth spill
+    assert len(counter.runs) < 4
+    assert len(os.listdir(tmp_path)) == len(counter.runs)
+    assert list(counter.items()) == totals(items(200))
+    counter.close()
+
+
+def test_no_limit_never_spills():
+    counter = SpillingCounter(width=2)
+    for key, a, b in items():
+        counter.add(key, a, b)
+    assert counter.runs == []
+    assert len(counter) == len(totals(items()))
+    assert counter.peak > 0
+
+
+def result(cidr, peers, origins):
+    return {
+        "cidr": cidr,
+        "peers": peers,
+        "origins": origins,
+        "path_count": sum(n for _, n in origins),
+    }
+
+
+def test_cross_prefix_report_same_with_limit(tmp_path):
+    rng = random.Random(2)
+    results = [
+        result(
+            f"10.{i}.0.0/16",
+            [(str(rng.randrange(100)), rng.randrange(1, 5)) for _ in range(8)],
+            [(str(rng.randrange(20)), 3)],
+        )
+        for i in range(200)
+    ]
+    reports = []
+    for limit in (None, 4096):
+        with CrossPrefixReport(limit, directory=str(tmp_path)) as report:
+            for r in results:
+                report.add(r)
+            reports.append(report.as_dict(k=10))
+            runs, spilled, _ = report.spill_stats()
+            assert (runs > 0) == (limit is not None)
+            assert (spilled > 0) == (limit is not None)
+    assert reports[0] == reports[1]
+    assert reports[0]["prefixes"] == 200
+    assert os.listdir(tmp_path) == []
+
+
+def test_cross_prefix_report_top():
+    with CrossPrefixReport() as report:
+        report.add(result("10.0.0.0/16", [("2", 3), ("3", 1)], [("1", 4)]))
+        report.add(result("10.1.0.0/16", [("3", 2), ("4", 3)], [("1", 5)]))
+        assert report.as_dict(k=2) == {
+            "prefixes": 2,
+            "path_count": 9,
+            "peers": 3,
+            "origins": 1,
+            # ties ordered by ASN
+            "top_peers": [("2", 3, 1), ("3", 3, 2)],
+            "top_origins": [("1", 9, 2)],
+        }
+
+
+def test_spool(tmp_path):
+    spool = Spool(directory=str(tmp_path))
+    for i in range(3):
+        spool.append({"n": i})
+    assert len(spool) == 3
+    assert list(spool) == [{"n": 0}, {"n": 1}, {"n": 2}]
+    # appending after a read keeps the order
+    spool.append({"n": 3})
+    assert [item["n"] for item in spool] == [0, 1, 2, 3]
+    spool.close()
@@ -0,0 +1,61 @@
+import pytest
+
+from bgp_route_checker import PathAnalyzer
+from bgp_route_checker.tsdb import DAY, HOUR, RAW, TimeSeriesStore
+
+CIDR = "111.98.0.0/16"
+PATHS = ["11039,6461,2516", "9902,1299,2516", "11071,3356,2516,2516"]
+# a midnight, in seconds
+T0 = 1790000000 - 1790000000 % 86400
+
+
+@pytest.fixture
+def store(tmp_path):
+    with TimeSeriesStore(str(tmp_path / "ts.db")) as store:
+        yield store
+
+
+def test_raw_points(store):
+    analyzer = PathAnalyzer()
+    store.append(analyzer.analyze(PATHS, CIDR), ts=T0)
+    store.append(analyzer.analyze(PATHS[:2], CIDR).as_dict(), ts=T0 + 60)
+    # the same point again is not rolled up twice
+    store.append(analyzer.analyze(PATHS[:2], CIDR), ts=T0 + 60)
+
+    points = store.query(CIDR, T0, T0 + 3600, tier=RAW)
+    assert [p["path_count"] for p in points] == [3, 2]
+    assert points[0]["origins"] == {"2516": 3}
+    assert points[0]["prepends"] == {"3356": 1}
+    assert store.query("1.1.0.0/16", T0, T0 + 3600, tier=RAW) == []
+
+
+def test_rollups(store):
+    analyzer = PathAnalyzer()
+    for minute, paths in enumerate([PATHS, PATHS[:1], PATHS[:2]]):
+        store.append(analyzer.analyze(paths, CIDR), ts=T0 + minute * 60)
+    store.append(analyzer.analyze(PATHS, CIDR), ts=T0 + 7200)
+
+    hours = store.query(CIDR, T0 + 10, T0 + 86399, tier=HOUR)
+    assert [(p["ts"], p["n"]) for p in hours] == [(T0, 3), (T0 + 7200, 1)]
+    assert hours[0]["path_count"] == 2
+    assert (hours[0]["path_count_min"], hours[0]["path_count_max"]) == (1, 3)
+    assert hours[0]["peers"] == {"6461": 3, "1299": 2, "3356": 1}
+
+    (day,) = store.query(CIDR, T0, T0 + 86399, tier=DAY)
+    assert day["n"] == 4
+    assert day["origins"] == {"2516": 9}
+
+
+def test_expire_and_tier(store):
+    store.append(PathAnalyzer().analyze(PATHS, CIDR), ts=T0)
+    now = T0 + 30 * 86400
+    assert store.tier_for(T0, now=now) == HOUR
+    assert store.tier_for(T0, now=T0 + 86400) == RAW
+    assert store.tier_for(T0, now=T0 + 365 * 86400) == DAY
+
+    store.expire(now=now)
+    assert store.query(CIDR, T0, now, tier=RAW) == []
+    assert len(store.query(CIDR, T0, now, tier=HOUR)) == 1
+    store.expire(now=T0 + 365 * 86400)
+    assert store.query(CIDR, T0, now, tier=HOUR) == []
+    assert len(store.query(CIDR, T0, now, tier=DAY)) == 1